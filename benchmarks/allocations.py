@@ -0,0 +1,98 @@
+import argparse
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from monkey import ast, compiler, evaluator, lexer, object, parser, resolver
+
+PROGRAMS = {
+    'arithmetic': '''
+let loop = fn(n, acc) { if (n == 0) { acc } else { loop(n - 1, acc + n * 2 - 1) } };
+loop(%d, 0);
+''',
+    'conditions': '''
+let loop = fn(n, acc) {
+  if (!(n == 0)) { loop(n - 1, if (n > 5 == true) { !acc } else { acc }) } else { acc }
+};
+loop(%d, false);
+''',
+    'strings': '''
+let loop = fn(n, acc) { if (n == 0) { len(acc) } else { loop(n - 1, acc + "a") } };
+loop(%d, "");
+''',
+}
+
+
+def objectClasses() -> List[Any]:
+    classes: List[Any] = [object.ObjectType]
+    pending: List[Any] = [object.Object]
+    while pending:
+        cls = pending.pop()
+        classes.append(cls)
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+def counting(counts: Dict[str, int], key: str, f: Any) -> Any:
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        counts[key] += 1
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+def run(label: str, source: str) -> None:
+    program = parser.New(lexer.New(source)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+
+    # Counts the Monkey objects and type tags made, and the nodes evaluated.
+    counts: Dict[str, int] = {'objects': 0, 'nodes': 0}
+    inits = {cls: cls.__dict__['__init__'] for cls in objectClasses() if '__init__' in cls.__dict__}
+    eval = evaluator.Eval
+    for cls, init in inits.items():
+        cls.__init__ = counting(counts, 'objects', init)
+    evaluator.Eval = counting(counts, 'nodes', eval)
+    try:
+        result = evaluator.Eval(program, env)
+    finally:
+        for cls, init in inits.items():
+            cls.__init__ = init
+        evaluator.Eval = eval
+
+    start = time.perf_counter()
+    evaluator.Eval(parser.New(lexer.New(source)).ParseProgram(), object.NewEnvironment())
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-11s %6.2f objects/node %10d nodes %8.3fs  %s' %
+          (label, counts['objects'] / counts['nodes'], counts['nodes'], elapsed, outcome))
+
+
+def footprint(n: int) -> None:
+    # Bytes held per element of an array of distinct integers.
+    source = '[%s]' % ', '.join(str(i) for i in range(1000, 1000 + n))
+    program: ast.Program = parser.New(lexer.New(source)).ParseProgram()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    array = evaluator.Eval(program, object.NewEnvironment())
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('array of %d integers: %.1f bytes per element' % (n, (after - before) / n))
+    del array
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey object allocation benchmark')
+    argparser.add_argument('--n', type=int, default=20000)
+    args = argparser.parse_args()
+
+    # Compiled functions bypass Eval, so only the tree-walking evaluator is measured.
+    compiler.tiering.Enabled = False
+    for label, source in PROGRAMS.items():
+        run(label, source % args.n)
+    footprint(args.n)
+
+
+if __name__ == '__main__':
+    main()
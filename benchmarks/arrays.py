@@ -0,0 +1,51 @@
+import argparse
+import time
+
+from monkey import evaluator, lexer, object, parser, resolver
+
+# The map and reduce of the book, over an array built with push.
+PROGRAM = '''
+let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, push(acc, n)) } };
+let map = fn(arr, f) {
+  let iter = fn(arr, accumulated) {
+    if (len(arr) == 0) { accumulated } else { iter(rest(arr), push(accumulated, f(first(arr)))) }
+  };
+  iter(arr, []);
+};
+let reduce = fn(arr, initial, f) {
+  let iter = fn(arr, result) {
+    if (len(arr) == 0) { result } else { iter(rest(arr), f(result, first(arr))) }
+  };
+  iter(arr, initial);
+};
+reduce(map(build(%d, []), fn(x) { x * 2 }), 0, fn(a, b) { a + b });
+'''
+
+
+def run(size: int) -> None:
+    program = parser.New(lexer.New(PROGRAM % size)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('map/reduce n=%-7d %8.3fs  %6.2fus/element  %s' %
+          (size, elapsed, elapsed / size * 1e6, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey persistent array benchmark')
+    argparser.add_argument('--max', type=int, default=8000)
+    args = argparser.parse_args()
+
+    size = 1000
+    while size <= args.max:
+        run(size)
+        size *= 2
+
+
+if __name__ == '__main__':
+    main()
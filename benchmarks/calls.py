@@ -0,0 +1,53 @@
+import argparse
+import time
+
+from monkey import compiler, evaluator, lexer, object, parser, resolver
+
+# Each iteration makes four calls of the measured function and one tail call of the loop.
+CALLS = '''
+let zero = fn() { 1 };
+let one = fn(a) { a };
+let three = fn(a, b, c) { b };
+let loop = fn(n) { if (n == 0) { 0 } else { %s; %s; %s; %s; loop(n - 1) } };
+loop(%d);
+'''
+
+ARGUMENTS = {
+    0: 'zero()',
+    1: 'one(n)',
+    3: 'three(n, 2, 3)',
+}
+
+
+def run(arity: int, n: int, resolve: bool, tiering: bool) -> None:
+    compiler.tiering = compiler.Tiering(Enabled=tiering)
+    call = ARGUMENTS[arity]
+    program = parser.New(lexer.New(CALLS % (call, call, call, call, n))).ParseProgram()
+    env = object.NewEnvironment()
+    if resolve:
+        resolver.Resolve(program, env, closed=True)
+
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        evaluator.Eval(program, env)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    calls = 5 * n
+    print('%d args  resolved=%-5s tiering=%-5s %8.3fs  %9.0f calls/s' %
+          (arity, resolve, tiering, best, calls / best))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey function call benchmark')
+    argparser.add_argument('--n', type=int, default=20000)
+    args = argparser.parse_args()
+
+    for arity in sorted(ARGUMENTS):
+        for resolve, tiering in ((False, False), (True, False), (True, True)):
+            run(arity, args.n, resolve, tiering)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from monkey import ast, evaluator, lexer, object, parser, resolver
+
+# Every adder is made in a frame that also holds a large array it never uses.
+MAKE = '''
+let make = fn(n) {
+  let big = [%s];
+  let k = n * 2;
+  let iter = fn(i, acc) { if (i == 0) { acc } else { iter(i - 1, acc + k) } };
+  fn(x) { iter(x, 0) }
+};
+'''
+
+
+def name(i: int) -> str:
+    # Identifiers are letters only.
+    letters = ''
+    while True:
+        letters += chr(ord('a') + i % 26)
+        i //= 26
+        if i == 0:
+            return 'f' + letters
+
+
+def script(n: int) -> str:
+    adders = ', '.join('make(%d)' % i for i in range(n))
+    return 'let adders = [%s]; adders[%d](3)' % (adders, n - 1)
+
+
+def session(n: int) -> list:
+    # A REPL session: each line keeps one more closure alive in the global environment.
+    lines = []
+    for i in range(n):
+        lines.append('let %s = make(%d); %s(2)' % (name(i), i, name(i)))
+    return lines
+
+
+def parse(source: str) -> ast.Program:
+    return parser.New(lexer.New(source)).ParseProgram()
+
+
+def run(label: str, lines: list, size: int, resolve: bool) -> None:
+    programs = [parse(line) for line in [MAKE % ', '.join(str(i) for i in range(size))] + lines]
+    env = object.NewEnvironment()
+
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = None
+    for program in programs:
+        if resolve:
+            resolver.Resolve(program, env, closed=True)
+        result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Whatever the session leaves behind once it is dropped is only reachable through cycles.
+    outcome = result.Inspect if result is not None else 'None'
+    del programs, env, result
+    cycles = gc.collect()
+    gc.enable()
+
+    print('%-7s resolved=%-5s %8.3fs  retained=%6.1fMB  peak=%6.1fMB  cyclic=%-6d %s' %
+          (label, resolve, elapsed, retained / 1e6, peak / 1e6, cycles, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey closure memory benchmark')
+    argparser.add_argument('--n', type=int, default=300)
+    argparser.add_argument('--size', type=int, default=500)
+    args = argparser.parse_args()
+
+    for resolve in (False, True):
+        run('script', [script(args.n)], args.size, resolve)
+    for resolve in (False, True):
+        run('session', session(args.n), args.size, resolve)
+
+
+if __name__ == '__main__':
+    main()
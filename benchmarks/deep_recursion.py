@@ -0,0 +1,42 @@
+import argparse
+import sys
+import time
+
+from monkey import evaluator, lexer, object, parser, stackeval
+
+SOURCE = '''
+let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };
+count(%d);
+'''
+
+
+def run(name: str, depth: int) -> None:
+    program = parser.New(lexer.New(SOURCE % depth)).ParseProgram()
+    env = object.NewEnvironment()
+    eval = stackeval.Eval if name == 'stack' else evaluator.Eval
+
+    start = time.perf_counter()
+    try:
+        result = eval(program, env)
+        outcome = result.Inspect if result is not None else 'None'
+    except RecursionError:
+        outcome = 'RecursionError'
+    elapsed = time.perf_counter() - start
+
+    print('%-9s depth=%-8d %8.3fs  %s' % (name, depth, elapsed, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey recursion depth benchmark')
+    argparser.add_argument('--depth', type=int, default=10**6)
+    args = argparser.parse_args()
+
+    for depth in (100, 1000, 10000):
+        run('recursive', depth)
+    print('(python recursion limit: %d)' % sys.getrecursionlimit())
+    for depth in (1000, 10000, 100000, args.depth):
+        run('stack', depth)
+
+
+if __name__ == '__main__':
+    main()
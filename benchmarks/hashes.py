@@ -0,0 +1,92 @@
+import argparse
+import time
+from typing import Any, List, Tuple
+
+from monkey import evaluator, lexer, object, parser, resolver
+
+LOOKUPS = '''
+let loop = fn(i, acc) { if (i == 0) { acc } else { loop(i - 1, acc + h[k]) } };
+loop(%d, 0);
+'''
+
+
+def run(size: int, lookups: int, strings: bool) -> None:
+    keys: List[Any] = []
+    for i in range(size):
+        keys.append(object.String(Value='k%d' % i) if strings else object.Integer(Value=i))
+    pairs: List[Tuple[object.Object, object.Object]] = [(k, object.Integer(Value=1)) for k in keys]
+
+    start = time.perf_counter()
+    hash = evaluator.newHash(pairs)
+    built = time.perf_counter() - start
+
+    env = object.NewEnvironment()
+    env.Set('h', hash)
+    # The last key inserted, which a linear scan reaches last.
+    env.Set('k', keys[-1])
+    program = parser.New(lexer.New(LOOKUPS % lookups)).ParseProgram()
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-7s keys=%-8d build %8.3fs  %8.2fus/lookup  %s' %
+          ('string' if strings else 'integer', size, built, elapsed / lookups * 1e6, outcome))
+
+
+def hashing(count: int) -> None:
+    strings = [object.String(Value='key number %d' % i) for i in range(count)]
+    start = time.perf_counter()
+    for s in strings:
+        object.GetHashKeyString(s)
+    fresh = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for s in strings:
+        object.GetHashKeyString(s)
+    cached = time.perf_counter() - start
+    print('string hash keys: %6.0fns fresh, %6.0fns cached' %
+          (fresh / count * 1e9, cached / count * 1e9))
+
+
+def composite(size: int, lookups: int) -> None:
+    # Keys are arrays of two integers, looked up by an equal array that is not the same object.
+    def pair(i: int) -> object.Object:
+        return object.Array([object.Integer(Value=i), object.Integer(Value=i + 1)])
+
+    pairs: List[Tuple[object.Object, object.Object]] = [
+        (pair(i), object.Integer(Value=1)) for i in range(size)]
+    hash = evaluator.newHash(pairs)
+    env = object.NewEnvironment()
+    env.Set('h', hash)
+    env.Set('k', pair(size - 1))
+    program = parser.New(lexer.New(LOOKUPS % lookups)).ParseProgram()
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-7s keys=%-8d %8.2fus/lookup  %s' % ('array', size, elapsed / lookups * 1e6, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey hash lookup benchmark')
+    argparser.add_argument('--lookups', type=int, default=10000)
+    argparser.add_argument('--max', type=int, default=1000000)
+    args = argparser.parse_args()
+
+    size = 10
+    while size <= args.max:
+        for strings in (False, True):
+            run(size, args.lookups, strings)
+        composite(size, args.lookups)
+        size *= 10
+    hashing(args.lookups * 10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import time
+
+from monkey import evaluator, lexer, object, optimizer, parser, resolver
+
+SOURCE = '''
+let double = fn(x) { x * 2 };
+let getName = fn(person) { person["name"] };
+let people = [{"name": "Anna", "age": 24}, {"name": "Bob", "age": 99}];
+let loop = fn(i, acc) {
+  if (i == 0) {
+    acc
+  } else {
+    loop(i - 1, acc + double(i) + len(getName(people[1])))
+  }
+};
+loop(%d, 0);
+'''
+
+
+def run(name: str, iterations: int, options: optimizer.Options) -> None:
+    program = parser.New(lexer.New(SOURCE % iterations)).ParseProgram()
+    env = object.NewEnvironment()
+    report = optimizer.Optimize(program, options)
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-10s iterations=%-8d %8.3fs  inlined=%-3d %s' %
+          (name, iterations, elapsed, len(report.Inlined), outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey function inlining benchmark')
+    argparser.add_argument('--iterations', type=int, default=100000)
+    args = argparser.parse_args()
+
+    run('calls', args.iterations, optimizer.Options(InlineFunctions=False))
+    run('inlined', args.iterations, optimizer.Options())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import time
+from typing import Optional
+
+from monkey import ast, compiler, evaluator, lexer, object, parser
+
+# The loop is defined inside depth nested closures and uses top-level names on every iteration,
+# so finding them walks the whole environment chain.
+SOURCE = '''
+let add = fn(a, b) { a + b };
+let one = 1;
+%s
+'''
+
+LOOP = '''
+let loop = fn(i, acc) {
+  if (i == 0) { acc } else { loop(i - 1, add(add(add(acc, one), one), one)) }
+};
+loop(%d, 0)
+'''
+
+
+def nested(depth: int, iterations: int) -> str:
+    source = LOOP % iterations
+    for _ in range(depth):
+        source = 'fn() { %s }()' % source
+    return SOURCE % source
+
+
+def uncached(node: ast.Identifier, env: object.Environment) -> Optional[object.Object]:
+    return env.Get(node.Value)
+
+
+def run(name: str, depth: int, iterations: int) -> None:
+    program = parser.New(lexer.New(nested(depth, iterations))).ParseProgram()
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, object.NewEnvironment())
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-8s depth=%-3d %8.3fs  %s' % (name, depth, elapsed, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey identifier lookup cache benchmark')
+    argparser.add_argument('--iterations', type=int, default=20000)
+    args = argparser.parse_args()
+
+    # Measure the interpreter's lookups, not compiled code.
+    compiler.tiering.Enabled = False
+    cached = evaluator.lookupCached
+    for depth in (0, 10, 50):
+        evaluator.lookupCached = uncached
+        run('uncached', depth, args.iterations)
+        evaluator.lookupCached = cached
+        run('cached', depth, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
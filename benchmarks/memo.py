@@ -0,0 +1,40 @@
+import argparse
+import time
+
+from monkey import compiler, evaluator, lexer, object, parser, purity, resolver
+
+FIB = 'fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }'
+PLAIN = 'let fib = %s; fib(%d);'
+MEMO = 'let fib = memo(%s); fib(%d);'
+
+
+def run(source: str, label: str) -> None:
+    compiler.tiering = compiler.Tiering()
+    program = parser.New(lexer.New(source)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    purity.Analyze(program, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    fib = env.Get('fib')
+    stats = ''
+    if type(fib) == object.Builtin and type(fib.Fn) == evaluator.Memo:
+        stats = fib.Fn.String()
+    print('fib %-6s %8.3fs  %s  %s' % (label, elapsed, outcome, stats))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey memoization benchmark')
+    argparser.add_argument('--n', type=int, default=22)
+    args = argparser.parse_args()
+
+    run(PLAIN % (FIB, args.n), 'plain')
+    run(MEMO % (FIB, args.n), 'memo')
+
+
+if __name__ == '__main__':
+    main()
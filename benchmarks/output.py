@@ -0,0 +1,60 @@
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+from typing import Any
+
+from monkey import evaluator, lexer, object, parser, resolver
+
+PROGRAM = '''
+let loop = fn(n) { if (n == 0) { 0 } else { puts(n, "line"); loop(n - 1) } };
+loop(%d);
+'''
+
+
+def printingPuts(*args: object.Object) -> object.Object:
+    # What puts did before it had a sink: one print per argument.
+    for arg in args:
+        print(arg.Inspect)
+    return evaluator.NULL
+
+
+def run(label: str, n: int, path: str, **settings: Any) -> None:
+    program = parser.New(lexer.New(PROGRAM % n)).ParseProgram()
+    env = object.NewEnvironment()
+    if label == 'print':
+        env.Set('puts', object.Builtin(Fn=printingPuts))
+    resolver.Resolve(program, env, closed=True)
+
+    # A line buffered file writes out every line, as a terminal does.
+    with open(path, 'w', buffering=1) as out, contextlib.redirect_stdout(out):
+        saved = {name: getattr(evaluator.output, name) for name in settings}
+        for name, value in settings.items():
+            setattr(evaluator.output, name, value)
+        try:
+            start = time.perf_counter()
+            evaluator.Eval(program, env)
+            elapsed = time.perf_counter() - start
+        finally:
+            for name, value in saved.items():
+                setattr(evaluator.output, name, value)
+    size = os.path.getsize(path)
+    print('%-13s %8d puts %8.3fs  %6.2fus/puts  %d bytes' %
+          (label, n, elapsed, elapsed / n * 1e6, size))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey puts output benchmark')
+    argparser.add_argument('--n', type=int, default=1000000)
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'out.txt')
+        run('print', args.n, path)
+        run('line buffered', args.n, path, LineBuffered=True)
+        run('buffered', args.n, path)
+
+
+if __name__ == '__main__':
+    main()
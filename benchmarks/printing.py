@@ -0,0 +1,63 @@
+import argparse
+import contextlib
+import os
+import time
+import tracemalloc
+from typing import Any, Optional
+
+from monkey import evaluator, lexer, object, parser, resolver
+
+# An array of n small arrays, and a hash of n pairs.
+PROGRAMS = {
+    'array': '''
+let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, push(acc, [n, "x"])) } };
+build(%d, []);
+''',
+    'hash': '''
+let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, set(acc, n, n)) } };
+build(%d, {});
+''',
+}
+
+
+def inspected(source: str) -> Any:
+    program = parser.New(lexer.New(source)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    return evaluator.Eval(program, env)
+
+
+def run(label: str, value: Any, streaming: bool, limit: Optional[int]) -> None:
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        start = time.perf_counter()
+        evaluator.output.Limit = limit
+        try:
+            if streaming:
+                evaluator.builtin_puts(value)
+            else:
+                # What puts did before: build the whole string, then print it.
+                print(value.Inspect)
+        finally:
+            evaluator.output.Limit = None
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print('%-5s %-9s limit=%-7s %8.3fs  peak %8.1f MB' %
+          (label, 'streaming' if streaming else 'string', limit, elapsed, peak / 1e6))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey puts benchmark')
+    argparser.add_argument('--n', type=int, default=200000)
+    args = argparser.parse_args()
+
+    for label, source in PROGRAMS.items():
+        value = inspected(source % args.n)
+        run(label, value, False, None)
+        run(label, value, True, None)
+        run(label, value, True, 10)
+
+
+if __name__ == '__main__':
+    main()
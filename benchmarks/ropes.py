@@ -0,0 +1,50 @@
+import argparse
+import sys
+import time
+
+from monkey import evaluator, inference, lexer, object, parser, resolver
+
+# Builds a string of n pieces by appending in a recursive loop, then reads it once.
+PROGRAM = '''
+let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, acc + piece) } };
+let report = build(%d, "");
+len(report) + len(report + "");
+'''
+
+
+def run(total: int, size: int, ropes: bool) -> None:
+    program = parser.New(lexer.New(PROGRAM % (total // size))).ParseProgram()
+    env = object.NewEnvironment()
+    env.Set('piece', object.String(Value='x' * size))
+    resolver.Resolve(program, env, closed=True)
+    inference.Infer(program, closed=True)
+
+    leaf = object.ROPE_LEAF
+    if not ropes:
+        # Every join copies, as it did before ropes.
+        object.ROPE_LEAF = sys.maxsize
+    try:
+        start = time.perf_counter()
+        result = evaluator.Eval(program, env)
+        elapsed = time.perf_counter() - start
+    finally:
+        object.ROPE_LEAF = leaf
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-6s %8d bytes in %5d-byte pieces %8.3fs  %6.2fus/piece  %s' %
+          ('ropes' if ropes else 'copies', total, size, elapsed, elapsed / (total // size) * 1e6,
+           outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey string building benchmark')
+    argparser.add_argument('--bytes', type=int, default=1 << 20)
+    args = argparser.parse_args()
+
+    for size in (64, 16):
+        for ropes in (True, False):
+            run(args.bytes, size, ropes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import time
+
+from monkey import compiler, evaluator, lexer, object, parser, resolver
+
+HOT = '''
+let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+fib(%d);
+'''
+
+
+def name(i: int) -> str:
+    # Identifiers are letters only.
+    letters = ''
+    while True:
+        letters += chr(ord('a') + i % 26)
+        i //= 26
+        if i == 0:
+            return 'f' + letters
+
+
+# Many functions that each run once: tiering must not make these slower.
+COLD = '\n'.join('let %s = fn(x) { x + %d }; %s(1);' % (name(i), i, name(i)) for i in range(2000))
+
+
+def run(name: str, source: str, enabled: bool) -> None:
+    compiler.tiering = compiler.Tiering(Enabled=enabled)
+    program = parser.New(lexer.New(source)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-5s tiering=%-5s %8.3fs  promoted=%-3d %s' %
+          (name, enabled, elapsed, len(compiler.tiering.Promoted), outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey tiered execution benchmark')
+    argparser.add_argument('--n', type=int, default=22)
+    args = argparser.parse_args()
+
+    for enabled in (False, True):
+        run('hot', HOT % args.n, enabled)
+    for enabled in (False, True):
+        run('cold', COLD, enabled)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import time
+
+from monkey import compiler, evaluator, inference, lexer, object, parser, resolver
+
+POLY = '''
+let poly = fn(x, acc) { if (x == 0) { acc } else { poly(x - 1, acc + x * x * 3 + x * 2 - 7) } };
+poly(%d, 0);
+'''
+
+
+def run(source: str, infer: bool) -> None:
+    compiler.tiering = compiler.Tiering()
+    program = parser.New(lexer.New(source)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    if infer:
+        inference.Infer(program, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('poly inference=%-5s %8.3fs  %s' % (infer, elapsed, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey unboxed arithmetic benchmark')
+    argparser.add_argument('--n', type=int, default=200000)
+    args = argparser.parse_args()
+
+    for infer in (False, True):
+        run(POLY % args.n, infer)
+
+
+if __name__ == '__main__':
+    main()
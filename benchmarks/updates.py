@@ -0,0 +1,72 @@
+import argparse
+import time
+
+from monkey import evaluator, lexer, object, parser, resolver
+
+PROGRAMS = {
+    'count': '''
+let loop = fn(items, acc) {
+  if (len(items) == 0) { acc } else {
+    let k = first(items);
+    let c = acc[k];
+    loop(rest(items), set(acc, k, if (c) { c + 1 } else { 1 }))
+  }
+};
+len(keys(loop(items, {})));
+''',
+    'group': '''
+let loop = fn(items, acc) {
+  if (len(items) == 0) { acc } else {
+    let k = first(items);
+    let g = acc[k];
+    loop(rest(items), set(acc, k, if (g) { push(g, k) } else { [k] }))
+  }
+};
+len(keys(loop(items, {})));
+''',
+}
+
+
+def copyingSet(arg: object.Object, key: object.Object, value: object.Object) -> object.Object:
+    # What a script had to do without set: rebuild the whole hash with one more pair.
+    hash = evaluator.newHash([(p.Key, p.Value) for p in arg.Pairs.values() if p.Key != key])
+    hash.Pairs[object.GetHashKey(key)] = object.HashPair(Key=key, Value=value)
+    return hash
+
+
+def run(label: str, source: str, n: int, copying: bool) -> None:
+    # Half of the items are distinct keys.
+    items = object.Array([object.Integer(Value=i % (n // 2)) for i in range(n)])
+    env = object.NewEnvironment()
+    env.Set('items', items)
+    if copying:
+        env.Set('set', object.Builtin(Fn=copyingSet, Arity=3))
+    program = parser.New(lexer.New(source)).ParseProgram()
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-5s %-8s n=%-7d %8.3fs  %6.1fus/item  %s' %
+          (label, 'copying' if copying else 'set', n, elapsed, elapsed / n * 1e6, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey hash update benchmark')
+    argparser.add_argument('--max', type=int, default=100000)
+    argparser.add_argument('--copying-max', type=int, default=1000)
+    args = argparser.parse_args()
+
+    for label, source in PROGRAMS.items():
+        n = 1000
+        while n <= args.max:
+            run(label, source, n, False)
+            if n <= args.copying_max:
+                run(label, source, n, True)
+            n *= 10
+
+
+if __name__ == '__main__':
+    main()
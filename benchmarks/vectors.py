@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from monkey import evaluator, lexer, object, parser, resolver
+
+# The sum of the squares of the elements above a threshold, and a dot product, of n integers.
+PROGRAMS = {
+    'boxed': '''
+let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, push(acc, n)) } };
+let squares = fn(arr, acc) {
+  if (len(arr) == 0) { acc } else {
+    let x = first(arr);
+    squares(rest(arr), if (x > 100) { acc + x * x } else { acc })
+  }
+};
+let dot = fn(a, b, acc) {
+  if (len(a) == 0) { acc } else { dot(rest(a), rest(b), acc + first(a) * first(b)) }
+};
+let xs = build(%d, []);
+squares(xs, 0) + dot(xs, xs, 0);
+''',
+    'vector': '''
+let xs = vadd(range(%d), 1);
+let big = vmask(xs, vgt(xs, 100));
+vsum(vmul(big, big)) + vdot(xs, xs);
+''',
+}
+
+
+def run(label: str, source: str, n: int) -> None:
+    program = parser.New(lexer.New(source % n)).ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+
+    start = time.perf_counter()
+    result = evaluator.Eval(program, env)
+    elapsed = time.perf_counter() - start
+
+    outcome = result.Inspect if result is not None else 'None'
+    print('%-6s n=%-8d %8.3fs  %8.3fus/element  %s' %
+          (label, n, elapsed, elapsed / n * 1e6, outcome))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description='Monkey integer vector benchmark')
+    argparser.add_argument('--boxed-max', type=int, default=100000)
+    argparser.add_argument('--max', type=int, default=1000000)
+    args = argparser.parse_args()
+
+    n = 1000
+    while n <= args.max:
+        if n <= args.boxed_max:
+            run('boxed', PROGRAMS['boxed'], n)
+        run('vector', PROGRAMS['vector'], n)
+        n *= 10
+
+
+if __name__ == '__main__':
+    main()
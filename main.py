@@ -1,13 +1,56 @@
 import argparse
 import getpass
 
-from monkey import evaluator, lexer, object, parser, repl
+from monkey import (
+    compiler, evaluator, inference, lexer, object, optimizer, parser, purity, repl, resolver,
+    stackeval, unwind)
 
 
 def main() -> None:
     argparser = argparse.ArgumentParser(description='')
     argparser.add_argument('infile', nargs='?', type=argparse.FileType('r'))
+    argparser.add_argument(
+        '--no-optimize', action='store_true', help='skip the AST optimizer pass')
+    argparser.add_argument(
+        '--no-tiering', action='store_true', help='never compile hot functions')
+    argparser.add_argument(
+        '--tier-threshold',
+        type=int,
+        default=compiler.tiering.Threshold,
+        help='calls after which a function is compiled')
+    argparser.add_argument(
+        '--tier-stats', action='store_true', help='print the functions that were compiled')
+    argparser.add_argument(
+        '--dump-types', action='store_true', help='print the inferred types before running')
+    argparser.add_argument(
+        '--memo-stats', action='store_true', help='print the caches of memoized functions')
+    argparser.add_argument(
+        '--output-buffer',
+        type=int,
+        default=evaluator.output.Threshold,
+        help='characters puts collects before writing them out')
+    argparser.add_argument(
+        '--line-buffered', action='store_true', help='write out what puts prints after every call')
+    argparser.add_argument(
+        '--puts-limit',
+        type=int,
+        default=None,
+        help='elements of each array or hash that puts prints before eliding the rest')
+    mode = argparser.add_mutually_exclusive_group()
+    mode.add_argument(
+        '--stack',
+        action='store_true',
+        help='evaluate with an explicit stack instead of Python recursion')
+    mode.add_argument(
+        '--unwind',
+        action='store_true',
+        help='propagate errors and return values with Python exceptions')
     args = argparser.parse_args()
+    compiler.tiering.Enabled = not args.no_tiering
+    compiler.tiering.Threshold = args.tier_threshold
+    evaluator.output.Threshold = args.output_buffer
+    evaluator.output.LineBuffered = args.line_buffered
+    evaluator.output.Limit = args.puts_limit
     if args.infile:
         body = args.infile.read()
         if body:
@@ -20,7 +63,25 @@ def main() -> None:
                 for msg in p.Errors():
                     print('\t' + msg)
                 return
-            evaluator.Eval(program, env)
+            if not args.no_optimize:
+                optimizer.Optimize(program)
+            resolver.Resolve(program, env, closed=True)
+            types = inference.Infer(program, closed=True)
+            purity.Analyze(program, closed=True)
+            if args.dump_types:
+                print(types.String())
+            if args.stack:
+                stackeval.Eval(program, env)
+            elif args.unwind:
+                unwind.Eval(program, env)
+            else:
+                evaluator.Eval(program, env)
+            if args.tier_stats and compiler.tiering.Promoted:
+                print(compiler.tiering.String())
+            if args.memo_stats:
+                for name, value in env.store.items():
+                    if type(value) == object.Builtin and type(value.Fn) == evaluator.Memo:
+                        print('%s: %s' % (name, value.Fn.String()))
     else:
         user = getpass.getuser()
         print('Hello {}! This is the Monkey programming language!\n'.format(user), end='')
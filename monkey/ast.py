@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple, cast
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple, cast
 
 from monkey import token
 
@@ -52,6 +52,14 @@ class Program(Node):
 class Identifier(Expression):
     Token: token.Token
     Value: str
+    Depth: Optional[int] = field(default=None, compare=False, repr=False)
+    Slot: Optional[int] = field(default=None, compare=False, repr=False)
+    Builtin: Optional[Any] = field(default=None, compare=False, repr=False)
+    CacheOuter: Optional[Any] = field(default=None, compare=False, repr=False)
+    CacheEnv: Optional[Any] = field(default=None, compare=False, repr=False)
+    CacheEpoch: int = field(default=-1, compare=False, repr=False)
+    Kind: Optional[str] = field(default=None, compare=False, repr=False)
+    Cell: bool = field(default=False, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -101,6 +109,7 @@ class LetStatement(Statement):
 class ReturnStatement(Statement):
     Token: token.Token
     ReturnValue: Expression
+    Tail: bool = field(default=False, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -150,6 +159,7 @@ class ExpressionStatement(Statement):
 class IntegerLiteral(Expression):
     Token: token.Token
     Value: int
+    Constant: Optional[Any] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -170,6 +180,8 @@ class PrefixExpression(Expression):
     Token: token.Token
     Operator: str
     Right: Optional[Expression]
+    Quick: Optional[Any] = field(default=None, compare=False, repr=False)
+    Kind: Optional[str] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -197,6 +209,8 @@ class InfixExpression(Expression):
     Left: Optional[Expression]
     Operator: str
     Right: Optional[Expression]
+    Quick: Optional[Any] = field(default=None, compare=False, repr=False)
+    Kind: Optional[str] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -243,6 +257,17 @@ class Boolean(Expression):
 class BlockStatement(Statement):
     Token: token.Token
     Statements: List[Statement]
+    TailCallsMarked: bool = field(default=False, compare=False, repr=False)
+    Closes: bool = field(default=False, compare=False, repr=False)
+    Slots: Optional[List[str]] = field(default=None, compare=False, repr=False)
+    Calls: int = field(default=0, compare=False, repr=False)
+    Compiled: Optional[Any] = field(default=None, compare=False, repr=False)
+    Cells: Optional[List[int]] = field(default=None, compare=False, repr=False)
+    Self: Optional[int] = field(default=None, compare=False, repr=False)
+    Parameters: Optional[List[str]] = field(default=None, compare=False, repr=False)
+    Padding: Optional[List[None]] = field(default=None, compare=False, repr=False)
+    Frames: Optional[List[Any]] = field(default=None, compare=False, repr=False)
+    Pure: Optional[bool] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -295,6 +320,9 @@ class FunctionLiteral(Expression):
     Token: token.Token
     Parameters: List[Identifier]
     Body: BlockStatement
+    Free: Optional[List[str]] = field(default=None, compare=False, repr=False)
+    Captures: Optional[List[Tuple[int, int]]] = field(default=None, compare=False, repr=False)
+    Depth: int = field(default=0, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -324,6 +352,9 @@ class CallExpression(Expression):
     Token: token.Token
     Function: Expression
     Arguments: List[Expression]
+    Tail: bool = field(default=False, compare=False, repr=False)
+    Branch: bool = field(default=False, compare=False, repr=False)
+    Builtin: Optional[Any] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -351,6 +382,7 @@ class CallExpression(Expression):
 class StringLiteral(Expression):
     Token: token.Token
     Value: str
+    Constant: Optional[Any] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -400,6 +432,7 @@ class IndexExpression(Expression):
     Token: token.Token
     Left: Expression
     Index: Expression
+    Quick: Optional[Any] = field(default=None, compare=False, repr=False)
 
     @property
     def node(self) -> Node:
@@ -549,3 +582,66 @@ def Modify(node: Node, modifier: ModifierFunc) -> Node:
 
     node = modifier(node)
     return node
+
+
+def Children(node: Node) -> List[Node]:
+    children: List[Node] = []
+    if type(node) == Program:
+        children.extend(cast(Program, node).Statements)
+    elif type(node) == ExpressionStatement:
+        expression = cast(ExpressionStatement, node).ExpressionValue
+        if expression is not None:
+            children.append(expression)
+    elif type(node) == InfixExpression:
+        infix = cast(InfixExpression, node)
+        if infix.Left is not None:
+            children.append(infix.Left)
+        if infix.Right is not None:
+            children.append(infix.Right)
+    elif type(node) == PrefixExpression:
+        right = cast(PrefixExpression, node).Right
+        if right is not None:
+            children.append(right)
+    elif type(node) == IndexExpression:
+        index = cast(IndexExpression, node)
+        children.extend([index.Left, index.Index])
+    elif type(node) == IfExpression:
+        ie = cast(IfExpression, node)
+        children.extend([ie.Condition, ie.Consequence])
+        if ie.Alternative is not None:
+            children.append(ie.Alternative)
+    elif type(node) == BlockStatement:
+        children.extend(cast(BlockStatement, node).Statements)
+    elif type(node) == ReturnStatement:
+        children.append(cast(ReturnStatement, node).ReturnValue)
+    elif type(node) == LetStatement:
+        let = cast(LetStatement, node)
+        children.extend([let.Name, let.Value])
+    elif type(node) == FunctionLiteral:
+        fl = cast(FunctionLiteral, node)
+        children.extend(fl.Parameters)
+        children.append(fl.Body)
+    elif type(node) == MacroLiteral:
+        ml = cast(MacroLiteral, node)
+        children.extend(ml.Parameters)
+        children.append(ml.Body)
+    elif type(node) == CallExpression:
+        call = cast(CallExpression, node)
+        children.append(call.Function)
+        children.extend(call.Arguments)
+    elif type(node) == ArrayLiteral:
+        children.extend(cast(ArrayLiteral, node).Elements)
+    elif type(node) == HashLiteral:
+        for key, val in cast(HashLiteral, node).Pairs:
+            children.extend([key, val])
+    return children
+
+
+InspectFunc = Callable[[Node], bool]
+
+
+def Inspect(node: Node, f: InspectFunc) -> None:
+    if not f(node):
+        return
+    for child in Children(node):
+        Inspect(child, f)
@@ -0,0 +1,507 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+
+from monkey import ast, evaluator, inference, object
+
+# Compiled code takes the environment a node would be evaluated in and returns exactly what
+# evaluator.Eval would return for it.
+Code = Callable[[object.Environment], Optional[object.Object]]
+
+ERRORS = (object.Error, object.AnyObject)
+STOPS = (object.ReturnValue, object.Error, object.AnyObject)
+
+
+@dataclass
+class Promotion:
+    Body: str
+    Calls: int
+
+
+@dataclass
+class Tiering:
+    Enabled: bool = True
+    Threshold: int = 100
+    Promoted: List[Promotion] = field(default_factory=list)
+
+    def String(self) -> str:
+        out: List[str] = []
+        for promotion in self.Promoted:
+            out.append('promoted after %d calls: %s' % (promotion.Calls, promotion.Body))
+        return '\n'.join(out)
+
+
+tiering = Tiering()
+
+
+def Promote(body: ast.BlockStatement) -> Code:
+    code = Compile(body)
+    body.Compiled = code
+    tiering.Promoted.append(Promotion(Body=body.String(), Calls=body.Calls))
+    return code
+
+
+def Compile(node: Any) -> Code:
+    t = type(node)
+    if t == ast.BlockStatement:
+        return compileBlock(node)
+    elif t == ast.ExpressionStatement:
+        return Compile(node.ExpressionValue)
+    elif t == ast.IntegerLiteral:
+        return compileConstant(evaluator.literalConstant(node))
+    elif t == ast.Boolean:
+        return compileConstant(evaluator.nativeBoolToBooleanObject(node.Value))
+    elif t == ast.StringLiteral:
+        return compileConstant(evaluator.literalConstant(node))
+    elif t == ast.Identifier:
+        return compileIdentifier(node)
+    elif t == ast.PrefixExpression:
+        return compilePrefix(node)
+    elif t == ast.InfixExpression:
+        return compileInfix(node)
+    elif t == ast.IfExpression:
+        return compileIf(node)
+    elif t == ast.ReturnStatement:
+        return compileReturn(node)
+    elif t == ast.LetStatement:
+        return compileLet(node)
+    elif t == ast.FunctionLiteral:
+        return compileFunctionLiteral(node)
+    elif t == ast.CallExpression:
+        return compileCall(node)
+    elif t == ast.ArrayLiteral:
+        return compileArray(node)
+    elif t == ast.IndexExpression:
+        return compileIndex(node)
+    elif t == ast.HashLiteral:
+        return compileHash(node)
+
+    def interpret(env: object.Environment) -> Optional[object.Object]:
+        return evaluator.Eval(node, env)
+
+    return interpret
+
+
+def compileConstant(value: object.Object) -> Code:
+    def constant(env: object.Environment) -> Optional[object.Object]:
+        return value
+
+    return constant
+
+
+def compileBlock(node: ast.BlockStatement) -> Code:
+    codes = [Compile(s) for s in node.Statements]
+    if len(codes) == 1:
+        return codes[0]
+
+    def block(env: object.Environment) -> Optional[object.Object]:
+        result = None
+        for code in codes:
+            result = code(env)
+            if type(result) in STOPS:
+                return result
+        return result
+
+    return block
+
+
+def compileIdentifier(node: ast.Identifier) -> Code:
+    evalIdentifier = evaluator.evalIdentifier
+    if node.Builtin is not None:
+        return compileConstant(node.Builtin)
+
+    if node.Slot is not None and node.Depth == 0 and not node.Cell:
+        slot = node.Slot
+
+        def local(env: object.Environment) -> Optional[object.Object]:
+            val = cast(object.Frame, env).slots[slot]
+            if val is None:
+                return evalIdentifier(node, env)
+            return val
+
+        return local
+
+    def identifier(env: object.Environment) -> Optional[object.Object]:
+        return evalIdentifier(node, env)
+
+    return identifier
+
+
+def compilePrefix(node: ast.PrefixExpression) -> Code:
+    if node.Kind is not None:
+        typed = compileTyped(node)
+        if typed is not None:
+            return typed
+
+    right = Compile(node.Right)
+    evalQuickPrefix = evaluator.evalQuickPrefix
+
+    def prefix(env: object.Environment) -> Optional[object.Object]:
+        val = right(env)
+        if val is None:
+            return None
+        if type(val) in ERRORS:
+            return val
+        return evalQuickPrefix(node, val)
+
+    return prefix
+
+
+def compileInfix(node: ast.InfixExpression) -> Code:
+    if node.Kind is not None:
+        typed = compileTyped(node)
+        if typed is not None:
+            return typed
+
+    left = Compile(node.Left)
+    right = Compile(node.Right)
+    evalQuickInfix = evaluator.evalQuickInfix
+    Integer = object.Integer
+    # The operator is known now, so integer operands need no dispatch at all.
+    integerOperator = integerOperators.get(node.Operator)
+
+    def infix(env: object.Environment) -> Optional[object.Object]:
+        leftValue = left(env)
+        if leftValue is None:
+            return None
+        if type(leftValue) in ERRORS:
+            return leftValue
+        rightValue = right(env)
+        if rightValue is None:
+            return None
+        if type(rightValue) in ERRORS:
+            return rightValue
+        if (integerOperator is not None and type(leftValue) == Integer
+                and type(rightValue) == Integer):
+            return integerOperator(leftValue.Value, rightValue.Value)
+        return evalQuickInfix(node, leftValue, rightValue)
+
+    return infix
+
+
+integerOperators: Dict[str, Callable[[int, int], object.Object]] = {
+    '+': lambda a, b: object.NewInteger(a + b),
+    '-': lambda a, b: object.NewInteger(a - b),
+    '*': lambda a, b: object.NewInteger(a * b),
+    '<': lambda a, b: evaluator.TRUE if a < b else evaluator.FALSE,
+    '>': lambda a, b: evaluator.TRUE if a > b else evaluator.FALSE,
+    '==': lambda a, b: evaluator.TRUE if a == b else evaluator.FALSE,
+    '!=': lambda a, b: evaluator.TRUE if a != b else evaluator.FALSE,
+}
+
+
+def compileTyped(node: Any) -> Optional[Code]:
+    # Inference has proven the node always produces a value of its Kind, so it can compute on
+    # Python values and box only its result.
+    if node.Kind == inference.BOOLEAN:
+        return compileComparison(node)
+    if node.Kind == inference.STRING:
+        # Joining the boxed strings keeps long results as ropes.
+        return None
+
+    unboxed = compileUnboxed(node)
+    if unboxed is None:
+        return None
+    box = object.NewInteger
+
+    def typed(env: object.Environment) -> Optional[object.Object]:
+        return box(unboxed(env))
+
+    return typed
+
+
+def compileComparison(node: Any) -> Optional[Code]:
+    if type(node) != ast.InfixExpression or node.Operator not in ('<', '>', '==', '!='):
+        return None
+    left = compileUnboxed(node.Left)
+    right = compileUnboxed(node.Right)
+    if left is None or right is None:
+        return None
+    TRUE = evaluator.TRUE
+    FALSE = evaluator.FALSE
+
+    if node.Operator == '<':
+
+        def less(env: object.Environment) -> Optional[object.Object]:
+            return TRUE if left(env) < right(env) else FALSE
+
+        return less
+    elif node.Operator == '>':
+
+        def greater(env: object.Environment) -> Optional[object.Object]:
+            return TRUE if left(env) > right(env) else FALSE
+
+        return greater
+    elif node.Operator == '==':
+
+        def equal(env: object.Environment) -> Optional[object.Object]:
+            return TRUE if left(env) == right(env) else FALSE
+
+        return equal
+
+    def notEqual(env: object.Environment) -> Optional[object.Object]:
+        return TRUE if left(env) != right(env) else FALSE
+
+    return notEqual
+
+
+Unboxed = Callable[[object.Environment], Any]
+
+
+def compileUnboxed(node: Any) -> Optional[Unboxed]:
+    # Code computing the Python int or str of a node that always produces one; None otherwise.
+    t = type(node)
+    if t == ast.IntegerLiteral or t == ast.StringLiteral:
+        value = node.Value
+
+        def constant(env: object.Environment) -> Any:
+            return value
+
+        return constant
+
+    if t not in UNBOXED_NODES or node.Kind not in (inference.INTEGER, inference.STRING):
+        return None
+
+    if t == ast.Identifier:
+        boxed = compileIdentifier(node)
+
+        def identifier(env: object.Environment) -> Any:
+            return cast(object.Object, boxed(env)).Value
+
+        return identifier
+    elif t == ast.PrefixExpression:
+        right = compileUnboxed(node.Right)
+        if right is None or node.Operator != '-':
+            return None
+
+        def negate(env: object.Environment) -> Any:
+            return -right(env)
+
+        return negate
+
+    left = compileUnboxed(node.Left)
+    right = compileUnboxed(node.Right)
+    if left is None or right is None:
+        return None
+
+    if node.Operator == '+':
+
+        def add(env: object.Environment) -> Any:
+            return left(env) + right(env)
+
+        return add
+    elif node.Operator == '-':
+
+        def subtract(env: object.Environment) -> Any:
+            return left(env) - right(env)
+
+        return subtract
+    elif node.Operator == '*':
+
+        def multiply(env: object.Environment) -> Any:
+            return left(env) * right(env)
+
+        return multiply
+    return None
+
+
+UNBOXED_NODES = (ast.Identifier, ast.PrefixExpression, ast.InfixExpression)
+
+
+def compileIf(node: ast.IfExpression) -> Code:
+    condition = Compile(node.Condition)
+    consequence = Compile(node.Consequence)
+    alternative = Compile(node.Alternative) if node.Alternative is not None else None
+    NULL = evaluator.NULL
+
+    def branch(env: object.Environment) -> Optional[object.Object]:
+        c = condition(env)
+        if c is None:
+            return NULL
+        t = type(c)
+        if t in ERRORS:
+            return c
+        if t == object.Boolean:
+            truthy = c.Value
+        else:
+            truthy = t != object.Null
+        if truthy:
+            evaluated = consequence(env)
+        elif alternative is not None:
+            evaluated = alternative(env)
+        else:
+            return NULL
+        if evaluated is None:
+            return NULL
+        return evaluated
+
+    return branch
+
+
+def compileReturn(node: ast.ReturnStatement) -> Code:
+    value = Compile(node.ReturnValue)
+    ReturnValue = object.ReturnValue
+
+    def ret(env: object.Environment) -> Optional[object.Object]:
+        val = value(env)
+        if val is None:
+            return None
+        if type(val) in ERRORS:
+            return val
+        return ReturnValue(Value=val)
+
+    return ret
+
+
+def compileLet(node: ast.LetStatement) -> Code:
+    value = Compile(node.Value)
+    name = node.Name
+    bindName = evaluator.bindName
+
+    if name.Slot is not None and name.Depth == 0 and not name.Cell:
+        slot = name.Slot
+
+        def local(env: object.Environment) -> Optional[object.Object]:
+            val = value(env)
+            if val is not None:
+                if type(val) in ERRORS:
+                    return val
+                cast(object.Frame, env).slots[slot] = val
+            return None
+
+        return local
+
+    def let(env: object.Environment) -> Optional[object.Object]:
+        val = value(env)
+        if val is not None:
+            if type(val) in ERRORS:
+                return val
+            bindName(name, val, env)
+        return None
+
+    return let
+
+
+def compileFunctionLiteral(node: ast.FunctionLiteral) -> Code:
+    evalFunctionLiteral = evaluator.evalFunctionLiteral
+
+    # The body is compiled on its own once the function it makes gets hot.
+    def function(env: object.Environment) -> Optional[object.Object]:
+        return evalFunctionLiteral(node, env)
+
+    return function
+
+
+def compileCall(node: ast.CallExpression) -> Code:
+    if node.Function.TokenLiteral() == 'quote':
+        quote = evaluator.quote
+
+        def quoted(env: object.Environment) -> Optional[object.Object]:
+            return quote(node.Arguments[0], env)
+
+        return quoted
+
+    arguments = [Compile(a) for a in node.Arguments]
+    applyFunction = evaluator.applyFunction
+
+    if node.Builtin is not None:
+        builtin = cast(object.Builtin, node.Builtin)
+        fn = builtin.Fn
+        count = len(arguments)
+
+        def builtinCall(env: object.Environment) -> Optional[object.Object]:
+            args = evalCodes(arguments, env)
+            if len(args) == 1 and type(args[0]) in ERRORS:
+                return args[0]
+            if len(args) != count:
+                return applyFunction(builtin, args)
+            return fn(*args)
+
+        return builtinCall
+
+    function = Compile(node.Function)
+    tail = node.Tail
+    branch = node.Branch
+    Function = object.Function
+    TAIL_CALL = evaluator.TAIL_CALL
+
+    def call(env: object.Environment) -> Optional[object.Object]:
+        fn = function(env)
+        if type(fn) in ERRORS:
+            return fn
+        args = evalCodes(arguments, env)
+        if len(args) == 1 and type(args[0]) in ERRORS:
+            return args[0]
+        if fn is None:
+            return None
+        if tail and type(fn) == Function:
+            TAIL_CALL.Function = fn
+            TAIL_CALL.Arguments = args
+            TAIL_CALL.Branch = branch
+            return TAIL_CALL
+        return applyFunction(fn, args)
+
+    return call
+
+
+def evalCodes(codes: List[Code], env: object.Environment) -> List[object.Object]:
+    result: List[object.Object] = []
+    for code in codes:
+        evaluated = code(env)
+        if evaluated is not None:
+            if type(evaluated) in ERRORS:
+                return [object.AnyObject(evaluated)]
+            result.append(evaluated)
+    return result
+
+
+def compileArray(node: ast.ArrayLiteral) -> Code:
+    elements = [Compile(e) for e in node.Elements]
+
+    def array(env: object.Environment) -> Optional[object.Object]:
+        evaluated = evalCodes(elements, env)
+        if len(evaluated) == 1 and type(evaluated[0]) in ERRORS:
+            return evaluated[0]
+        return object.Array(Elements=evaluated)
+
+    return array
+
+
+def compileIndex(node: ast.IndexExpression) -> Code:
+    left = Compile(node.Left)
+    index = Compile(node.Index)
+    evalQuickIndex = evaluator.evalQuickIndex
+
+    def indexed(env: object.Environment) -> Optional[object.Object]:
+        leftValue = left(env)
+        if leftValue is None:
+            return None
+        if type(leftValue) in ERRORS:
+            return leftValue
+        indexValue = index(env)
+        if indexValue is None:
+            return None
+        if type(indexValue) in ERRORS:
+            return indexValue
+        return evalQuickIndex(node, leftValue, indexValue)
+
+    return indexed
+
+
+def compileHash(node: ast.HashLiteral) -> Code:
+    pairs = [(Compile(k), Compile(v)) for k, v in node.Pairs]
+    newHash = evaluator.newHash
+
+    def hashed(env: object.Environment) -> Optional[object.Object]:
+        evaluated: List[Tuple[object.Object, object.Object]] = []
+        for keyCode, valueCode in pairs:
+            key = keyCode(env)
+            if type(key) in ERRORS:
+                return key
+            value = valueCode(env)
+            if type(value) in ERRORS:
+                return value
+            if key is not None and value is not None:
+                evaluated.append((key, value))
+        return newHash(evaluated)
+
+    return hashed
@@ -1,12 +1,34 @@
-import copy
-from typing import Any, Dict, List, Optional, Tuple, cast
-
-from monkey import ast, object, token
+import atexit
+import operator
+import sys
+import weakref
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import compress, repeat
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, cast
+
+from monkey import ast, compiler, hamt, object, token
 
 NULL = object.Null()
 TRUE = object.Boolean(Value=True)
 FALSE = object.Boolean(Value=False)
 
+# A call in tail position hands its callee back to applyFunction instead of recursing. The value
+# travels straight up to the enclosing applyFunction before anything else is evaluated, so one
+# shared instance is enough.
+TAIL_CALL = object.TailCall(Function=None, Arguments=[], Branch=False)
+
+ERRORS = (object.Error, object.AnyObject)
+
+# Frames of functions that make no closures are reused, up to this many per function.
+FRAME_POOL_SIZE = 16
+# Results a memoized function keeps unless memo is given another capacity.
+MEMO_CAPACITY = 1024
+# Characters puts collects before writing them out.
+OUTPUT_THRESHOLD = 1 << 16
+NO_SLOTS: List[Any] = []
+
 
 def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
     if type(node) == ast.Program:
@@ -14,7 +36,9 @@ def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
     elif type(node) == ast.ExpressionStatement:
         return Eval(node.ExpressionValue, env)
     elif type(node) == ast.IntegerLiteral:
-        return object.Integer(Value=node.Value)
+        if node.Constant is None:
+            return literalConstant(node)
+        return node.Constant
     elif type(node) == ast.Boolean:
         return nativeBoolToBooleanObject(node.Value)
     elif type(node) == ast.PrefixExpression:
@@ -22,7 +46,7 @@ def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
         if right:
             if isError(right):
                 return right
-            return evalPrefixExpression(node.Operator, right)
+            return evalQuickPrefix(node, right)
         else:
             return None
     elif type(node) == ast.InfixExpression:
@@ -36,7 +60,7 @@ def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
             return None
         if isError(right):
             return right
-        evaluated = evalInfixExpression(node.Operator, left, right)
+        evaluated = evalQuickInfix(node, left, right)
         return evaluated
     elif type(node) == ast.BlockStatement:
         return evalBlockStatement(node, env)
@@ -55,30 +79,36 @@ def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
         if val:
             if isError(val):
                 return val
-            env.Set(node.Name.Value, val)
+            bindName(node.Name, val, env)
         else:
             return None
     elif type(node) == ast.Identifier:
         return evalIdentifier(node, env)
     elif type(node) == ast.FunctionLiteral:
-        params = node.Parameters
-        body = node.Body
-        return object.Function(Parameters=params, Env=env, Body=body)
+        return evalFunctionLiteral(node, env)
     elif type(node) == ast.CallExpression:
+        if node.Builtin is not None:
+            return evalBuiltinCall(node, env)
         if node.Function.TokenLiteral() == 'quote':
             return quote(node.Arguments[0], env)
         function = Eval(node.Function, env)
-        if function:
-            if isError(function):
-                return function
+        if type(function) in ERRORS:
+            return function
         args = evalExpressions(node.Arguments, env)
         if len(args) == 1 and isError(args[0]):
             return args[0]
         if not function:
             return None
+        if node.Tail and type(function) == object.Function:
+            TAIL_CALL.Function = function
+            TAIL_CALL.Arguments = args
+            TAIL_CALL.Branch = node.Branch
+            return TAIL_CALL
         return applyFunction(function, args)
     elif type(node) == ast.StringLiteral:
-        return object.String(Value=node.Value)
+        if node.Constant is None:
+            return literalConstant(node)
+        return node.Constant
     elif type(node) == ast.ArrayLiteral:
         elements = evalExpressions(node.Elements, env)
         if len(elements) == 1 and isError(elements[0]):
@@ -95,7 +125,7 @@ def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
             return None
         if isError(index):
             return index
-        return evalIndexExpression(left, index)
+        return evalQuickIndex(node, left, index)
     elif type(node) == ast.HashLiteral:
         return evalHashLiteral(node, env)
     return None
@@ -122,11 +152,11 @@ def evalPrefixExpression(operator: str, right: object.Object) -> object.Object:
 
 
 def evalBangOperatorExpression(right: Optional[object.Object]) -> object.Object:
-    if right == TRUE:
+    if right is TRUE:
         return FALSE
-    elif right == FALSE:
+    elif right is FALSE:
         return TRUE
-    elif right == NULL:
+    elif right is NULL:
         return TRUE
     else:
         return FALSE
@@ -139,7 +169,7 @@ def evalMinusPrefixOperatorExpression(right: Optional[object.Object]) -> object.
         return newError('unknown operator: -%s', (right.Type.TypeName, ))
 
     value = right.Value
-    return object.Integer(Value=-value)
+    return object.NewInteger(-value)
 
 
 def evalInfixExpression(operator: str, left: object.Object, right: object.Object) -> object.Object:
@@ -164,11 +194,11 @@ def evalIntegerInfixExpression(operator: str, left: object.Object,
     leftVal = left.Value
     rightVal = right.Value
     if operator == '+':
-        return object.Integer(Value=leftVal + rightVal)
+        return object.NewInteger(leftVal + rightVal)
     elif operator == '-':
-        return object.Integer(Value=leftVal - rightVal)
+        return object.NewInteger(leftVal - rightVal)
     elif operator == '*':
-        return object.Integer(Value=leftVal * rightVal)
+        return object.NewInteger(leftVal * rightVal)
     elif operator == '/':
         return object.Integer(Value=leftVal / rightVal)
     elif operator == '<':
@@ -190,9 +220,7 @@ def evalStringInfixExpression(operator: str, left: object.Object,
         return newError('unknown operator: %s %s %s',
                         (left.Type.TypeName, operator, right.Type.TypeName))
 
-    leftVal = left.Value
-    rightVal = right.Value
-    return object.String(Value=leftVal + rightVal)
+    return object.Concat(cast(object.String, left), cast(object.String, right))
 
 
 def evalIfExpression(ie: ast.IfExpression, env: object.Environment) -> object.Object:
@@ -221,13 +249,16 @@ def evalIfExpression(ie: ast.IfExpression, env: object.Environment) -> object.Ob
 
 def evalProgram(program: ast.Program, env: object.Environment) -> Optional[object.Object]:
     result: Optional[object.Object] = None
-    for statement in program.Statements:
-        result = Eval(statement, env)
-        if type(result) == object.ReturnValue:
-            if result is not None:
-                return result.Value
-        elif type(result) == object.Error:
-            return result
+    try:
+        for statement in program.Statements:
+            result = Eval(statement, env)
+            if type(result) == object.ReturnValue:
+                if result is not None:
+                    return result.Value
+            elif type(result) == object.Error:
+                return result
+    finally:
+        output.Flush()
 
     return result
 
@@ -247,7 +278,10 @@ def evalBlockStatement(block: ast.BlockStatement,
 
 
 def evalIdentifier(node: ast.Identifier, env: object.Environment) -> Optional[object.Object]:
-    val = env.Get(node.Value)
+    if node.Builtin is not None:
+        return node.Builtin
+
+    val = lookupName(node, env)
     if val:
         return val
 
@@ -258,13 +292,73 @@ def evalIdentifier(node: ast.Identifier, env: object.Environment) -> Optional[ob
     return newError('identifier not found: ' + node.Value, tuple())
 
 
+def lookupName(node: ast.Identifier, env: object.Environment) -> Optional[object.Object]:
+    depth = node.Depth
+    if depth is None:
+        return lookupCached(node, env)
+
+    scope: Any = env
+    for _ in range(depth):
+        scope = scope.outer
+
+    slot = node.Slot
+    if slot is None:
+        return scope.Get(node.Value)
+
+    val = scope.slots[slot]
+    if node.Cell:
+        val = val.Value
+    if val is None and scope.outer is not None:
+        # A let that has not run yet leaves its slot empty; the name then still refers to
+        # whatever an enclosing scope binds, as it would without the resolver.
+        val = scope.outer.Get(node.Value)
+    return val
+
+
+def lookupCached(node: ast.Identifier, env: object.Environment) -> Optional[object.Object]:
+    # Environments never change their outer once something can refer to them, so a node that
+    # runs in a scope with the same outer as before walks the same chain as before. The cache
+    # only holds weak references, so it does not keep finished calls' environments alive; while
+    # that outer is alive, so is the outermost environment its chain leads to.
+    cache = object.LOOKUP_CACHE
+    outer = env.outer
+    if (node.CacheEpoch == cache.Epoch and outer is not None and node.CacheOuter() is outer
+            and type(env) == object.Environment):
+        val = node.CacheEnv().store.get(node.Value)
+        if val:
+            return val
+
+    val = env.Get(node.Value)
+    if val and env.outer is not None and node.Value not in cache.LocalNames:
+        # The name can only have been found in the outermost environment. Frames bind names in
+        # slots without going through Set, so chains through them are not cached.
+        scope = env
+        while type(scope) == object.Environment and scope.outer is not None:
+            scope = scope.outer
+        if type(scope) == object.Environment:
+            node.CacheOuter = weakref.ref(env.outer)
+            node.CacheEnv = weakref.ref(scope)
+            node.CacheEpoch = cache.Epoch
+    return val
+
+
+def bindName(node: ast.Identifier, val: object.Object, env: object.Environment) -> None:
+    if node.Slot is not None and node.Depth == 0:
+        if node.Cell:
+            cast(object.Frame, env).slots[node.Slot].Value = val
+        else:
+            cast(object.Frame, env).slots[node.Slot] = val
+    else:
+        env.Set(node.Value, val)
+
+
 def evalExpressions(exps: List[ast.Expression], env: object.Environment) -> List[object.Object]:
     result: List[object.Object] = []
 
     for e in exps:
         evaluated = Eval(e, env)
-        if evaluated:
-            if isError(evaluated):
+        if evaluated is not None:
+            if type(evaluated) in ERRORS:
                 return [object.AnyObject(evaluated)]
             result.append(evaluated)
 
@@ -277,6 +371,8 @@ def evalIndexExpression(left: object.Object, index: object.Object) -> object.Obj
         if not value:
             return NULL
         return value
+    elif left.Type.TypeName == object.INT_ARRAY_OBJ and index.Type.TypeName == object.INTEGER_OBJ:
+        return quickIntArrayIndex(left, index)
     elif left.Type.TypeName == object.HASH_OBJ:
         value = evalHashIndexExpression(left, index)
         if not value:
@@ -289,16 +385,16 @@ def evalIndexExpression(left: object.Object, index: object.Object) -> object.Obj
 def evalArrayIndexExpression(array: object.Object, index: object.Object) -> Optional[object.Object]:
     arrayObject = cast(object.Array, array)
     idx = index.Value
-    max = int(len(arrayObject.Elements) - 1)
+    max = int(arrayObject.end - arrayObject.start - 1)
 
     if idx < 0 or idx > max:
         return None
 
-    return arrayObject.Elements[idx]
+    return arrayObject.store[arrayObject.start + idx]
 
 
 def evalHashLiteral(node: ast.HashLiteral, env: object.Environment) -> object.Object:
-    pairs: List[Tuple[object.HashKey, object.HashPair]] = []
+    pairs: List[Tuple[object.Object, object.Object]] = []
 
     for keyNode, valueNode in node.Pairs:
         key = Eval(keyNode, env)
@@ -306,22 +402,29 @@ def evalHashLiteral(node: ast.HashLiteral, env: object.Environment) -> object.Ob
             if isError(key):
                 return key
 
-        hashKey = key
-        if not hashKey:
-            if key:
-                return newError('unusable as hash key: %s', (key.Type.TypeName, ))
-
         value = Eval(valueNode, env)
         if value:
             if isError(value):
                 return value
 
-        if hashKey:
-            hashed = object.GetHashKey(hashKey)
-            if key and value:
-                pairs.append((hashed, object.HashPair(Key=key, Value=value)))
+        if key and value:
+            pairs.append((key, value))
 
-    return object.Hash(Pairs=pairs)
+    return newHash(pairs)
+
+
+def newHash(pairs: List[Tuple[object.Object, object.Object]]) -> object.Object:
+    hashed: Dict[object.HashKey, object.HashPair] = {}
+
+    for key, value in pairs:
+        hashKey = object.GetHashKey(key)
+        if hashKey is None:
+            return newError('unusable as hash key: %s', (key.Type.TypeName, ))
+        # The first of duplicate keys is the one that lookups find.
+        if hashKey not in hashed:
+            hashed[hashKey] = object.HashPair(Key=key, Value=value)
+
+    return object.Hash(Pairs=hashed)
 
 
 def evalHashIndexExpression(hash: object.Object, index: object.Object) -> Optional[object.Object]:
@@ -329,37 +432,262 @@ def evalHashIndexExpression(hash: object.Object, index: object.Object) -> Option
     key = index
     if not key:
         return newError('unusable as hash key: %s', (index.Type.TypeName, ))
-    # TODO: not hashable
-    if not type(key) in (object.String, object.Integer, object.Boolean):
+    hashKey = object.GetHashKey(key)
+    if hashKey is None:
         return newError('unusable as hash key: %s', (index.Type.TypeName, ))
 
     hash = cast(object.Hash, hashObject)
-    pair = object.GetHashPair(hash, object.GetHashKey(key))
+    pair = object.GetHashPair(hash, hashKey)
     if not pair:
         return NULL
 
     return pair.Value
 
 
+# Quickening: operator nodes remember a handler specialized for the operand types seen on their
+# first evaluation. A specialized handler returns None when its guard fails, and the node then
+# falls back to the generic handler for good.
+def evalQuickInfix(node: ast.InfixExpression, left: object.Object,
+                   right: object.Object) -> object.Object:
+    quick = node.Quick
+    if quick is None:
+        quick = quickInfix.get((node.Operator, type(left), type(right)), evalInfixExpression)
+        node.Quick = quick
+    result = quick(node.Operator, left, right)
+    if result is None:
+        node.Quick = evalInfixExpression
+        result = evalInfixExpression(node.Operator, left, right)
+    return result
+
+
+def evalQuickPrefix(node: ast.PrefixExpression, right: object.Object) -> object.Object:
+    quick = node.Quick
+    if quick is None:
+        quick = quickPrefix.get((node.Operator, type(right)), evalPrefixExpression)
+        node.Quick = quick
+    result = quick(node.Operator, right)
+    if result is None:
+        node.Quick = evalPrefixExpression
+        result = evalPrefixExpression(node.Operator, right)
+    return result
+
+
+def evalQuickIndex(node: ast.IndexExpression, left: object.Object,
+                   index: object.Object) -> object.Object:
+    quick = node.Quick
+    if quick is None:
+        quick = quickIndex.get((type(left), type(index)), evalIndexExpression)
+        node.Quick = quick
+    result = quick(left, index)
+    if result is None:
+        node.Quick = evalIndexExpression
+        result = evalIndexExpression(left, index)
+    return result
+
+
+def quickIntegerAdd(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return object.NewInteger(left.Value + right.Value)
+    return None
+
+
+def quickIntegerSubtract(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return object.NewInteger(left.Value - right.Value)
+    return None
+
+
+def quickIntegerMultiply(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return object.NewInteger(left.Value * right.Value)
+    return None
+
+
+def quickIntegerLess(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return TRUE if left.Value < right.Value else FALSE
+    return None
+
+
+def quickIntegerGreater(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return TRUE if left.Value > right.Value else FALSE
+    return None
+
+
+def quickIntegerEqual(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return TRUE if left.Value == right.Value else FALSE
+    return None
+
+
+def quickIntegerNotEqual(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Integer and type(right) == object.Integer:
+        return TRUE if left.Value != right.Value else FALSE
+    return None
+
+
+def quickStringConcat(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.String and type(right) == object.String:
+        return object.Concat(left, right)
+    return None
+
+
+def quickBooleanEqual(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Boolean and type(right) == object.Boolean:
+        return TRUE if left.Value == right.Value else FALSE
+    return None
+
+
+def quickBooleanNotEqual(operator: str, left: Any, right: Any) -> Optional[object.Object]:
+    if type(left) == object.Boolean and type(right) == object.Boolean:
+        return TRUE if left.Value != right.Value else FALSE
+    return None
+
+
+def quickIntegerNegate(operator: str, right: Any) -> Optional[object.Object]:
+    if type(right) == object.Integer:
+        return object.NewInteger(-right.Value)
+    return None
+
+
+def quickBooleanNot(operator: str, right: Any) -> Optional[object.Object]:
+    if type(right) == object.Boolean:
+        return FALSE if right.Value else TRUE
+    return None
+
+
+def quickArrayIndex(left: Any, index: Any) -> Optional[object.Object]:
+    if type(left) == object.Array and type(index) == object.Integer:
+        idx = index.Value
+        if 0 <= idx < left.end - left.start:
+            return left.store[left.start + idx]
+        return NULL
+    return None
+
+
+def quickIntArrayIndex(left: Any, index: Any) -> Optional[object.Object]:
+    if type(left) == object.IntArray and type(index) == object.Integer:
+        idx = index.Value
+        if 0 <= idx < len(left.Values):
+            return object.NewInteger(left.Values[idx])
+        return NULL
+    return None
+
+
+def quickHashStringIndex(left: Any, index: Any) -> Optional[object.Object]:
+    if type(left) == object.Hash and type(index) == object.String:
+        pair = object.GetHashPair(left, object.GetHashKeyString(index))
+        if not pair:
+            return NULL
+        return pair.Value
+    return None
+
+
+quickInfix: Dict[Tuple[str, type, type], Any] = {
+    ('+', object.Integer, object.Integer): quickIntegerAdd,
+    ('-', object.Integer, object.Integer): quickIntegerSubtract,
+    ('*', object.Integer, object.Integer): quickIntegerMultiply,
+    ('<', object.Integer, object.Integer): quickIntegerLess,
+    ('>', object.Integer, object.Integer): quickIntegerGreater,
+    ('==', object.Integer, object.Integer): quickIntegerEqual,
+    ('!=', object.Integer, object.Integer): quickIntegerNotEqual,
+    ('+', object.String, object.String): quickStringConcat,
+    ('==', object.Boolean, object.Boolean): quickBooleanEqual,
+    ('!=', object.Boolean, object.Boolean): quickBooleanNotEqual,
+}
+
+quickPrefix: Dict[Tuple[str, type], Any] = {
+    ('-', object.Integer): quickIntegerNegate,
+    ('!', object.Boolean): quickBooleanNot,
+}
+
+quickIndex: Dict[Tuple[type, type], Any] = {
+    (object.Array, object.Integer): quickArrayIndex,
+    (object.IntArray, object.Integer): quickIntArrayIndex,
+    (object.Hash, object.String): quickHashStringIndex,
+}
+
+
 def applyFunction(fn: object.Object, args: List[object.Object]) -> Optional[object.Object]:
     if type(fn) == object.Function:
-        function = cast(object.Function, fn)
-        if not function:
-            return newError('not a function: %s', (fn.Type.TypeName, ))
+        function: Any = fn
+        if len(args) != len(function.Parameters):
+            return newError('wrong number of arguments. got=%s, want=%s',
+                            (len(args), len(function.Parameters)))
 
         extendedEnv = extendFunctionEnv(function, args)
-        evaluated = Eval(function.Body, extendedEnv)
-        if evaluated is not None:
-            return unwrapReturnValue(evaluated)
-        else:
-            return None
+        tiering = compiler.tiering
+        branch = False
+        while True:
+            body = function.Body
+            if tiering.Enabled:
+                code = body.Compiled
+                if code is None:
+                    body.Calls += 1
+                    if body.Calls >= tiering.Threshold:
+                        code = compiler.Promote(body)
+                if code is not None:
+                    evaluated = code(extendedEnv)
+                else:
+                    evaluated = Eval(body, extendedEnv)
+            else:
+                evaluated = Eval(body, extendedEnv)
+            if type(evaluated) == object.ReturnValue:
+                evaluated = evaluated.Value
+            if evaluated is not TAIL_CALL:
+                if not body.Closes:
+                    releaseFrame(body, extendedEnv)
+                if evaluated is None and branch:
+                    return NULL
+                return evaluated
+
+            # The shared TAIL_CALL must not keep the call's arguments alive once it is made.
+            callee, arguments = TAIL_CALL.Function, TAIL_CALL.Arguments
+            TAIL_CALL.Function = TAIL_CALL.Arguments = None
+            # An if expression turns nothing into NULL, and one that a call in this chain
+            # was made from has been left without seeing the result.
+            branch = branch or TAIL_CALL.Branch
+            if len(arguments) != len(callee.Parameters):
+                return newError('wrong number of arguments. got=%s, want=%s',
+                                (len(arguments), len(callee.Parameters)))
+
+            # Nothing can have captured the frame unless the body creates closures, so a tail
+            # call rebinds it in place rather than allocating a new one.
+            if function.Body.Closes:
+                extendedEnv = extendFunctionEnv(callee, arguments)
+            else:
+                extendedEnv = rebindFunctionEnv(extendedEnv, callee, arguments)
+            function = callee
     elif type(fn) == object.Builtin:
         builtin = cast(object.Builtin, fn)
-        return builtin.Fn(args)
+        if builtin.Arity is not None and len(args) != builtin.Arity:
+            return newError('wrong number of arguments. got=%s, want=%s',
+                            (len(args), builtin.Arity))
+        return builtin.Fn(*args)
     else:
         return newError('not a function: %s', (fn.Type.TypeName, ))
 
 
+def evalBuiltinCall(node: ast.CallExpression, env: object.Environment) -> Optional[object.Object]:
+    # The resolver only sets node.Builtin when the argument count matches the builtin's arity.
+    builtin = cast(object.Builtin, node.Builtin)
+    if len(node.Arguments) == 1:
+        arg = Eval(node.Arguments[0], env)
+        if arg is None:
+            return applyFunction(builtin, [])
+        if isError(arg):
+            return object.AnyObject(arg)
+        return builtin.Fn(arg)
+
+    args = evalExpressions(node.Arguments, env)
+    if len(args) == 1 and isError(args[0]):
+        return args[0]
+    if len(args) != len(node.Arguments):
+        return applyFunction(builtin, args)
+    return builtin.Fn(*args)
+
+
 def quote(node: ast.Node, env: object.Environment) -> object.Object:
     node = evalUnquoteCalls(node, env)
     return object.Quote(Node=node)
@@ -415,12 +743,143 @@ def convertObjectToASTNode(obj: object.Object) -> ast.Node:
 
 
 def extendFunctionEnv(fn: object.Function, args: List[object.Object]) -> object.Environment:
-    env = object.NewEnclosedEnvironment(fn.Env)
+    # The caller has checked that there is one argument per parameter.
+    body = fn.Body
+    names = body.Slots
+    if names is not None:
+        padding: Any = body.Padding
+        slots = args + padding
+        if body.Self is not None:
+            slots[body.Self] = fn
+        if body.Cells:
+            for i in body.Cells:
+                slots[i] = object.Cell(Value=slots[i])
+        frames = body.Frames
+        if frames:
+            frame = frames.pop()
+            frame.slots = slots
+            frame.outer = fn.Env
+            return frame
+        return object.NewFrame(slots, names, fn.Env)
+
+    params = body.Parameters
+    if params is None:
+        params = body.Parameters = [p.Value for p in fn.Parameters]
+    bindLocalNames(params)
+    return object.Environment(store=dict(zip(params, args)), outer=fn.Env)
+
+
+def bindLocalNames(names: List[str]) -> None:
+    localNames = object.LOOKUP_CACHE.LocalNames
+    if not localNames.issuperset(names):
+        for name in names:
+            if name not in localNames:
+                object.BindLocalName(name)
+
+
+def releaseFrame(body: ast.BlockStatement, env: object.Environment) -> None:
+    # Nothing can refer to the frame of a call that made no closures once the call is over.
+    if body.Closes or type(env) != object.Frame:
+        return
+    frame: Any = env
+    frames = body.Frames
+    if frames is None or frame.names is not body.Slots or len(frames) >= FRAME_POOL_SIZE:
+        return
+    frame.slots = NO_SLOTS
+    frame.outer = None
+    frame.store = object.FRAME_STORE
+    frames.append(frame)
+
+
+def rebindFunctionEnv(env: object.Environment, fn: object.Function,
+                      args: List[object.Object]) -> object.Environment:
+    names = fn.Body.Slots
+    if type(env) == object.Frame:
+        frame = cast(object.Frame, env)
+        if frame.names is not names:
+            return extendFunctionEnv(fn, args)
+        padding: Any = fn.Body.Padding
+        slots = args + padding
+        if fn.Body.Self is not None:
+            slots[fn.Body.Self] = fn
+        frame.slots = slots
+        frame.outer = fn.Env
+        return frame
+    elif names is not None:
+        return extendFunctionEnv(fn, args)
+
+    params = fn.Body.Parameters
+    if params is None:
+        params = fn.Body.Parameters = [p.Value for p in fn.Parameters]
+    bindLocalNames(params)
+    env.store.clear()
+    env.store.update(zip(params, args))
+    env.outer = fn.Env
+    return env
 
-    for paramIdx, param in enumerate(fn.Parameters):
-        env.Set(param.Value, args[paramIdx])
 
-    return env
+def evalFunctionLiteral(node: ast.FunctionLiteral, env: object.Environment) -> object.Function:
+    body = node.Body
+    if not body.TailCallsMarked:
+        markTailCalls(body)
+    if node.Captures is not None:
+        env = captureEnv(node, env)
+    return object.Function(Parameters=node.Parameters, Env=env, Body=body)
+
+
+def captureEnv(node: ast.FunctionLiteral, env: object.Environment) -> object.Environment:
+    # A resolved function only keeps the cells of its free variables, in front of the globals.
+    scope: Any = env
+    for _ in range(node.Depth):
+        scope = scope.outer
+    captures = cast(List[Tuple[int, int]], node.Captures)
+    if not captures:
+        return scope
+
+    cells: List[Any] = []
+    for depth, slot in captures:
+        frame = env if depth == 0 else env.outer
+        cells.append(cast(object.Frame, frame).slots[slot])
+    return object.NewFrame(cells, cast(List[str], node.Free), scope)
+
+
+def markTailCalls(body: ast.BlockStatement) -> None:
+    def closes(node: ast.Node) -> bool:
+        if type(node) == ast.FunctionLiteral or type(node) == ast.MacroLiteral:
+            body.Closes = True
+            return False
+        return not body.Closes
+
+    ast.Inspect(body, closes)
+    markTailBlock(body)
+    body.TailCallsMarked = True
+
+
+def markTailBlock(block: ast.BlockStatement, tail: bool = True, branch: bool = False) -> None:
+    last = len(block.Statements) - 1
+    for i, statement in enumerate(block.Statements):
+        if type(statement) == ast.ReturnStatement:
+            returnStatement = cast(ast.ReturnStatement, statement)
+            returnStatement.Tail = tail and i == last
+            # A return of nothing does not return, so only one that ends the function anyway
+            # can hand its call over.
+            markTailExpression(returnStatement.ReturnValue, returnStatement.Tail, branch)
+        elif type(statement) == ast.ExpressionStatement:
+            expression = cast(ast.ExpressionStatement, statement).ExpressionValue
+            markTailExpression(expression, tail and i == last, branch)
+
+
+def markTailExpression(node: Optional[ast.Expression], tail: bool, branch: bool = False) -> None:
+    if type(node) == ast.CallExpression:
+        if tail:
+            call = cast(ast.CallExpression, node)
+            call.Tail = True
+            call.Branch = branch
+    elif type(node) == ast.IfExpression:
+        ie = cast(ast.IfExpression, node)
+        markTailBlock(ie.Consequence, tail, True)
+        if ie.Alternative is not None:
+            markTailBlock(ie.Alternative, tail, True)
 
 
 def unwrapReturnValue(obj: object.Object) -> object.Object:
@@ -431,11 +890,11 @@ def unwrapReturnValue(obj: object.Object) -> object.Object:
 
 
 def isTruthy(obj: object.Object) -> bool:
-    if obj == NULL:
+    if obj is NULL:
         return False
-    elif obj == TRUE:
+    elif obj is TRUE:
         return True
-    elif obj == FALSE:
+    elif obj is FALSE:
         return False
     else:
         return True
@@ -448,6 +907,15 @@ def isError(obj: object.Object) -> bool:
     return False
 
 
+def literalConstant(node: Any) -> object.Object:
+    # A literal evaluates to the same immutable object every time, made on first use.
+    if type(node) == ast.IntegerLiteral:
+        node.Constant = object.NewInteger(node.Value)
+    else:
+        node.Constant = object.String(Value=node.Value)
+    return node.Constant
+
+
 def nativeBoolToBooleanObject(input: bool) -> object.Boolean:
     return TRUE if input else FALSE
 
@@ -456,98 +924,401 @@ def newError(template: str, a: Tuple[Any, ...]) -> object.Error:
     return object.Error(Message=template % a)
 
 
-def builtin_len(args: List[object.Object]) -> object.Object:
-    if len(args) != 1:
-        return newError('wrong number of arguments. got=%s, want=1', (len(args), ))
-
-    arg = args[0]
+def builtin_len(arg: object.Object) -> object.Object:
     if type(arg) == object.Array:
         arg = cast(object.Array, arg)
-        return object.Integer(Value=int(len(arg.Elements)))
+        return object.NewInteger(arg.end - arg.start)
+    elif type(arg) == object.IntArray:
+        return object.NewInteger(len(cast(object.IntArray, arg).Values))
     elif type(arg) == object.String:
-        return object.Integer(Value=int(len(arg.Value)))
+        return object.NewInteger(cast(object.String, arg).length)
     else:
-        return newError('argument to \'len\' not supported, got %s', (args[0].Type.TypeName, ))
+        return newError('argument to \'len\' not supported, got %s', (arg.Type.TypeName, ))
 
 
-def builtin_first(args: List[object.Object]) -> object.Object:
-    if len(args) != 1:
-        return newError('wrong number of arguments. got=%s, want=1', (len(args), ))
-
-    arg = args[0]
+def builtin_first(arg: object.Object) -> object.Object:
+    if type(arg) == object.IntArray:
+        values = cast(object.IntArray, arg).Values
+        return object.NewInteger(values[0]) if values else NULL
     if arg.Type.TypeName != object.ARRAY_OBJ:
-        return newError('argument to `first` must be ARRAY, got %s', (args[0].Type.TypeName, ))
+        return newError('argument to `first` must be ARRAY, got %s', (arg.Type.TypeName, ))
 
     arr = cast(object.Array, arg)
-    if len(arr.Elements) > 0:
-        return arr.Elements[0]
+    if arr.end > arr.start:
+        return arr.store[arr.start]
 
     return NULL
 
 
-def builtin_last(args: List[object.Object]) -> object.Object:
-    if len(args) != 1:
-        return newError('wrong number of arguments. got=%s, want=1', (len(args), ))
-
-    arg = args[0]
+def builtin_last(arg: object.Object) -> object.Object:
+    if type(arg) == object.IntArray:
+        values = cast(object.IntArray, arg).Values
+        return object.NewInteger(values[-1]) if values else NULL
     if arg.Type.TypeName != object.ARRAY_OBJ:
-        return newError('argument to `last` must be ARRAY, got %s', (args[0].Type.TypeName, ))
+        return newError('argument to `last` must be ARRAY, got %s', (arg.Type.TypeName, ))
 
     arr = cast(object.Array, arg)
-    length = len(arr.Elements)
-    if length > 0:
-        return arr.Elements[length - 1]
+    if arr.end > arr.start:
+        return arr.store[arr.end - 1]
 
     return NULL
 
 
-def builtin_rest(args: List[object.Object]) -> object.Object:
-    if len(args) != 1:
-        return newError('wrong number of arguments. got=%s, want=1', (len(args), ))
-
-    arg = args[0]
+def builtin_rest(arg: object.Object) -> object.Object:
+    if type(arg) == object.IntArray:
+        arg = boxIntArray(cast(object.IntArray, arg))
     if arg.Type.TypeName != object.ARRAY_OBJ:
-        return newError('argument to `rest` must be ARRAY, got %s', (args[0].Type.TypeName, ))
+        return newError('argument to `rest` must be ARRAY, got %s', (arg.Type.TypeName, ))
 
     arr = cast(object.Array, arg)
-    length = len(arr.Elements)
-    if length > 0:
-        newElements = copy.deepcopy(arr.Elements[1:])
-        return object.Array(Elements=newElements)
+    if arr.end > arr.start:
+        return object.Array(arr.store, arr.start + 1, arr.end)
 
     return NULL
 
 
-def builtin_push(args: List[object.Object]) -> object.Object:
-    if len(args) != 2:
-        return newError('wrong number of arguments. got=%s, want=2', (len(args), ))
-
-    arg = args[0]
+def builtin_push(arg: object.Object, element: object.Object) -> object.Object:
+    if type(arg) == object.IntArray:
+        arg = boxIntArray(cast(object.IntArray, arg))
     if arg.Type.TypeName != object.ARRAY_OBJ:
-        return newError('argument to `push` must be ARRAY, got %s', (args[0].Type.TypeName, ))
+        return newError('argument to `push` must be ARRAY, got %s', (arg.Type.TypeName, ))
 
     arr = cast(object.Array, arg)
+    store = arr.store
+    if arr.end == len(store):
+        store.append(element)
+        return object.Array(store, arr.start, arr.end + 1)
+
+    # Another array already sees past the end of this one, so this one gets a copy.
+    return object.Array(store[arr.start:arr.end] + [element])
+
+
+def persistentPairs(hash: object.Hash) -> hamt.Map:
+    # Hash literals are dicts; the first update copies one into a map that later ones share.
+    if type(hash.Pairs) == hamt.Map:
+        return cast(hamt.Map, hash.Pairs)
+    return hamt.FromItems(hash.Pairs.items())
+
+
+def builtin_set(arg: object.Object, key: object.Object, value: object.Object) -> object.Object:
+    if arg.Type.TypeName != object.HASH_OBJ:
+        return newError('argument to `set` must be HASH, got %s', (arg.Type.TypeName, ))
+
+    hashKey = object.GetHashKey(key)
+    if hashKey is None:
+        return newError('unusable as hash key: %s', (key.Type.TypeName, ))
+    pairs = persistentPairs(cast(object.Hash, arg))
+    return object.Hash(Pairs=pairs.Set(hashKey, object.HashPair(Key=key, Value=value)))
+
+
+def builtin_delete(arg: object.Object, key: object.Object) -> object.Object:
+    if arg.Type.TypeName != object.HASH_OBJ:
+        return newError('argument to `delete` must be HASH, got %s', (arg.Type.TypeName, ))
+
+    hashKey = object.GetHashKey(key)
+    if hashKey is None:
+        return newError('unusable as hash key: %s', (key.Type.TypeName, ))
+    hash = cast(object.Hash, arg)
+    if hashKey not in hash.Pairs:
+        return hash
+    return object.Hash(Pairs=persistentPairs(hash).Delete(hashKey))
+
+
+def builtin_merge(left: object.Object, right: object.Object) -> object.Object:
+    for arg in (left, right):
+        if arg.Type.TypeName != object.HASH_OBJ:
+            return newError('arguments to `merge` must be HASH, got %s', (arg.Type.TypeName, ))
+
+    # Pairs of the right hash win, and its new keys come after those of the left.
+    a = cast(object.Hash, left)
+    b = cast(object.Hash, right)
+    if len(b.Pairs) == 0:
+        return a
+    pairs = persistentPairs(a)
+    for hashKey, pair in b.Pairs.items():
+        pairs = pairs.Set(hashKey, pair)
+    return object.Hash(Pairs=pairs)
+
+
+def builtin_keys(arg: object.Object) -> object.Object:
+    if arg.Type.TypeName != object.HASH_OBJ:
+        return newError('argument to `keys` must be HASH, got %s', (arg.Type.TypeName, ))
+
+    return object.Array([pair.Key for pair in cast(object.Hash, arg).Pairs.values()])
+
+
+def builtin_values(arg: object.Object) -> object.Object:
+    if arg.Type.TypeName != object.HASH_OBJ:
+        return newError('argument to `values` must be HASH, got %s', (arg.Type.TypeName, ))
+
+    return object.Array([pair.Value for pair in cast(object.Hash, arg).Pairs.values()])
+
+
+def boxIntArray(arg: object.IntArray) -> object.Array:
+    return object.Array([object.NewInteger(v) for v in arg.Values])
+
+
+def builtin_intArray(arg: object.Object) -> object.Object:
+    if type(arg) == object.IntArray:
+        return arg
+    if arg.Type.TypeName != object.ARRAY_OBJ:
+        return newError('argument to `intArray` must be ARRAY, got %s', (arg.Type.TypeName, ))
+
+    values: List[int] = []
+    for e in cast(object.Array, arg).Elements:
+        if type(e) != object.Integer:
+            return newError('elements of `intArray` must be INTEGER, got %s', (e.Type.TypeName, ))
+        values.append(int(e.Value))
+    try:
+        return object.IntArray(array('q', values))
+    except OverflowError:
+        return newError('integer out of range for `intArray`', ())
+
+
+def builtin_array(arg: object.Object) -> object.Object:
+    if type(arg) == object.IntArray:
+        return boxIntArray(cast(object.IntArray, arg))
+    if arg.Type.TypeName != object.ARRAY_OBJ:
+        return newError('argument to `array` must be ARRAY, got %s', (arg.Type.TypeName, ))
+    return arg
+
+
+def builtin_range(arg: object.Object) -> object.Object:
+    if type(arg) != object.Integer:
+        return newError('argument to `range` must be INTEGER, got %s', (arg.Type.TypeName, ))
+    return object.IntArray(array('q', range(int(arg.Value))))
+
+
+def elementwise(name: str, f: Callable[[int, int], Any], left: object.Object,
+                right: object.Object) -> object.Object:
+    # Applies f to the elements of an IntArray and those of another one as long, or to each
+    # element and an INTEGER. map runs the loop in C.
+    if type(left) != object.IntArray:
+        return newError('argument to `%s` must be INT_ARRAY, got %s', (name, left.Type.TypeName))
+    values = cast(object.IntArray, left).Values
+    if type(right) == object.Integer:
+        others: Any = repeat(int(right.Value), len(values))
+    elif type(right) == object.IntArray:
+        others = cast(object.IntArray, right).Values
+        if len(others) != len(values):
+            return newError('arguments to `%s` differ in length: %s and %s',
+                            (name, len(values), len(others)))
+    else:
+        return newError('argument to `%s` must be INT_ARRAY or INTEGER, got %s',
+                        (name, right.Type.TypeName))
+    try:
+        return object.IntArray(array('q', map(f, values, others)))
+    except OverflowError:
+        return newError('integer overflow in `%s`', (name, ))
+
+
+def builtin_vadd(left: object.Object, right: object.Object) -> object.Object:
+    return elementwise('vadd', operator.add, left, right)
+
+
+def builtin_vsub(left: object.Object, right: object.Object) -> object.Object:
+    return elementwise('vsub', operator.sub, left, right)
+
+
+def builtin_vmul(left: object.Object, right: object.Object) -> object.Object:
+    return elementwise('vmul', operator.mul, left, right)
+
+
+# Comparisons give masks: 1 where the comparison holds and 0 where it does not.
+def builtin_vlt(left: object.Object, right: object.Object) -> object.Object:
+    return elementwise('vlt', operator.lt, left, right)
+
+
+def builtin_vgt(left: object.Object, right: object.Object) -> object.Object:
+    return elementwise('vgt', operator.gt, left, right)
+
+
+def builtin_veq(left: object.Object, right: object.Object) -> object.Object:
+    return elementwise('veq', operator.eq, left, right)
+
+
+def builtin_vmask(arg: object.Object, mask: object.Object) -> object.Object:
+    # The elements where the mask is not 0.
+    if type(arg) != object.IntArray or type(mask) != object.IntArray:
+        return newError('arguments to `vmask` must be INT_ARRAY, got %s and %s',
+                        (arg.Type.TypeName, mask.Type.TypeName))
+    values = cast(object.IntArray, arg).Values
+    flags = cast(object.IntArray, mask).Values
+    if len(values) != len(flags):
+        return newError('arguments to `vmask` differ in length: %s and %s',
+                        (len(values), len(flags)))
+    return object.IntArray(array('q', compress(values, flags)))
+
+
+def builtin_vsum(arg: object.Object) -> object.Object:
+    if type(arg) != object.IntArray:
+        return newError('argument to `vsum` must be INT_ARRAY, got %s', (arg.Type.TypeName, ))
+    return object.NewInteger(sum(cast(object.IntArray, arg).Values))
 
-    newElements = copy.deepcopy(arr.Elements)
-    newElements.append(args[1])
 
-    return object.Array(Elements=newElements)
+def builtin_vdot(left: object.Object, right: object.Object) -> object.Object:
+    if type(left) != object.IntArray or type(right) != object.IntArray:
+        return newError('arguments to `vdot` must be INT_ARRAY, got %s and %s',
+                        (left.Type.TypeName, right.Type.TypeName))
+    a = cast(object.IntArray, left).Values
+    b = cast(object.IntArray, right).Values
+    if len(a) != len(b):
+        return newError('arguments to `vdot` differ in length: %s and %s', (len(a), len(b)))
+    return object.NewInteger(sum(map(operator.mul, a, b)))
 
 
-def builtin_puts(args: List[object.Object]) -> object.Object:
+@dataclass
+class Output:
+    # The sink puts writes to. It collects what is written and hands it to Stream, or to
+    # sys.stdout when Stream is None, in writes of about Threshold characters; and all of it
+    # when flushed, which happens at the end of a program, on flush(), and in LineBuffered
+    # mode after every puts. Limit caps the elements puts prints of each array or hash; None
+    # prints them all.
+    Stream: Optional[IO[str]] = None
+    Threshold: int = OUTPUT_THRESHOLD
+    LineBuffered: bool = False
+    Limit: Optional[int] = None
+    pending: List[str] = field(default_factory=list, repr=False)
+    size: int = 0
+
+    def write(self, s: str) -> None:
+        self.pending.append(s)
+        self.size += len(s)
+        if self.size >= self.Threshold:
+            self.drain()
+
+    def drain(self) -> None:
+        stream = self.Stream if self.Stream is not None else sys.stdout
+        stream.write(''.join(self.pending))
+        self.pending.clear()
+        self.size = 0
+
+    def Flush(self) -> None:
+        if self.pending:
+            self.drain()
+            (self.Stream if self.Stream is not None else sys.stdout).flush()
+
+
+output = Output()
+atexit.register(output.Flush)
+
+
+def builtin_puts(*args: object.Object) -> object.Object:
+    # Values are written as they are inspected, so printing a large one never builds its whole
+    # string.
+    out = output
+    limit = out.Limit
     for arg in args:
-        print(arg.Inspect)
+        arg.InspectTo(out, limit)
+        out.write('\n')
+    if out.LineBuffered:
+        out.Flush()
+
+    return NULL
+
 
+def builtin_flush() -> object.Object:
+    output.Flush()
     return NULL
 
 
+@dataclass
+class Memo:
+    # Caches the results of a pure function by its arguments, evicting the least recently used
+    # once it holds Capacity of them. Calls with arguments that cannot be hash keys, and calls
+    # that fail, are not cached.
+    Function: object.Function
+    Capacity: int = MEMO_CAPACITY
+    Hits: int = 0
+    Misses: int = 0
+    Skips: int = 0
+    Evictions: int = 0
+    Cache: 'OrderedDict[Tuple[Any, ...], object.Object]' = field(
+        default_factory=OrderedDict, repr=False)
+
+    def __call__(self, *args: object.Object) -> Optional[object.Object]:
+        key = memoKey(args)
+        if key is None:
+            self.Skips += 1
+            return applyFunction(self.Function, list(args))
+
+        cached = self.Cache.get(key)
+        if cached is not None:
+            self.Hits += 1
+            self.Cache.move_to_end(key)
+            return cached
+
+        self.Misses += 1
+        result = applyFunction(self.Function, list(args))
+        if result is not None and type(result) not in ERRORS:
+            self.Cache[key] = result
+            if len(self.Cache) > self.Capacity:
+                self.Cache.popitem(last=False)
+                self.Evictions += 1
+        return result
+
+    def String(self) -> str:
+        return 'hits=%d misses=%d skips=%d evictions=%d size=%d/%d' % (
+            self.Hits, self.Misses, self.Skips, self.Evictions, len(self.Cache), self.Capacity)
+
+
+def memoKey(args: Tuple[object.Object, ...]) -> Optional[Tuple[Any, ...]]:
+    key: List[Any] = []
+    for arg in args:
+        hashKey = object.GetHashKey(arg)
+        if hashKey is None:
+            return None
+        key.append(hashKey)
+    return tuple(key)
+
+
+def builtin_memo(*args: object.Object) -> object.Object:
+    if len(args) != 1 and len(args) != 2:
+        return newError('wrong number of arguments. got=%s, want=1 or 2', (len(args), ))
+    if type(args[0]) != object.Function:
+        return newError('argument to `memo` must be FUNCTION, got %s', (args[0].Type.TypeName, ))
+
+    function = cast(object.Function, args[0])
+    if not function.Body.Pure:
+        return newError('argument to `memo` must be a pure function', ())
+
+    capacity = MEMO_CAPACITY
+    if len(args) == 2:
+        if type(args[1]) != object.Integer or cast(object.Integer, args[1]).Value < 1:
+            return newError('capacity of `memo` must be a positive INTEGER, got %s',
+                            (args[1].Inspect, ))
+        capacity = cast(object.Integer, args[1]).Value
+
+    memo = Memo(Function=function, Capacity=capacity)
+    return object.Builtin(Fn=memo, Arity=len(function.Parameters))
+
+
 builtins: Dict[str, object.Builtin] = {
-    'len': object.Builtin(Fn=builtin_len),
-    'first': object.Builtin(Fn=builtin_first),
-    'last': object.Builtin(Fn=builtin_last),
-    'rest': object.Builtin(Fn=builtin_rest),
-    'push': object.Builtin(Fn=builtin_push),
+    'len': object.Builtin(Fn=builtin_len, Arity=1),
+    'first': object.Builtin(Fn=builtin_first, Arity=1),
+    'last': object.Builtin(Fn=builtin_last, Arity=1),
+    'rest': object.Builtin(Fn=builtin_rest, Arity=1),
+    'push': object.Builtin(Fn=builtin_push, Arity=2),
+    'set': object.Builtin(Fn=builtin_set, Arity=3),
+    'delete': object.Builtin(Fn=builtin_delete, Arity=2),
+    'merge': object.Builtin(Fn=builtin_merge, Arity=2),
+    'keys': object.Builtin(Fn=builtin_keys, Arity=1),
+    'values': object.Builtin(Fn=builtin_values, Arity=1),
+    'intArray': object.Builtin(Fn=builtin_intArray, Arity=1),
+    'array': object.Builtin(Fn=builtin_array, Arity=1),
+    'range': object.Builtin(Fn=builtin_range, Arity=1),
+    'vadd': object.Builtin(Fn=builtin_vadd, Arity=2),
+    'vsub': object.Builtin(Fn=builtin_vsub, Arity=2),
+    'vmul': object.Builtin(Fn=builtin_vmul, Arity=2),
+    'vlt': object.Builtin(Fn=builtin_vlt, Arity=2),
+    'vgt': object.Builtin(Fn=builtin_vgt, Arity=2),
+    'veq': object.Builtin(Fn=builtin_veq, Arity=2),
+    'vmask': object.Builtin(Fn=builtin_vmask, Arity=2),
+    'vsum': object.Builtin(Fn=builtin_vsum, Arity=1),
+    'vdot': object.Builtin(Fn=builtin_vdot, Arity=2),
     'puts': object.Builtin(Fn=builtin_puts),
+    'flush': object.Builtin(Fn=builtin_flush, Arity=0),
+    'memo': object.Builtin(Fn=builtin_memo),
 }
 
 
@@ -0,0 +1,212 @@
+from collections.abc import Mapping
+from typing import Any, Iterator, List, Optional, Tuple
+
+# A hash array mapped trie: every level of the trie consumes BITS bits of a key's hash. Nodes
+# are never changed once built, so a map made by Set or Delete shares all the nodes off the
+# path to the key with the map it was made from, and both take O(log32 n).
+BITS = 5
+MASK = (1 << BITS) - 1
+HASH_MASK = (1 << 64) - 1
+
+# A leaf is a tuple of the key's hash, the key, the value and the sequence number that orders
+# the map's items by first insertion. Anything else in a node is a child node.
+Leaf = Tuple[int, Any, Any, int]
+
+
+def popcount(n: int) -> int:
+    return bin(n).count('1')
+
+
+class BitmapNode:
+    __slots__ = ('bitmap', 'items')
+
+    def __init__(self, bitmap: int, items: List[Any]) -> None:
+        # Bit i of the bitmap says whether the node holds something for hash digit i; the
+        # items are in digit order.
+        self.bitmap = bitmap
+        self.items = items
+
+    def get(self, h: int, shift: int, key: Any) -> Optional[Leaf]:
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return None
+        item = self.items[popcount(self.bitmap & (bit - 1))]
+        if type(item) == tuple:
+            return item if item[1] == key else None
+        return item.get(h, shift + BITS, key)
+
+    def set(self, leaf: Leaf, shift: int) -> Tuple[Any, Optional[Leaf]]:
+        # Returns the new node and the leaf that the new one replaced, if any.
+        h = leaf[0]
+        bit = 1 << ((h >> shift) & MASK)
+        pos = popcount(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            return BitmapNode(self.bitmap | bit, self.items[:pos] + [leaf] + self.items[pos:]), None
+
+        item = self.items[pos]
+        replaced = None
+        if type(item) == tuple:
+            if item[1] == leaf[1]:
+                child: Any = leaf
+                replaced = item
+            else:
+                child = split(item, leaf, shift + BITS)
+        else:
+            child, replaced = item.set(leaf, shift + BITS)
+        items = list(self.items)
+        items[pos] = child
+        return BitmapNode(self.bitmap, items), replaced
+
+    def delete(self, h: int, shift: int, key: Any) -> Any:
+        # Returns self when the key is absent, None when nothing is left, and a lone leaf
+        # rather than a node holding just that leaf.
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return self
+        pos = popcount(self.bitmap & (bit - 1))
+        item = self.items[pos]
+        if type(item) == tuple:
+            if item[1] != key:
+                return self
+            child = None
+        else:
+            child = item.delete(h, shift + BITS, key)
+            if child is item:
+                return self
+
+        if child is not None:
+            items = list(self.items)
+            items[pos] = child
+            return BitmapNode(self.bitmap, items)
+        items = self.items[:pos] + self.items[pos + 1:]
+        if not items:
+            return None
+        if len(items) == 1 and type(items[0]) == tuple:
+            return items[0]
+        return BitmapNode(self.bitmap & ~bit, items)
+
+    def leaves(self, out: List[Leaf]) -> None:
+        for item in self.items:
+            if type(item) == tuple:
+                out.append(item)
+            else:
+                item.leaves(out)
+
+
+class CollisionNode:
+    # The leaves of keys whose hashes are equal in all 64 bits.
+    __slots__ = ('hash', 'items')
+
+    def __init__(self, hash: int, items: List[Leaf]) -> None:
+        self.hash = hash
+        self.items = items
+
+    def get(self, h: int, shift: int, key: Any) -> Optional[Leaf]:
+        for item in self.items:
+            if item[1] == key:
+                return item
+        return None
+
+    def set(self, leaf: Leaf, shift: int) -> Tuple[Any, Optional[Leaf]]:
+        if leaf[0] != self.hash:
+            node = BitmapNode(1 << ((self.hash >> shift) & MASK), [self])
+            return node.set(leaf, shift)
+        for i, item in enumerate(self.items):
+            if item[1] == leaf[1]:
+                items = list(self.items)
+                items[i] = leaf
+                return CollisionNode(self.hash, items), item
+        return CollisionNode(self.hash, self.items + [leaf]), None
+
+    def delete(self, h: int, shift: int, key: Any) -> Any:
+        items = [item for item in self.items if item[1] != key]
+        if len(items) == len(self.items):
+            return self
+        if len(items) == 1:
+            return items[0]
+        return CollisionNode(self.hash, items)
+
+    def leaves(self, out: List[Leaf]) -> None:
+        out.extend(self.items)
+
+
+def split(a: Leaf, b: Leaf, shift: int) -> Any:
+    if a[0] == b[0]:
+        return CollisionNode(a[0], [a, b])
+    node, _ = BitmapNode(0, []).set(a, shift)
+    node, _ = node.set(b, shift)
+    return node
+
+
+EMPTY = BitmapNode(0, [])
+
+
+class Map(Mapping):
+    # A persistent map. It reads like a dict, iterating in the order keys were first set, but
+    # Set and Delete return new maps and leave this one as it is.
+    __slots__ = ('root', 'count', 'next')
+
+    def __init__(self, root: BitmapNode = EMPTY, count: int = 0, next: int = 0) -> None:
+        self.root = root
+        self.count = count
+        self.next = next
+
+    def Set(self, key: Any, value: Any) -> 'Map':
+        h = hash(key) & HASH_MASK
+        leaf = self.root.get(h, 0, key)
+        if leaf is not None:
+            # A key keeps its place when its value changes.
+            if leaf[2] is value:
+                return self
+            root, _ = self.root.set((h, key, value, leaf[3]), 0)
+            return Map(root, self.count, self.next)
+        root, _ = self.root.set((h, key, value, self.next), 0)
+        return Map(root, self.count + 1, self.next + 1)
+
+    def Delete(self, key: Any) -> 'Map':
+        root = self.root.delete(hash(key) & HASH_MASK, 0, key)
+        if root is self.root:
+            return self
+        if root is None:
+            root = EMPTY
+        elif type(root) == tuple:
+            root, _ = EMPTY.set(root, 0)
+        return Map(root, self.count - 1, self.next)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        leaf = self.root.get(hash(key) & HASH_MASK, 0, key)
+        return leaf[2] if leaf is not None else default
+
+    def __getitem__(self, key: Any) -> Any:
+        leaf = self.root.get(hash(key) & HASH_MASK, 0, key)
+        if leaf is None:
+            raise KeyError(key)
+        return leaf[2]
+
+    def __contains__(self, key: Any) -> bool:
+        return self.root.get(hash(key) & HASH_MASK, 0, key) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter([leaf[1] for leaf in self.leaves()])
+
+    def items(self) -> List[Tuple[Any, Any]]:  # type: ignore
+        return [(leaf[1], leaf[2]) for leaf in self.leaves()]
+
+    def values(self) -> List[Any]:  # type: ignore
+        return [leaf[2] for leaf in self.leaves()]
+
+    def leaves(self) -> List[Leaf]:
+        out: List[Leaf] = []
+        self.root.leaves(out)
+        out.sort(key=lambda leaf: leaf[3])
+        return out
+
+
+def FromItems(items: Any) -> Map:
+    m = Map()
+    for key, value in items:
+        m = m.Set(key, value)
+    return m
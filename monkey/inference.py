@@ -0,0 +1,288 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from monkey import ast, object, resolver
+
+INTEGER = object.INTEGER_OBJ
+STRING = object.STRING_OBJ
+BOOLEAN = object.BOOLEAN_OBJ
+ANY = 'ANY'
+# The type of a name whose only let has not run yet; reading it may reach an outer scope.
+LET = 'LET'
+
+# A type is one of the above, or None while nothing is known yet. An expression is certain when
+# it always produces a value of its type: it can neither fail nor evaluate to nothing.
+Typed = Tuple[Optional[str], bool]
+
+
+@dataclass
+class Signature:
+    Parameters: List[Optional[str]]
+    Return: Optional[str] = None
+
+    def String(self) -> str:
+        params = ', '.join(orAny(p) for p in self.Parameters)
+        return 'fn(%s) -> %s' % (params, orAny(self.Return))
+
+
+@dataclass
+class Types:
+    Functions: Dict[str, Signature] = field(default_factory=dict)
+    Lets: List[Tuple[str, str]] = field(default_factory=list)
+
+    def String(self) -> str:
+        out: List[str] = []
+        for name, signature in self.Functions.items():
+            out.append('%s: %s' % (name, signature.String()))
+        for name, kind in self.Lets:
+            out.append('let %s: %s' % (name, kind))
+        return '\n'.join(out)
+
+
+@dataclass
+class Scope:
+    Names: Dict[str, Optional[str]]
+    Outer: Any
+
+    def Lookup(self, name: str) -> Optional[str]:
+        s = self
+        while s is not None:
+            if name in s.Names:
+                return s.Names[name]
+            s = s.Outer
+        return ANY
+
+
+def Infer(program: ast.Program, closed: bool = False) -> Types:
+    # Sets Kind on the identifiers, prefix and infix expressions that always produce an integer,
+    # a string or a boolean. A closed program is all the code there will be; otherwise later
+    # programs may call its top-level functions with anything, as they can in the REPL.
+    i = Inferrer(Types=Types())
+    i.findKnownFunctions(program, closed)
+
+    # Parameter and return types only ever widen, so this reaches a fixed point.
+    i.Changed = True
+    while i.Changed:
+        i.Changed = False
+        i.statements(program.Statements, Scope(Names={}, Outer=None))
+
+    i.Annotate = True
+    i.statements(program.Statements, Scope(Names={}, Outer=None))
+    return i.Types
+
+
+def join(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    return ANY
+
+
+def orAny(kind: Optional[str]) -> str:
+    return kind if kind is not None else ANY
+
+
+def infixType(operator: str, left: str, right: str) -> str:
+    if operator == '==' or operator == '!=':
+        return BOOLEAN
+    if left == INTEGER and right == INTEGER:
+        if operator in ('+', '-', '*'):
+            return INTEGER
+        if operator in ('<', '>'):
+            return BOOLEAN
+    if left == STRING and right == STRING and operator == '+':
+        return STRING
+    return ANY
+
+
+@dataclass
+class Inferrer:
+    Types: Types
+    Known: Dict[str, ast.FunctionLiteral] = field(default_factory=dict)
+    Return: Optional[str] = None
+    Changed: bool = False
+    Annotate: bool = False
+
+    def findKnownFunctions(self, program: ast.Program, closed: bool) -> None:
+        # Parameter types come from the call sites of functions that are bound once, by a let,
+        # and whose name is only ever called with the right number of arguments.
+        lets: Dict[str, List[ast.LetStatement]] = {}
+        calls: Dict[str, List[ast.CallExpression]] = {}
+        others: List[str] = []
+
+        def f(node: ast.Node) -> bool:
+            if type(node) == ast.LetStatement:
+                let = cast(ast.LetStatement, node)
+                lets.setdefault(let.Name.Value, []).append(let)
+                ast.Inspect(let.Value, f)
+                return False
+            elif type(node) == ast.FunctionLiteral or type(node) == ast.MacroLiteral:
+                others.extend(p.Value for p in node.Parameters)
+                ast.Inspect(node.Body, f)
+                return False
+            elif type(node) == ast.CallExpression:
+                call = cast(ast.CallExpression, node)
+                if type(call.Function) == ast.Identifier:
+                    calls.setdefault(call.Function.Value, []).append(call)
+                    for arg in call.Arguments:
+                        ast.Inspect(arg, f)
+                    return False
+            elif type(node) == ast.Identifier:
+                others.append(cast(ast.Identifier, node).Value)
+            return True
+
+        ast.Inspect(program, f)
+        toplevel = [cast(ast.LetStatement, s).Name.Value for s in program.Statements
+                    if type(s) == ast.LetStatement]
+
+        for name, bound in lets.items():
+            if len(bound) != 1 or name in others or type(bound[0].Value) != ast.FunctionLiteral:
+                continue
+            if not closed and name in toplevel:
+                continue
+            fl = cast(ast.FunctionLiteral, bound[0].Value)
+            if all(len(c.Arguments) == len(fl.Parameters) for c in calls.get(name, [])):
+                self.Known[name] = fl
+                self.Types.Functions[name] = Signature(Parameters=[None] * len(fl.Parameters))
+
+    def statements(self, stmts: List[ast.Statement], scope: Scope) -> Optional[str]:
+        # Returns the type of the last statement's value; None if it returns instead.
+        result: Optional[str] = ANY
+        for stmt in stmts:
+            result = self.statement(stmt, scope, True)
+        return result
+
+    def block(self, block: ast.BlockStatement, scope: Scope) -> Optional[str]:
+        result: Optional[str] = ANY
+        for stmt in block.Statements:
+            result = self.statement(stmt, scope, False)
+        return result
+
+    def statement(self, stmt: ast.Statement, scope: Scope, direct: bool) -> Optional[str]:
+        if type(stmt) == ast.ExpressionStatement:
+            es = cast(ast.ExpressionStatement, stmt)
+            if es.ExpressionValue is None:
+                return ANY
+            return self.expression(es.ExpressionValue, scope)[0]
+        elif type(stmt) == ast.LetStatement:
+            self.let(cast(ast.LetStatement, stmt), scope, direct)
+            return ANY
+        elif type(stmt) == ast.ReturnStatement:
+            rs = cast(ast.ReturnStatement, stmt)
+            self.Return = join(self.Return, self.expression(rs.ReturnValue, scope)[0])
+            return None
+        return ANY
+
+    def let(self, let: ast.LetStatement, scope: Scope, direct: bool) -> None:
+        name = let.Name.Value
+        fl = self.Known.get(name)
+        if fl is not None and fl is let.Value:
+            signature = self.Types.Functions[name]
+            kind = join(signature.Return, self.function(fl, scope, signature))
+            if kind != signature.Return:
+                signature.Return = kind
+                self.Changed = True
+            return
+
+        kind, certain = self.expression(let.Value, scope)
+        # Only a function's single let, run unconditionally, types its name, and only from then on.
+        if direct and scope.Names.get(name) == LET:
+            scope.Names[name] = kind if certain else ANY
+            if self.Annotate and certain and kind in (INTEGER, STRING, BOOLEAN):
+                self.Types.Lets.append((name, cast(str, kind)))
+
+    def function(self, fl: ast.FunctionLiteral, outer: Scope,
+                 signature: Optional[Signature]) -> Optional[str]:
+        names: Dict[str, Optional[str]] = {}
+        for name in resolver.localNames(fl.Body):
+            names[name] = LET if name not in names else ANY
+        for i, p in enumerate(fl.Parameters):
+            if p.Value in names:
+                names[p.Value] = ANY
+            else:
+                names[p.Value] = signature.Parameters[i] if signature is not None else ANY
+
+        saved = self.Return
+        self.Return = None
+        result = self.statements(fl.Body.Statements, Scope(Names=names, Outer=outer))
+        kind = join(self.Return, result)
+        self.Return = saved
+        return kind
+
+    def expression(self, node: ast.Expression, scope: Scope) -> Typed:
+        kind, certain = self.infer(node, scope)
+        if self.Annotate and certain and kind in (INTEGER, STRING, BOOLEAN):
+            if type(node) in (ast.Identifier, ast.PrefixExpression, ast.InfixExpression):
+                node.Kind = kind
+        return kind, certain
+
+    def infer(self, node: ast.Expression, scope: Scope) -> Typed:
+        if type(node) == ast.IntegerLiteral:
+            return INTEGER, True
+        elif type(node) == ast.StringLiteral:
+            return STRING, True
+        elif type(node) == ast.Boolean:
+            return BOOLEAN, True
+        elif type(node) == ast.Identifier:
+            kind = scope.Lookup(cast(ast.Identifier, node).Value)
+            if kind == LET:
+                return ANY, False
+            return kind, kind != ANY
+        elif type(node) == ast.PrefixExpression:
+            prefix = cast(ast.PrefixExpression, node)
+            right, certain = self.expression(cast(ast.Expression, prefix.Right), scope)
+            if right is None:
+                return None, certain
+            if prefix.Operator == '!':
+                return BOOLEAN, certain
+            if prefix.Operator == '-' and right == INTEGER:
+                return INTEGER, certain
+            return ANY, False
+        elif type(node) == ast.InfixExpression:
+            infix = cast(ast.InfixExpression, node)
+            left, leftCertain = self.expression(cast(ast.Expression, infix.Left), scope)
+            right, rightCertain = self.expression(cast(ast.Expression, infix.Right), scope)
+            if left is None or right is None:
+                return None, leftCertain and rightCertain
+            kind = infixType(infix.Operator, left, right)
+            return kind, leftCertain and rightCertain and kind != ANY
+        elif type(node) == ast.IfExpression:
+            ie = cast(ast.IfExpression, node)
+            self.expression(ie.Condition, scope)
+            kind = self.block(ie.Consequence, scope)
+            if ie.Alternative is None:
+                return ANY, False
+            return join(kind, self.block(ie.Alternative, scope)), False
+        elif type(node) == ast.FunctionLiteral:
+            self.function(cast(ast.FunctionLiteral, node), scope, None)
+            return ANY, False
+        elif type(node) == ast.CallExpression:
+            return self.call(cast(ast.CallExpression, node), scope)
+
+        for child in ast.Children(node):
+            self.expression(cast(ast.Expression, child), scope)
+        return ANY, False
+
+    def call(self, node: ast.CallExpression, scope: Scope) -> Typed:
+        if node.Function.TokenLiteral() == 'quote':
+            return ANY, False
+
+        args = [self.expression(a, scope) for a in node.Arguments]
+        fl = None
+        if type(node.Function) == ast.Identifier:
+            fl = self.Known.get(cast(ast.Identifier, node.Function).Value)
+        if fl is None:
+            self.expression(node.Function, scope)
+            return ANY, False
+
+        signature = self.Types.Functions[cast(ast.Identifier, node.Function).Value]
+        # An argument that evaluates to nothing is dropped, which shifts the ones after it.
+        shifts = not all(certain for _, certain in args)
+        for i, (kind, _) in enumerate(args):
+            widened = join(signature.Parameters[i], ANY if shifts else kind)
+            if widened != signature.Parameters[i]:
+                signature.Parameters[i] = widened
+                self.Changed = True
+        # Calls can always fail.
+        return signature.Return, False
@@ -1,8 +1,10 @@
-import hashlib
+import io
 from abc import abstractmethod
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from functools import singledispatch
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import (
+    IO, Any, Callable, Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union, cast)
 
 from monkey import ast
 
@@ -15,17 +17,39 @@ FUNCTION_OBJ = 'FUNCTION'
 STRING_OBJ = 'STRING'
 BUILTIN_OBJ = 'BUILTIN'
 ARRAY_OBJ = 'ARRAY'
+INT_ARRAY_OBJ = 'INT_ARRAY'
 HASH_OBJ = 'HASH'
 QUOTE_OBJ = 'QUOTE'
 MACRO_OBJ = 'MACRO'
+TAIL_CALL_OBJ = 'TAIL_CALL'
 
 
-@dataclass
+@dataclass(frozen=True)
 class ObjectType:
     TypeName: str
 
 
+# Every object of a class shares its type tag.
+INTEGER_TYPE = ObjectType(INTEGER_OBJ)
+BOOLEAN_TYPE = ObjectType(BOOLEAN_OBJ)
+NULL_TYPE = ObjectType(NULL_OBJ)
+RETURN_VALUE_TYPE = ObjectType(RETURN_VALUE_OBJ)
+ERROR_TYPE = ObjectType(ERROR_OBJ)
+FUNCTION_TYPE = ObjectType(FUNCTION_OBJ)
+STRING_TYPE = ObjectType(STRING_OBJ)
+BUILTIN_TYPE = ObjectType(BUILTIN_OBJ)
+ARRAY_TYPE = ObjectType(ARRAY_OBJ)
+INT_ARRAY_TYPE = ObjectType(INT_ARRAY_OBJ)
+HASH_TYPE = ObjectType(HASH_OBJ)
+QUOTE_TYPE = ObjectType(QUOTE_OBJ)
+MACRO_TYPE = ObjectType(MACRO_OBJ)
+TAIL_CALL_TYPE = ObjectType(TAIL_CALL_OBJ)
+
+
 class Object:
+    # Objects keep no per-instance dict. Integers, strings, booleans and null are immutable, so a
+    # copy of one is the object itself, which also keeps TRUE, FALSE and NULL singletons.
+    __slots__ = ()
     Value: Any
 
     @property
@@ -38,9 +62,16 @@ class Object:
     def Inspect(self) -> str:
         pass
 
+    def InspectTo(self, out: IO[str], limit: Optional[int] = None) -> None:
+        # Writes what Inspect returns. Collections write their elements one at a time rather
+        # than building the whole string first, and with a limit write at most that many
+        # elements of each collection, then '...'.
+        out.write(self.Inspect)
+
 
 @dataclass
 class AnyObject(Object):
+    __slots__ = ('Value', )
     Value: Object
 
     @property
@@ -54,50 +85,68 @@ class AnyObject(Object):
 
 @dataclass
 class Integer(Object):
+    __slots__ = ('Value', )
     Value: int
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(INTEGER_OBJ)
+    Type = INTEGER_TYPE
 
     @property
     def Inspect(self) -> str:
         return str(self.Value)
 
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'Integer':
+        return self
+
+
+# Integers in this range are shared rather than allocated for every result.
+SMALL_INT_MIN = -5
+SMALL_INT_MAX = 1024
+SMALL_INTS = [Integer(Value=i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+
+
+def NewInteger(value: int) -> Integer:
+    # Division can leave a float in an integer, and those are never shared.
+    if type(value) == int and SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+        return SMALL_INTS[value - SMALL_INT_MIN]
+    return Integer(Value=value)
+
 
 @dataclass
 class Boolean(Object):
+    __slots__ = ('Value', )
     Value: bool
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(BOOLEAN_OBJ)
+    Type = BOOLEAN_TYPE
 
     @property
     def Inspect(self) -> str:
         return str(self.Value)
 
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'Boolean':
+        return self
+
 
 @dataclass
 class Null(Object):
-    Value: Any = None
+    __slots__ = ()
+    Value = None
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(NULL_OBJ)
+    Type = NULL_TYPE
 
     @property
     def Inspect(self) -> str:
         return NULL_OBJ
 
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'Null':
+        return self
+
 
 @dataclass
 class ReturnValue(Object):
+    __slots__ = ('Value', )
     Value: Object
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(RETURN_VALUE_OBJ)
+    Type = RETURN_VALUE_TYPE
 
     @property
     def Inspect(self) -> str:
@@ -106,11 +155,10 @@ class ReturnValue(Object):
 
 @dataclass
 class Error(Object):
+    __slots__ = ('Message', )
     Message: str
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(ERROR_OBJ)
+    Type = ERROR_TYPE
 
     @property
     def Inspect(self) -> str:
@@ -119,13 +167,12 @@ class Error(Object):
 
 @dataclass
 class Function(Object):
+    __slots__ = ('Parameters', 'Body', 'Env')
     Parameters: List[ast.Identifier]
     Body: ast.BlockStatement
     Env: Any
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(FUNCTION_OBJ)
+    Type = FUNCTION_TYPE
 
     @property
     def Inspect(self) -> str:
@@ -146,45 +193,219 @@ class Function(Object):
 
 
 @dataclass
+class TailCall(Object):
+    __slots__ = ('Function', 'Arguments', 'Branch')
+    Function: Any
+    Arguments: Optional[List[Object]]
+    Branch: bool
+
+    Type = TAIL_CALL_TYPE
+
+    @property
+    def Inspect(self) -> str:
+        return 'tail call'
+
+
+@dataclass(init=False, eq=False)
 class String(Object):
-    Value: str
+    # A string made by joining long strings is a rope: it keeps the two strings and only builds
+    # its value once something reads it. hashKey is only set once the string is first used as
+    # a hash key.
+    __slots__ = ('value', 'left', 'right', 'length', 'hashKey')
+    value: Optional[str]
+    left: Optional['String']
+    right: Optional['String']
+    length: int
+
+    Type = STRING_TYPE
+
+    def __init__(self, Value: str) -> None:
+        self.value = Value
+        self.left = None
+        self.right = None
+        self.length = len(Value)
 
     @property
-    def Type(self) -> ObjectType:
-        return ObjectType(STRING_OBJ)
+    def Value(self) -> str:
+        if self.value is None:
+            self.value = flatten(self)
+        return self.value
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) == String and self.length == other.length and self.Value == other.Value
 
     @property
     def Inspect(self) -> str:
         return self.Value
 
-
-@dataclass
+    def InspectTo(self, out: IO[str], limit: Optional[int] = None) -> None:
+        # A rope is written piece by piece, without being flattened.
+        for piece in pieces(self):
+            out.write(piece)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'String':
+        return self
+
+
+# Joined strings up to this long are copied rather than kept as ropes.
+ROPE_LEAF = 512
+
+
+def Concat(left: String, right: String) -> String:
+    if left.length == 0:
+        return right
+    if right.length == 0:
+        return left
+    length = left.length + right.length
+    if length <= ROPE_LEAF:
+        return String(Value=left.Value + right.Value)
+    if left.value is None and right.length < ROPE_LEAF:
+        # Appending a short string to a rope extends its last piece while that stays short, so
+        # building a string from small pieces makes one rope per ROPE_LEAF characters.
+        last = cast(String, left.right)
+        if last.length + right.length <= ROPE_LEAF:
+            return rope(cast(String, left.left), String(Value=last.Value + right.Value), length)
+    return rope(left, right, length)
+
+
+def rope(left: String, right: String, length: int) -> String:
+    s = String.__new__(String)
+    s.value = None
+    s.left = left
+    s.right = right
+    s.length = length
+    return s
+
+
+def pieces(s: String) -> Iterator[str]:
+    # Ropes built by appending nest as deep as they have pieces, so this walks them with a
+    # stack rather than by recursion.
+    pending = [s]
+    while pending:
+        node = pending.pop()
+        if node.value is not None:
+            yield node.value
+        else:
+            pending.append(cast(String, node.right))
+            pending.append(cast(String, node.left))
+
+
+def flatten(s: String) -> str:
+    value = ''.join(pieces(s))
+    # The joined value replaces the pieces, which may then be freed.
+    s.left = None
+    s.right = None
+    return value
+
+
+@dataclass(init=False, eq=False)
 class Array(Object):
-    Elements: List[Object]
+    # An array sees store[start:end]. Arrays never change what they see, so rest and push can
+    # share the store with the array they came from: rest by narrowing the view, push by
+    # appending when nothing sees past the end of the array yet.
+    # hashKey is only set once the array is first used as a hash key.
+    __slots__ = ('store', 'start', 'end', 'hashKey')
+    store: List[Object]
+    start: int
+    end: int
+
+    Type = ARRAY_TYPE
+
+    def __init__(self, Elements: List[Object], start: int = 0,
+                 end: Optional[int] = None) -> None:
+        self.store = Elements
+        self.start = start
+        self.end = len(Elements) if end is None else end
 
     @property
-    def Type(self) -> ObjectType:
-        return ObjectType(ARRAY_OBJ)
+    def Elements(self) -> List[Object]:
+        return self.store[self.start:self.end]
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if type(other) != Array or self.end - self.start != other.end - other.start:
+            return False
+        key = getattr(self, 'hashKey', None)
+        otherKey = getattr(other, 'hashKey', None)
+        if key is not None and otherKey is not None and key.hash != otherKey.hash:
+            return False
+        return self.Elements == other.Elements
 
     @property
     def Inspect(self) -> str:
-        out: List[str] = []
+        out = io.StringIO()
+        self.InspectTo(out)
+        return out.getvalue()
 
-        elements: List[str] = []
-        for e in self.Elements:
-            elements.append(e.Inspect)
+    def InspectTo(self, out: IO[str], limit: Optional[int] = None) -> None:
+        store = self.store
+        end = self.end if limit is None else min(self.end, self.start + limit)
+        out.write('[')
+        for i in range(self.start, end):
+            if i > self.start:
+                out.write(', ')
+            store[i].InspectTo(out, limit)
+        if end < self.end:
+            out.write(', ...' if end > self.start else '...')
+        out.write(']')
 
-        out.append('[')
-        out.append(', '.join(elements))
-        out.append(']')
 
-        return ''.join(out)
+# Integers of an IntArray that InspectTo formats with one join.
+INSPECT_CHUNK = 4096
 
 
-@dataclass
+@dataclass(eq=False)
+class IntArray(Object):
+    # Unboxed 64-bit integers, for the vector builtins to work on at C speed. Array builtins
+    # that cannot read them directly turn them into an Array first.
+    __slots__ = ('Values', )
+    Values: 'array[int]'
+
+    Type = INT_ARRAY_TYPE
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) == IntArray and self.Values == other.Values
+
+    @property
+    def Inspect(self) -> str:
+        out = io.StringIO()
+        self.InspectTo(out)
+        return out.getvalue()
+
+    def InspectTo(self, out: IO[str], limit: Optional[int] = None) -> None:
+        values = self.Values
+        end = len(values) if limit is None else min(len(values), limit)
+        out.write('[')
+        for start in range(0, end, INSPECT_CHUNK):
+            if start:
+                out.write(', ')
+            out.write(', '.join(map(str, values[start:min(end, start + INSPECT_CHUNK)])))
+        if end < len(values):
+            out.write(', ...' if end else '...')
+        out.write(']')
+
+
+@dataclass(init=False, eq=False)
 class HashKey():
+    # The key of an array holds the keys of its elements. Every key keeps its hash, so nested
+    # keys are only hashed once and keys with different hashes compare unequal straight away.
+    __slots__ = ('Type', 'Value', 'hash')
     Type: ObjectType
-    Value: int
+    Value: Union[int, str, Tuple['HashKey', ...]]
+
+    def __init__(self, Type: ObjectType, Value: Union[int, str, Tuple['HashKey', ...]]) -> None:
+        self.Type = Type
+        self.Value = Value
+        self.hash = hash(Value)
+
+    # Keys of the same type and value find the same pair.
+    def __eq__(self, other: Any) -> bool:
+        return (type(other) == HashKey and self.hash == other.hash and self.Value == other.Value
+                and self.Type.TypeName == other.Type.TypeName)
+
+    def __hash__(self) -> int:
+        return self.hash
 
 
 @singledispatch
@@ -205,10 +426,28 @@ def GetHashKeyInteger(i: Integer) -> HashKey:
 
 @GetHashKey.register(String)
 def GetHashKeyString(s: String) -> HashKey:
-    m = hashlib.sha256()
-    m.update(s.Value.encode())
-    digest = int(m.hexdigest(), 16)
-    return HashKey(Type=s.Type, Value=digest)
+    # The key holds the string itself: Python caches its hash, and keys that share a hash are
+    # still told apart by comparing the strings.
+    key = getattr(s, 'hashKey', None)
+    if key is None:
+        key = s.hashKey = HashKey(Type=STRING_TYPE, Value=s.Value)
+    return key
+
+
+@GetHashKey.register(Array)
+def GetHashKeyArray(a: Array) -> Optional[HashKey]:
+    # Arrays never change what they see, so their key is made once. Arrays holding anything
+    # that cannot be a key cannot be one either.
+    key = getattr(a, 'hashKey', None)
+    if key is None:
+        keys: List[HashKey] = []
+        for e in a.store[a.start:a.end]:
+            k = GetHashKey(e)
+            if k is None:
+                return None
+            keys.append(k)
+        key = a.hashKey = HashKey(Type=ARRAY_TYPE, Value=tuple(keys))
+    return key
 
 
 @dataclass
@@ -217,51 +456,53 @@ class HashPair():
     Value: Object
 
 
-@dataclass
+@dataclass(eq=False)
 class Hash(Object):
-    Pairs: List[Tuple[HashKey, HashPair]]
+    __slots__ = ('Pairs', )
+    # A dict for hash literals, or a persistent hamt.Map for hashes made by set, delete and
+    # merge. Both iterate in insertion order.
+    Pairs: Mapping[HashKey, HashPair]
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(HASH_OBJ)
+    Type = HASH_TYPE
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        return (type(other) == Hash and len(self.Pairs) == len(other.Pairs)
+                and self.Pairs == other.Pairs)
 
     @property
     def Inspect(self) -> str:
-        out: List[str] = []
-
-        pairs: List[str] = []
-        for key, pair in self.Pairs:
-            pairs.append('%s: %s' % (pair.Key.Inspect, pair.Value.Inspect))
-
-        out.append('{')
-        out.append(', '.join(pairs))
-        out.append('}')
-
-        return ''.join(out)
+        out = io.StringIO()
+        self.InspectTo(out)
+        return out.getvalue()
+
+    def InspectTo(self, out: IO[str], limit: Optional[int] = None) -> None:
+        out.write('{')
+        for i, pair in enumerate(self.Pairs.values()):
+            if limit is not None and i >= limit:
+                out.write(', ...' if i else '...')
+                break
+            if i:
+                out.write(', ')
+            pair.Key.InspectTo(out, limit)
+            out.write(': ')
+            pair.Value.InspectTo(out, limit)
+        out.write('}')
 
 
 def GetHashPair(hash: Hash, key: HashKey) -> Optional[HashPair]:
-    pairs: List[Tuple[HashKey, HashPair]] = hash.Pairs
-
     if not key:
         return None
-
-    # TODO: It's is O(n)
-    list = [x for x in pairs if x[0].Value == key.Value]
-    if len(list) == 0:
-        return None
-
-    hashKey, hashPair = list[0]
-    return hashPair
+    return hash.Pairs.get(key)
 
 
 @dataclass
 class Quote(Object):
+    __slots__ = ('Node', )
     Node: ast.Node
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(QUOTE_OBJ)
+    Type = QUOTE_TYPE
 
     @property
     def Inspect(self) -> str:
@@ -274,16 +515,15 @@ class Quote(Object):
         return ''.join(out)
 
 
-BuiltinFunction = Callable[[List[Object]], Object]
+BuiltinFunction = Callable[..., Object]
 
 
 @dataclass
 class Builtin(Object):
     Fn: Any
+    Arity: Optional[int] = None
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(BUILTIN_OBJ)
+    Type = BUILTIN_TYPE
 
     @property
     def Inspect(self) -> str:
@@ -302,10 +542,78 @@ class Environment:
         return obj
 
     def Set(self, name: str, val: Object) -> Object:
+        if self.outer is not None and name not in LOOKUP_CACHE.LocalNames:
+            BindLocalName(name)
         self.store[name] = val
         return val
 
 
+@dataclass
+class Cell:
+    # A variable that closures capture. The frame binding it and the closures share the cell, so
+    # closures need not keep the whole frame alive.
+    Value: Optional[Object] = None
+
+
+@dataclass
+class Frame(Environment):
+    slots: List[Any] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+
+    def Get(self, name: str) -> Optional[Object]:
+        obj: Optional[Object] = None
+        if name in self.names:
+            obj = self.slots[self.names.index(name)]
+            if type(obj) == Cell:
+                obj = obj.Value
+        elif self.store:
+            obj = self.store.get(name)
+        if not obj and self.outer is not None:
+            obj = self.outer.Get(name)
+        return obj
+
+    def Set(self, name: str, val: Object) -> Object:
+        if name in self.names:
+            i = self.names.index(name)
+            if type(self.slots[i]) == Cell:
+                self.slots[i].Value = val
+            else:
+                self.slots[i] = val
+        else:
+            if self.store is FRAME_STORE:
+                self.store = dict()
+            if name not in LOOKUP_CACHE.LocalNames:
+                BindLocalName(name)
+            self.store[name] = val
+        return val
+
+
+# Frames address their variables by slot and only need a store for names the resolver did not
+# see, so they all start out sharing this one until the first such Set.
+FRAME_STORE: Dict[str, Object] = dict()
+
+
+def NewFrame(slots: List[Any], names: List[str], outer: Environment) -> Frame:
+    return Frame(store=FRAME_STORE, outer=outer, slots=slots, names=names)
+
+
+@dataclass
+class LookupCache:
+    Epoch: int = 0
+    LocalNames: Set[str] = field(default_factory=set)
+
+
+# Identifiers without a lexical address cache lookups of names that were only ever bound in an
+# outermost environment. Binding such a name in an inner environment for the first time bumps
+# the epoch, which invalidates all of those caches at once.
+LOOKUP_CACHE = LookupCache()
+
+
+def BindLocalName(name: str) -> None:
+    LOOKUP_CACHE.LocalNames.add(name)
+    LOOKUP_CACHE.Epoch += 1
+
+
 def NewEnvironment() -> Environment:
     s: Dict[str, Object] = dict()
     return Environment(store=s, outer=None)
@@ -319,13 +627,12 @@ def NewEnclosedEnvironment(outer: Environment) -> Environment:
 
 @dataclass
 class Macro(Object):
+    __slots__ = ('Parameters', 'Body', 'Env')
     Parameters: List[ast.Identifier]
     Body: ast.BlockStatement
     Env: Environment
 
-    @property
-    def Type(self) -> ObjectType:
-        return ObjectType(MACRO_OBJ)
+    Type = MACRO_TYPE
 
     @property
     def Inspect(self) -> str:
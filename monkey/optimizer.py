@@ -0,0 +1,480 @@
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, cast
+
+from monkey import ast, evaluator, object, token
+
+
+@dataclass
+class Options:
+    FoldConstants: bool = True
+    PruneBranches: bool = True
+    RemoveUnreachable: bool = True
+    RemoveUnusedLets: bool = True
+    InlineFunctions: bool = True
+    InlineMaxNodes: int = 24
+
+
+@dataclass
+class Report:
+    Inlined: List[str] = field(default_factory=list)
+    Folded: List[str] = field(default_factory=list)
+    Pruned: List[str] = field(default_factory=list)
+    Unreachable: List[str] = field(default_factory=list)
+    UnusedLets: List[str] = field(default_factory=list)
+
+    def Changed(self) -> bool:
+        return bool(self.Inlined or self.Folded or self.Pruned or self.Unreachable
+                    or self.UnusedLets)
+
+    def String(self) -> str:
+        out: List[str] = []
+        for title, changes in (('inlined', self.Inlined), ('folded', self.Folded),
+                               ('pruned', self.Pruned), ('unreachable', self.Unreachable),
+                               ('unused let', self.UnusedLets)):
+            for change in changes:
+                out.append('%s: %s' % (title, change))
+        return '\n'.join(out)
+
+
+def Optimize(program: ast.Program, options: Optional[Options] = None) -> Report:
+    o = Optimizer(Options=options if options is not None else Options(), Report=Report())
+    if o.Options.InlineFunctions:
+        o.collectBindings(program)
+    program.Statements = o.statements(program.Statements, False)
+    return o.Report
+
+
+@dataclass
+class Optimizer:
+    Options: Options
+    Report: Report
+    # How often each name is bound by a let, and every name used as a parameter, in the whole
+    # program. A name bound exactly once and never a parameter means the same thing everywhere.
+    Bindings: Dict[str, int] = field(default_factory=dict)
+    Parameters: List[str] = field(default_factory=list)
+    # Parameters of the enclosing functions, innermost last.
+    Scopes: List[List[str]] = field(default_factory=list)
+    Candidates: Dict[str, ast.FunctionLiteral] = field(default_factory=dict)
+    Inlining: List[str] = field(default_factory=list)
+    Branches: int = 0
+
+    def collectBindings(self, program: ast.Program) -> None:
+        def f(node: ast.Node) -> bool:
+            if type(node) == ast.LetStatement:
+                name = cast(ast.LetStatement, node).Name.Value
+                self.Bindings[name] = self.Bindings.get(name, 0) + 1
+            elif type(node) == ast.FunctionLiteral or type(node) == ast.MacroLiteral:
+                self.Parameters.extend(p.Value for p in node.Parameters)
+            return True
+
+        ast.Inspect(program, f)
+
+    def statements(self, stmts: List[ast.Statement], inFunction: bool) -> List[ast.Statement]:
+        result: List[ast.Statement] = []
+        last = len(stmts) - 1
+        for i, stmt in enumerate(stmts):
+            stmt = self.statement(stmt)
+
+            spliced = [stmt]
+            if self.Options.PruneBranches and i != last and isIfStatement(stmt):
+                # The value of an if that is not the last statement is discarded, and blocks do
+                # not introduce scopes, so a decided branch can be spliced into this list.
+                ie = cast(ast.IfExpression, cast(ast.ExpressionStatement, stmt).ExpressionValue)
+                branch = decideBranch(ie)
+                if branch is not False:
+                    self.Report.Pruned.append(ie.String())
+                    spliced = cast(ast.BlockStatement, branch).Statements if branch else []
+
+            result.extend(spliced)
+
+            # A return of nothing does not return, and evaluation goes on after it.
+            returned = any(type(s) == ast.ReturnStatement
+                           and not mayBeAbsent(cast(ast.ReturnStatement, s).ReturnValue)
+                           for s in spliced)
+            if self.Options.RemoveUnreachable and returned and i != last:
+                for dead in stmts[i + 1:]:
+                    self.Report.Unreachable.append(dead.String())
+                break
+
+        if self.Options.RemoveUnusedLets and inFunction:
+            result = self.removeUnusedLets(result)
+
+        return result
+
+    def statement(self, stmt: ast.Statement) -> ast.Statement:
+        if type(stmt) == ast.ExpressionStatement:
+            es = cast(ast.ExpressionStatement, stmt)
+            if es.ExpressionValue is not None:
+                es.ExpressionValue = self.expression(es.ExpressionValue)
+        elif type(stmt) == ast.LetStatement:
+            let = cast(ast.LetStatement, stmt)
+            let.Value = self.expression(let.Value)
+            # A let inside a branch may not have run by the time a later call executes.
+            if (self.Options.InlineFunctions and self.Branches == 0
+                    and type(let.Value) == ast.FunctionLiteral
+                    and self.isCandidate(let.Name.Value, cast(ast.FunctionLiteral, let.Value))):
+                self.Candidates[let.Name.Value] = cast(ast.FunctionLiteral, let.Value)
+        elif type(stmt) == ast.ReturnStatement:
+            rs = cast(ast.ReturnStatement, stmt)
+            rs.ReturnValue = self.expression(rs.ReturnValue)
+        return stmt
+
+    def block(self, block: ast.BlockStatement, inFunction: bool) -> ast.BlockStatement:
+        block.Statements = self.statements(block.Statements, inFunction)
+        return block
+
+    def expression(self, node: ast.Expression) -> ast.Expression:
+        if type(node) == ast.InfixExpression:
+            infix = cast(ast.InfixExpression, node)
+            if infix.Left is not None:
+                infix.Left = self.expression(infix.Left)
+            if infix.Right is not None:
+                infix.Right = self.expression(infix.Right)
+            if self.Options.FoldConstants:
+                return self.foldInfix(infix)
+        elif type(node) == ast.PrefixExpression:
+            prefix = cast(ast.PrefixExpression, node)
+            if prefix.Right is not None:
+                prefix.Right = self.expression(prefix.Right)
+            if self.Options.FoldConstants:
+                return self.foldPrefix(prefix)
+        elif type(node) == ast.IfExpression:
+            ie = cast(ast.IfExpression, node)
+            ie.Condition = self.expression(ie.Condition)
+            self.Branches += 1
+            ie.Consequence = self.block(ie.Consequence, False)
+            if ie.Alternative is not None:
+                ie.Alternative = self.block(ie.Alternative, False)
+            self.Branches -= 1
+            if self.Options.PruneBranches:
+                return self.pruneIf(ie)
+        elif type(node) == ast.FunctionLiteral:
+            fl = cast(ast.FunctionLiteral, node)
+            candidates, branches = dict(self.Candidates), self.Branches
+            self.Scopes.append([p.Value for p in fl.Parameters])
+            self.Branches = 0
+            fl.Body = self.block(fl.Body, True)
+            self.Scopes.pop()
+            self.Candidates, self.Branches = candidates, branches
+        elif type(node) == ast.CallExpression:
+            call = cast(ast.CallExpression, node)
+            if call.Function.TokenLiteral() == 'quote':
+                return call
+            call.Function = self.expression(call.Function)
+            call.Arguments = [self.expression(a) for a in call.Arguments]
+            if self.Options.InlineFunctions:
+                return self.inline(call)
+        elif type(node) == ast.ArrayLiteral:
+            array = cast(ast.ArrayLiteral, node)
+            array.Elements = [self.expression(e) for e in array.Elements]
+        elif type(node) == ast.IndexExpression:
+            index = cast(ast.IndexExpression, node)
+            index.Left = self.expression(index.Left)
+            index.Index = self.expression(index.Index)
+        elif type(node) == ast.HashLiteral:
+            hl = cast(ast.HashLiteral, node)
+            hl.Pairs = [(self.expression(k), self.expression(v)) for k, v in hl.Pairs]
+        return node
+
+    def foldInfix(self, node: ast.InfixExpression) -> ast.Expression:
+        # Division is left alone: it yields a float today and may divide by zero.
+        if node.Operator == '/':
+            return node
+        left = literalValue(node.Left)
+        right = literalValue(node.Right)
+        if left is None or right is None:
+            return node
+        return self.folded(node, evaluator.evalInfixExpression(node.Operator, left, right))
+
+    def foldPrefix(self, node: ast.PrefixExpression) -> ast.Expression:
+        right = literalValue(node.Right)
+        if right is None:
+            return node
+        return self.folded(node, evaluator.evalPrefixExpression(node.Operator, right))
+
+    def folded(self, node: ast.Expression, value: object.Object) -> ast.Expression:
+        # Operations that fail are kept so that the error is still reported at run time.
+        literal = literalNode(value)
+        if literal is None:
+            return node
+        self.Report.Folded.append('%s => %s' % (node.String(), literal.String()))
+        return literal
+
+    def pruneIf(self, node: ast.IfExpression) -> ast.Expression:
+        branch = decideBranch(node)
+        if branch is False or branch is None:
+            return node
+
+        # In expression position the branch has to produce the if's value, so only a branch
+        # that is a single expression which cannot evaluate to nothing can stand in for it.
+        block = cast(ast.BlockStatement, branch)
+        if len(block.Statements) != 1 or type(block.Statements[0]) != ast.ExpressionStatement:
+            return node
+        expression = cast(ast.ExpressionStatement, block.Statements[0]).ExpressionValue
+        if expression is None or mayBeAbsent(expression):
+            return node
+
+        self.Report.Pruned.append(node.String())
+        return expression
+
+    def isCandidate(self, name: str, fl: ast.FunctionLiteral) -> bool:
+        if not self.isUnique(name):
+            return False
+        body = inlineBody(fl)
+        if body is None or countNodes(body) > self.Options.InlineMaxNodes:
+            return False
+        params = [p.Value for p in fl.Parameters]
+        if len(set(params)) != len(params):
+            return False
+
+        # The body must be a single expression that binds nothing and refers only to its
+        # parameters, builtins and names that mean the same at every call site. That also rules
+        # out recursion through its own name.
+        ok = [True]
+
+        def f(node: ast.Node) -> bool:
+            if type(node) in (ast.FunctionLiteral, ast.MacroLiteral, ast.LetStatement,
+                              ast.ReturnStatement):
+                ok[0] = False
+            elif type(node) == ast.CallExpression:
+                if cast(ast.CallExpression, node).Function.TokenLiteral() in ('quote', 'unquote'):
+                    ok[0] = False
+            elif type(node) == ast.Identifier:
+                value = cast(ast.Identifier, node).Value
+                if value == name or (value not in params and not self.isBuiltin(value)
+                                     and not self.isUnique(value)):
+                    ok[0] = False
+            return ok[0]
+
+        ast.Inspect(body, f)
+        return ok[0]
+
+    def isUnique(self, name: str) -> bool:
+        return self.Bindings.get(name) == 1 and name not in self.Parameters
+
+    def isBuiltin(self, name: str) -> bool:
+        return (name in evaluator.builtins and name not in self.Bindings
+                and name not in self.Parameters)
+
+    def isTrivial(self, node: ast.Expression) -> bool:
+        # Trivial arguments can be evaluated any number of times, at any point, with the same
+        # result: literals, and names that are always bound here.
+        if type(node) in (ast.IntegerLiteral, ast.Boolean, ast.StringLiteral):
+            return True
+        if type(node) == ast.Identifier:
+            value = cast(ast.Identifier, node).Value
+            return any(value in scope for scope in self.Scopes) or self.isBuiltin(value)
+        return False
+
+    def inline(self, call: ast.CallExpression) -> ast.Expression:
+        if type(call.Function) != ast.Identifier:
+            return call
+        name = cast(ast.Identifier, call.Function).Value
+        fl = self.Candidates.get(name)
+        if fl is None or name in self.Inlining or len(call.Arguments) != len(fl.Parameters):
+            return call
+
+        body = cast(ast.Expression, inlineBody(fl))
+        params = [p.Value for p in fl.Parameters]
+        args = dict(zip(params, call.Arguments))
+
+        # Any other argument has to be evaluated exactly once, in the same order and before
+        # anything else in the body could fail or have an effect. It must not evaluate to
+        # nothing either, as the call would drop it and shift the remaining arguments.
+        pending = [p for p in params if not self.isTrivial(args[p])]
+        if any(mayBeAbsent(args[p]) for p in pending):
+            return call
+        order = [e for e in self.events(body, params) if e is None or e in pending]
+        if [e for e in order if e is not None] != pending:
+            return call
+        if pending and None in order[:order.index(pending[-1])]:
+            return call
+
+        inlined = substitute(body, args)
+        self.Report.Inlined.append('%s => %s' % (call.String(), inlined.String()))
+        self.Inlining.append(name)
+        inlined = self.expression(inlined)
+        self.Inlining.pop()
+        return inlined
+
+    def events(self, node: ast.Node, params: List[str]) -> List[Optional[str]]:
+        # The parameters read by node in evaluation order, with None wherever something could
+        # fail or have an effect.
+        out: List[Optional[str]] = []
+
+        def visit(node: ast.Node) -> None:
+            if type(node) == ast.Identifier:
+                value = cast(ast.Identifier, node).Value
+                if value in params:
+                    out.append(value)
+                elif not self.isBuiltin(value):
+                    out.append(None)
+            elif type(node) == ast.IfExpression:
+                ie = cast(ast.IfExpression, node)
+                visit(ie.Condition)
+                out.append(None)
+                visit(ie.Consequence)
+                if ie.Alternative is not None:
+                    visit(ie.Alternative)
+            else:
+                for child in ast.Children(node):
+                    visit(child)
+                if type(node) in (ast.PrefixExpression, ast.InfixExpression,
+                                  ast.IndexExpression, ast.CallExpression):
+                    out.append(None)
+
+        visit(node)
+        return out
+
+    def removeUnusedLets(self, stmts: List[ast.Statement]) -> List[ast.Statement]:
+        used: List[str] = []
+
+        def f(node: ast.Node) -> bool:
+            if type(node) == ast.Identifier:
+                used.append(cast(ast.Identifier, node).Value)
+            elif type(node) == ast.LetStatement:
+                ast.Inspect(cast(ast.LetStatement, node).Value, f)
+                return False
+            return True
+
+        for stmt in stmts:
+            ast.Inspect(stmt, f)
+
+        # The last statement gives the block its value, which for a let is nothing, so only a let
+        # that is followed by another statement can go.
+        result: List[ast.Statement] = []
+        for i, stmt in enumerate(stmts):
+            if type(stmt) == ast.LetStatement and i < len(stmts) - 1:
+                let = cast(ast.LetStatement, stmt)
+                if let.Name.Value not in used and isPure(let.Value):
+                    self.Report.UnusedLets.append(let.String())
+                    continue
+            result.append(stmt)
+        return result
+
+
+def inlineBody(fl: ast.FunctionLiteral) -> Optional[ast.Expression]:
+    if len(fl.Body.Statements) != 1:
+        return None
+    stmt = fl.Body.Statements[0]
+    if type(stmt) == ast.ExpressionStatement:
+        return cast(ast.ExpressionStatement, stmt).ExpressionValue
+    elif type(stmt) == ast.ReturnStatement:
+        return cast(ast.ReturnStatement, stmt).ReturnValue
+    return None
+
+
+def countNodes(node: ast.Node) -> int:
+    count = [0]
+
+    def f(node: ast.Node) -> bool:
+        count[0] += 1
+        return True
+
+    ast.Inspect(node, f)
+    return count[0]
+
+
+def substitute(node: Any, args: Dict[str, ast.Expression]) -> Any:
+    # Copies an inline body, replacing its parameters with copies of the arguments.
+    if type(node) == ast.Identifier and node.Value in args:
+        return copy.deepcopy(args[node.Value])
+    node = copy.copy(node)
+    if type(node) == ast.PrefixExpression:
+        node.Right = substitute(node.Right, args)
+    elif type(node) == ast.InfixExpression:
+        node.Left = substitute(node.Left, args)
+        node.Right = substitute(node.Right, args)
+    elif type(node) == ast.IndexExpression:
+        node.Left = substitute(node.Left, args)
+        node.Index = substitute(node.Index, args)
+    elif type(node) == ast.CallExpression:
+        node.Function = substitute(node.Function, args)
+        node.Arguments = [substitute(a, args) for a in node.Arguments]
+    elif type(node) == ast.ArrayLiteral:
+        node.Elements = [substitute(e, args) for e in node.Elements]
+    elif type(node) == ast.HashLiteral:
+        node.Pairs = [(substitute(k, args), substitute(v, args)) for k, v in node.Pairs]
+    elif type(node) == ast.IfExpression:
+        node.Condition = substitute(node.Condition, args)
+        node.Consequence = substitute(node.Consequence, args)
+        if node.Alternative is not None:
+            node.Alternative = substitute(node.Alternative, args)
+    elif type(node) == ast.BlockStatement:
+        node.Statements = [substitute(s, args) for s in node.Statements]
+    elif type(node) == ast.ExpressionStatement:
+        node.ExpressionValue = substitute(node.ExpressionValue, args)
+    return node
+
+
+def isIfStatement(stmt: ast.Statement) -> bool:
+    return (type(stmt) == ast.ExpressionStatement
+            and type(cast(ast.ExpressionStatement, stmt).ExpressionValue) == ast.IfExpression)
+
+
+def decideBranch(node: ast.IfExpression) -> Any:
+    # Returns False when the condition is not constant, otherwise the branch that runs or None.
+    condition = literalValue(node.Condition)
+    if condition is None:
+        return False
+    if evaluator.isTruthy(condition):
+        return node.Consequence
+    return node.Alternative
+
+
+def literalValue(node: Optional[ast.Node]) -> Optional[object.Object]:
+    if type(node) == ast.IntegerLiteral:
+        return evaluator.literalConstant(node)
+    elif type(node) == ast.Boolean:
+        return evaluator.nativeBoolToBooleanObject(cast(ast.Boolean, node).Value)
+    elif type(node) == ast.StringLiteral:
+        return evaluator.literalConstant(node)
+    return None
+
+
+def literalNode(obj: object.Object) -> Optional[ast.Expression]:
+    if type(obj) == object.Integer:
+        if type(obj.Value) != int:
+            return None
+        return ast.IntegerLiteral(Token=token.Token(Type=token.INT, Literal=str(obj.Value)),
+                                  Value=obj.Value)
+    elif type(obj) == object.Boolean:
+        if obj.Value:
+            return ast.Boolean(Token=token.Token(Type=token.TRUE, Literal='true'), Value=True)
+        return ast.Boolean(Token=token.Token(Type=token.FALSE, Literal='false'), Value=False)
+    elif type(obj) == object.String:
+        return ast.StringLiteral(Token=token.Token(Type=token.STRING, Literal=obj.Value),
+                                 Value=obj.Value)
+    return None
+
+
+def mayBeAbsent(node: ast.Node) -> bool:
+    # A call can return nothing (a function ending in let), and that propagates outwards.
+    found: List[ast.Node] = []
+
+    def f(node: ast.Node) -> bool:
+        if type(node) == ast.CallExpression:
+            found.append(node)
+        return type(node) != ast.FunctionLiteral and not found
+
+    ast.Inspect(node, f)
+    return len(found) > 0
+
+
+def isPure(node: ast.Node) -> bool:
+    # Only values whose evaluation can neither fail nor have effects may be dropped.
+    if type(node) in (ast.IntegerLiteral, ast.Boolean, ast.StringLiteral, ast.FunctionLiteral):
+        return True
+    elif type(node) == ast.ArrayLiteral:
+        return all(isPure(e) for e in cast(ast.ArrayLiteral, node).Elements)
+    elif type(node) == ast.HashLiteral:
+        return all(isPureKey(k) and isPure(v) for k, v in cast(ast.HashLiteral, node).Pairs)
+    return False
+
+
+def isPureKey(node: ast.Node) -> bool:
+    # A key must also be hashable, which a function is not, nor an array that holds one.
+    if type(node) == ast.ArrayLiteral:
+        return all(isPureKey(e) for e in cast(ast.ArrayLiteral, node).Elements)
+    return type(node) in (ast.IntegerLiteral, ast.Boolean, ast.StringLiteral)
@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, cast
+
+from monkey import ast
+
+# Builtins whose result only depends on their arguments.
+PURE_BUILTINS = ('len', 'first', 'last', 'rest', 'push', 'set', 'delete', 'merge', 'keys',
+                 'values', 'intArray', 'array', 'range', 'vadd', 'vsub', 'vmul', 'vlt', 'vgt',
+                 'veq', 'vmask', 'vsum', 'vdot')
+
+# How a name outside a function is bound: once, so that a closure always sees the same value,
+# or more than once. A name bound once to a function literal maps to the literal instead.
+FIXED = 'FIXED'
+MUTABLE = 'MUTABLE'
+
+
+@dataclass
+class Scope:
+    Names: Dict[str, Any]
+    Outer: Any
+
+    def Lookup(self, name: str) -> Optional[Any]:
+        s = self
+        while s is not None:
+            if name in s.Names:
+                return s.Names[name]
+            s = s.Outer
+        return None
+
+
+@dataclass
+class Facts:
+    Name: str
+    Literal: ast.FunctionLiteral
+    Scope: Scope
+    Pure: bool = True
+    Calls: List[ast.FunctionLiteral] = field(default_factory=list)
+
+
+def Analyze(program: ast.Program, closed: bool = False) -> List[str]:
+    # Sets Pure on the body of every function literal: a pure function cannot print, and only
+    # calls builtins and functions that are pure themselves, so its result only depends on its
+    # arguments and memo may cache it. A closed program is all the code there will be;
+    # otherwise later programs may rebind its top-level names, as they can in the REPL, and a
+    # top-level function may only rely on its own name. Expects a resolved program.
+    a = Analyzer(TopLevel=letBindings(program.Statements))
+    names: Dict[str, Any] = {}
+    for name, bound in a.TopLevel.items():
+        names[name] = bound if closed else MUTABLE
+    a.statements(program.Statements, Scope(Names=names, Outer=None), None)
+
+    for facts in a.Facts:
+        facts.Literal.Body.Pure = facts.Pure
+
+    # Functions start out pure and only lose it, so this reaches a fixed point.
+    changed = True
+    while changed:
+        changed = False
+        for facts in a.Facts:
+            body = facts.Literal.Body
+            if body.Pure and not all(fl.Body.Pure for fl in facts.Calls):
+                body.Pure = False
+                changed = True
+
+    return [facts.Name for facts in a.Facts if facts.Name and facts.Literal.Body.Pure]
+
+
+def letBindings(stmts: List[ast.Statement]) -> Dict[str, Any]:
+    # Only a let that runs unconditionally, and is the name's only one, binds it once.
+    bindings: Dict[str, Any] = {}
+    direct = [s for s in stmts if type(s) == ast.LetStatement]
+
+    def f(node: ast.Node) -> bool:
+        if type(node) == ast.FunctionLiteral or type(node) == ast.MacroLiteral:
+            return False
+        if type(node) == ast.LetStatement:
+            let = cast(ast.LetStatement, node)
+            name = let.Name.Value
+            if name in bindings or not any(let is d for d in direct):
+                bindings[name] = MUTABLE
+            else:
+                fl = functionLiteral(let.Value)
+                bindings[name] = fl if fl is not None else FIXED
+        return True
+
+    for stmt in stmts:
+        ast.Inspect(stmt, f)
+    return bindings
+
+
+def functionLiteral(node: ast.Expression) -> Optional[ast.FunctionLiteral]:
+    # The function a let binds its name to, directly or through memo.
+    if type(node) == ast.FunctionLiteral:
+        return cast(ast.FunctionLiteral, node)
+    if type(node) == ast.CallExpression:
+        call = cast(ast.CallExpression, node)
+        if type(call.Function) == ast.Identifier and call.Arguments:
+            memo = cast(ast.Identifier, call.Function)
+            if memo.Value == 'memo' and memo.Builtin is not None:
+                if type(call.Arguments[0]) == ast.FunctionLiteral:
+                    return cast(ast.FunctionLiteral, call.Arguments[0])
+    return None
+
+
+@dataclass
+class Analyzer:
+    TopLevel: Dict[str, Any]
+    Facts: List[Facts] = field(default_factory=list)
+
+    def statements(self, stmts: List[ast.Statement], scope: Scope,
+                   facts: Optional[Facts]) -> None:
+        for stmt in stmts:
+            self.visit(stmt, scope, facts)
+
+    def visit(self, node: ast.Node, scope: Scope, facts: Optional[Facts]) -> None:
+        if type(node) == ast.Identifier:
+            self.read(cast(ast.Identifier, node), facts)
+        elif type(node) == ast.CallExpression:
+            self.call(cast(ast.CallExpression, node), scope, facts)
+        elif type(node) == ast.FunctionLiteral:
+            self.function(cast(ast.FunctionLiteral, node), scope, '')
+        elif type(node) == ast.MacroLiteral:
+            if facts is not None:
+                facts.Pure = False
+        elif type(node) == ast.LetStatement:
+            let = cast(ast.LetStatement, node)
+            fl = functionLiteral(let.Value)
+            if fl is None:
+                self.visit(let.Value, scope, facts)
+                return
+            if fl is not let.Value:
+                memo = cast(ast.CallExpression, let.Value)
+                self.read(cast(ast.Identifier, memo.Function), facts)
+                for arg in memo.Arguments[1:]:
+                    self.visit(arg, scope, facts)
+            self.function(fl, scope, let.Name.Value)
+        else:
+            for child in ast.Children(node):
+                self.visit(child, scope, facts)
+
+    def function(self, fl: ast.FunctionLiteral, outer: Scope, name: str) -> None:
+        if outer.Outer is None and self.TopLevel.get(name) is fl and outer.Names[name] is not fl:
+            # A top-level function of an open program can still rely on its own name.
+            outer = Scope(Names={name: fl}, Outer=outer)
+        names = letBindings(fl.Body.Statements)
+        for p in fl.Parameters:
+            names[p.Value] = FIXED if p.Value not in names else MUTABLE
+        scope = Scope(Names=names, Outer=outer)
+        facts = Facts(Name=name, Literal=fl, Scope=scope)
+        self.Facts.append(facts)
+        self.statements(fl.Body.Statements, scope, facts)
+
+    def read(self, node: ast.Identifier, facts: Optional[Facts]) -> None:
+        if facts is None or node.Value in facts.Scope.Names:
+            return
+        bound = facts.Scope.Lookup(node.Value)
+        if bound is None:
+            if node.Builtin is None or node.Value not in PURE_BUILTINS:
+                facts.Pure = False
+        elif bound == MUTABLE:
+            facts.Pure = False
+
+    def call(self, node: ast.CallExpression, scope: Scope, facts: Optional[Facts]) -> None:
+        for arg in node.Arguments:
+            self.visit(arg, scope, facts)
+        if facts is None:
+            self.visit(node.Function, scope, facts)
+            return
+
+        if type(node.Function) == ast.FunctionLiteral:
+            self.visit(node.Function, scope, facts)
+            facts.Calls.append(cast(ast.FunctionLiteral, node.Function))
+            return
+        if type(node.Function) != ast.Identifier:
+            self.visit(node.Function, scope, facts)
+            facts.Pure = False
+            return
+
+        ident = cast(ast.Identifier, node.Function)
+        bound = facts.Scope.Lookup(ident.Value)
+        if type(bound) == ast.FunctionLiteral:
+            facts.Calls.append(bound)
+        elif bound is not None or ident.Builtin is None or ident.Value not in PURE_BUILTINS:
+            facts.Pure = False
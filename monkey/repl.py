@@ -1,11 +1,13 @@
-from typing import List
+from typing import List, cast
 
-from monkey import evaluator, lexer, object, parser
+from monkey import ast, evaluator, inference, lexer, object, optimizer, parser, purity, resolver
 
 PROMPT = '>> '
 
 
 def Start() -> None:
+    # What puts prints shows up as soon as each call returns.
+    evaluator.output.LineBuffered = True
     env = object.NewEnvironment()
     macroEnv = object.NewEnvironment()
     while True:
@@ -27,7 +29,11 @@ def Start() -> None:
             continue
 
         evaluator.DefineMacros(program, macroEnv)
-        expanded = evaluator.ExpandMacros(program, macroEnv)
+        expanded = cast(ast.Program, evaluator.ExpandMacros(program, macroEnv))
+        optimizer.Optimize(expanded)
+        resolver.Resolve(expanded, env)
+        inference.Infer(expanded)
+        purity.Analyze(expanded)
 
         evaluator.Eval(expanded, env)
 
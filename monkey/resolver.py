@@ -0,0 +1,215 @@
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple, cast
+
+from monkey import ast, evaluator, object
+
+
+@dataclass
+class Scope:
+    Names: List[str]
+    Outer: Any
+    # Names of enclosing scopes that this function's closures capture, in the order of the
+    # cells they are kept in, and the names of its own that closures capture.
+    Free: List[str] = field(default_factory=list)
+    Cells: List[str] = field(default_factory=list)
+    # What can only be finished once the whole function is resolved.
+    Locals: List[ast.Identifier] = field(default_factory=list)
+    Globals: List[ast.Identifier] = field(default_factory=list)
+    Literals: List[ast.FunctionLiteral] = field(default_factory=list)
+    Parameters: int = 0
+    Body: Optional[ast.BlockStatement] = None
+
+
+@dataclass
+class Globals:
+    Names: List[str]
+    Env: Optional[object.Environment]
+    Closed: bool
+
+    def Defines(self, name: str) -> bool:
+        if name in self.Names:
+            return True
+        return self.Env is not None and self.Env.Get(name) is not None
+
+
+def Resolve(node: ast.Node, env: Optional[object.Environment] = None,
+            closed: bool = False) -> None:
+    resolve(node, Globals(Names=localNames(node), Env=env, Closed=closed))
+
+
+def resolve(node: ast.Node, scope: Any) -> None:
+    if type(node) == ast.Identifier:
+        resolveIdentifier(cast(ast.Identifier, node), scope)
+    elif type(node) == ast.CallExpression:
+        call = cast(ast.CallExpression, node)
+        if isQuoteCall(call):
+            resolveQuote(call, scope)
+            return
+        for child in ast.Children(call):
+            resolve(child, scope)
+        resolveBuiltinCall(call)
+    elif type(node) == ast.FunctionLiteral:
+        resolveFunctionLiteral(cast(ast.FunctionLiteral, node), scope)
+    elif type(node) == ast.MacroLiteral:
+        return
+    elif type(node) == ast.LetStatement:
+        let = cast(ast.LetStatement, node)
+        if type(let.Value) == ast.FunctionLiteral and isSingleLet(let, scope):
+            resolveFunctionLiteral(cast(ast.FunctionLiteral, let.Value), scope, let.Name.Value)
+        else:
+            resolve(let.Value, scope)
+        resolveIdentifier(let.Name, scope, False)
+    else:
+        for child in ast.Children(node):
+            resolve(child, scope)
+
+
+def resolveIdentifier(node: ast.Identifier, scope: Any, read: bool = True) -> None:
+    s = scope
+    if type(s) == Scope:
+        s = cast(Scope, s)
+        if node.Value in s.Names:
+            node.Depth = 0
+            node.Slot = s.Names.index(node.Value)
+            s.Locals.append(node)
+            # Reading a let's name before it runs reaches an enclosing binding by name, so a
+            # function that does so captures that binding too.
+            if read and node.Slot >= s.Parameters and node.Slot != s.Body.Self:
+                capture(s, node.Value)
+            return
+
+        # A function reaches the variables of enclosing functions through its own cells.
+        if capture(s, node.Value):
+            node.Depth = 1
+            node.Slot = s.Free.index(node.Value)
+            node.Cell = True
+            return
+
+        s.Globals.append(node)
+        while type(s) == Scope:
+            s = s.Outer
+
+    # Globals stay name-addressed so that the REPL can keep adding them; the depth still tells
+    # the evaluator how many frames to skip to reach the global environment.
+    node.Depth = 0
+    node.Slot = None
+    node.Cell = False
+
+    # Builtins are only consulted once nothing else binds the name. A closed program is all the
+    # code there will be, so a builtin that none of its globals shadows can be bound now; in the
+    # REPL a later line may still define the name.
+    globals = cast(Globals, s)
+    builtin = evaluator.builtins.get(node.Value)
+    if builtin is not None and globals.Closed and not globals.Defines(node.Value):
+        node.Builtin = builtin
+
+
+def resolveBuiltinCall(node: ast.CallExpression) -> None:
+    if type(node.Function) != ast.Identifier:
+        return
+    builtin = cast(ast.Identifier, node.Function).Builtin
+    if builtin is None:
+        return
+    if builtin.Arity is None or builtin.Arity == len(node.Arguments):
+        node.Builtin = builtin
+
+
+def capture(scope: Scope, name: str) -> bool:
+    # Makes name a free variable of scope and of every scope up to the function binding it.
+    path: List[Scope] = []
+    s: Any = scope
+    while True:
+        path.append(s)
+        s = s.Outer
+        if type(s) != Scope:
+            return False
+        if name in s.Names:
+            break
+
+    if name not in s.Cells:
+        s.Cells.append(name)
+    for p in path:
+        if name not in p.Free:
+            p.Free.append(name)
+    return True
+
+
+def isSingleLet(let: ast.LetStatement, scope: Any) -> bool:
+    return type(scope) == Scope and localNames(scope.Body).count(let.Name.Value) == 1
+
+
+def resolveFunctionLiteral(node: ast.FunctionLiteral, scope: Any, name: str = '') -> None:
+    names = [p.Value for p in node.Parameters]
+    for local in localNames(node.Body):
+        if local not in names:
+            names.append(local)
+
+    # A function bound by the only let of its name refers to itself through that name; giving
+    # it a slot of its own spares the closure a cell that would refer back to it.
+    body = node.Body
+    body.Self = None
+    if name and name not in names:
+        body.Self = len(names)
+        names.append(name)
+
+    body.Slots = names
+    body.Padding = [None] * (len(names) - len(node.Parameters))
+    body.Frames = []
+    inner = Scope(Names=names, Outer=scope, Parameters=len(node.Parameters), Body=body)
+    resolve(body, inner)
+
+    # Globals sit behind the frame, and behind the cells if there are any.
+    depth = 2 if inner.Free else 1
+    for ident in inner.Locals:
+        ident.Cell = ident.Value in inner.Cells
+    for ident in inner.Globals:
+        ident.Depth = depth
+    for literal in inner.Literals:
+        literal.Depth = depth
+    body.Cells = sorted(names.index(n) for n in inner.Cells)
+
+    node.Free = inner.Free
+    node.Captures = [locate(scope, n) for n in inner.Free]
+    node.Depth = 0
+    if type(scope) == Scope:
+        scope.Literals.append(node)
+
+
+def locate(scope: Scope, name: str) -> Tuple[int, int]:
+    # Where the cell of a free variable is found from the frame a closure is created in.
+    if name in scope.Names:
+        return 0, scope.Names.index(name)
+    return 1, scope.Free.index(name)
+
+
+def localNames(body: ast.Node) -> List[str]:
+    names: List[str] = []
+
+    def f(node: ast.Node) -> bool:
+        if type(node) == ast.FunctionLiteral or type(node) == ast.MacroLiteral:
+            return False
+        if type(node) == ast.LetStatement:
+            names.append(cast(ast.LetStatement, node).Name.Value)
+        return True
+
+    ast.Inspect(body, f)
+    return names
+
+
+def isQuoteCall(node: ast.CallExpression) -> bool:
+    return node.Function.TokenLiteral() == 'quote'
+
+
+def resolveQuote(node: ast.CallExpression, scope: Any) -> None:
+    # A quoted node is data; only the arguments of unquote calls inside it run in this scope.
+    def f(node: ast.Node) -> bool:
+        if type(node) == ast.CallExpression:
+            call = cast(ast.CallExpression, node)
+            if call.Function.TokenLiteral() == 'unquote':
+                for arg in call.Arguments:
+                    resolve(arg, scope)
+                return False
+        return True
+
+    for arg in node.Arguments:
+        ast.Inspect(arg, f)
@@ -0,0 +1,268 @@
+from typing import Any, List, Optional, Tuple
+
+from monkey import ast, object
+from monkey.evaluator import (
+    NULL, applyFunction, bindName, evalFunctionLiteral, evalIdentifier, evalQuickIndex,
+    evalQuickInfix, evalQuickPrefix, extendFunctionEnv, isError, isTruthy, literalConstant,
+    nativeBoolToBooleanObject, newHash, output, quote, unwrapReturnValue)
+
+# Continuation kinds. A continuation is a tuple whose first item is its kind; it records what
+# evaluator.Eval would do after the sub-evaluation it is waiting for returns.
+PROGRAM = 0
+BLOCK = 1
+PREFIX = 2
+INFIX_LEFT = 3
+INFIX_RIGHT = 4
+IF = 5
+IF_BRANCH = 6
+RETURN = 7
+LET = 8
+CALL_FUNCTION = 9
+CALL_ARGUMENTS = 10
+CALL_RETURN = 11
+ARRAY = 12
+INDEX_LEFT = 13
+INDEX_RIGHT = 14
+HASH_KEY = 15
+HASH_VALUE = 16
+
+Continuation = Tuple[Any, ...]
+
+
+def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
+    stack: List[Continuation] = []
+    val: Optional[object.Object] = None
+    program = type(node) == ast.Program
+
+    while True:
+        while node is not None:
+            t = type(node)
+            if t == ast.ExpressionStatement:
+                node = node.ExpressionValue
+            elif t == ast.IntegerLiteral or t == ast.StringLiteral:
+                val = node.Constant
+                if val is None:
+                    val = literalConstant(node)
+                node = None
+            elif t == ast.Boolean:
+                val = nativeBoolToBooleanObject(node.Value)
+                node = None
+            elif t == ast.Identifier:
+                val = evalIdentifier(node, env)
+                node = None
+            elif t == ast.FunctionLiteral:
+                val = evalFunctionLiteral(node, env)
+                node = None
+            elif t == ast.Program or t == ast.BlockStatement:
+                val = None
+                if len(node.Statements) == 0:
+                    node = None
+                else:
+                    stack.append((PROGRAM if t == ast.Program else BLOCK, node, env, 0))
+                    node = node.Statements[0]
+            elif t == ast.PrefixExpression:
+                stack.append((PREFIX, node))
+                node = node.Right
+            elif t == ast.InfixExpression:
+                stack.append((INFIX_LEFT, node, env))
+                node = node.Left
+            elif t == ast.IfExpression:
+                stack.append((IF, node, env))
+                node = node.Condition
+            elif t == ast.ReturnStatement:
+                stack.append((RETURN, ))
+                node = node.ReturnValue
+            elif t == ast.LetStatement:
+                stack.append((LET, node.Name, env))
+                node = node.Value
+            elif t == ast.CallExpression:
+                if node.Function.TokenLiteral() == 'quote':
+                    val = quote(node.Arguments[0], env)
+                    node = None
+                else:
+                    stack.append((CALL_FUNCTION, node, env))
+                    node = node.Function
+            elif t == ast.ArrayLiteral:
+                if len(node.Elements) == 0:
+                    val = object.Array(Elements=[])
+                    node = None
+                else:
+                    stack.append((ARRAY, node, env, 0, []))
+                    node = node.Elements[0]
+            elif t == ast.IndexExpression:
+                stack.append((INDEX_LEFT, node, env))
+                node = node.Left
+            elif t == ast.HashLiteral:
+                if len(node.Pairs) == 0:
+                    val = newHash([])
+                    node = None
+                else:
+                    stack.append((HASH_KEY, node, env, 0, []))
+                    node = node.Pairs[0][0]
+            else:
+                val = None
+                node = None
+
+        if not stack:
+            if program:
+                output.Flush()
+            return val
+
+        k = stack.pop()
+        kind = k[0]
+        if kind == CALL_RETURN:
+            if val is not None:
+                val = unwrapReturnValue(val)
+            elif k[1]:
+                val = NULL
+        elif kind == BLOCK:
+            _, block, env, i = k
+            if val is not None:
+                rt = val.Type.TypeName
+                if rt == object.RETURN_VALUE_OBJ or rt == object.ERROR_OBJ:
+                    continue
+            if i + 1 < len(block.Statements):
+                stack.append((BLOCK, block, env, i + 1))
+                node = block.Statements[i + 1]
+        elif kind == PROGRAM:
+            _, program, env, i = k
+            if type(val) == object.ReturnValue:
+                val = val.Value
+            elif type(val) != object.Error and i + 1 < len(program.Statements):
+                stack.append((PROGRAM, program, env, i + 1))
+                node = program.Statements[i + 1]
+        elif kind == INFIX_LEFT:
+            _, infix, env = k
+            if not val:
+                val = None
+            elif not isError(val):
+                stack.append((INFIX_RIGHT, infix, val))
+                node = infix.Right
+        elif kind == INFIX_RIGHT:
+            if not val:
+                val = None
+            elif not isError(val):
+                val = evalQuickInfix(k[1], k[2], val)
+        elif kind == PREFIX:
+            if not val:
+                val = None
+            elif not isError(val):
+                val = evalQuickPrefix(k[1], val)
+        elif kind == IF:
+            _, ie, env = k
+            if not val:
+                val = NULL
+            elif isError(val):
+                pass
+            elif isTruthy(val):
+                stack.append((IF_BRANCH, ))
+                node = ie.Consequence
+            elif ie.Alternative is not None:
+                stack.append((IF_BRANCH, ))
+                node = ie.Alternative
+            else:
+                val = NULL
+        elif kind == IF_BRANCH:
+            if not val:
+                val = NULL
+        elif kind == RETURN:
+            if not val:
+                val = None
+            elif not isError(val):
+                val = object.ReturnValue(Value=val)
+        elif kind == LET:
+            if not val:
+                val = None
+            elif not isError(val):
+                bindName(k[1], val, k[2])
+                val = None
+        elif kind == CALL_FUNCTION:
+            _, call, env = k
+            if val and isError(val):
+                continue
+            if len(call.Arguments) > 0:
+                stack.append((CALL_ARGUMENTS, call, env, 0, [], val))
+                node = call.Arguments[0]
+            elif not val:
+                val = None
+            elif type(val) == object.Function and not val.Parameters:
+                enterFunction(stack, call)
+                env = extendFunctionEnv(val, [])
+                node = val.Body
+            else:
+                val = applyFunction(val, [])
+        elif kind == CALL_ARGUMENTS:
+            _, call, env, i, args, function = k
+            if val:
+                if isError(val):
+                    val = object.AnyObject(val)
+                    continue
+                args.append(val)
+            if i + 1 < len(call.Arguments):
+                stack.append((CALL_ARGUMENTS, call, env, i + 1, args, function))
+                node = call.Arguments[i + 1]
+            elif not function:
+                val = None
+            elif type(function) == object.Function and len(args) == len(function.Parameters):
+                enterFunction(stack, call)
+                env = extendFunctionEnv(function, args)
+                node = function.Body
+            else:
+                val = applyFunction(function, args)
+        elif kind == ARRAY:
+            _, array, env, i, elements = k
+            if val:
+                if isError(val):
+                    val = object.AnyObject(val)
+                    continue
+                elements.append(val)
+            if i + 1 < len(array.Elements):
+                stack.append((ARRAY, array, env, i + 1, elements))
+                node = array.Elements[i + 1]
+            else:
+                val = object.Array(Elements=elements)
+        elif kind == INDEX_LEFT:
+            _, ie, env = k
+            if not val:
+                val = None
+            elif not isError(val):
+                stack.append((INDEX_RIGHT, ie, val))
+                node = ie.Index
+        elif kind == INDEX_RIGHT:
+            if not val:
+                val = None
+            elif not isError(val):
+                val = evalQuickIndex(k[1], k[2], val)
+        elif kind == HASH_KEY:
+            _, hl, env, i, pairs = k
+            if val and isError(val):
+                continue
+            stack.append((HASH_VALUE, hl, env, i, pairs, val))
+            node = hl.Pairs[i][1]
+        elif kind == HASH_VALUE:
+            _, hl, env, i, pairs, key = k
+            if val and isError(val):
+                continue
+            if key and val:
+                pairs.append((key, val))
+            if i + 1 < len(hl.Pairs):
+                stack.append((HASH_KEY, hl, env, i + 1, pairs))
+                node = hl.Pairs[i + 1][0]
+            else:
+                val = newHash(pairs)
+
+
+def enterFunction(stack: List[Continuation], call: ast.CallExpression) -> None:
+    if call.Tail:
+        # Everything above the caller's CALL_RETURN only passes the result through, so a tail
+        # call drops it and returns straight into the caller's caller. An if branch among it
+        # would have turned nothing into NULL, which that CALL_RETURN then does instead.
+        branch = False
+        while stack and stack[-1][0] != CALL_RETURN:
+            if stack.pop()[0] == IF_BRANCH:
+                branch = True
+        if stack:
+            if branch:
+                stack[-1] = (CALL_RETURN, True)
+            return
+    stack.append((CALL_RETURN, False))
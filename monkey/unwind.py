@@ -0,0 +1,247 @@
+from typing import Any, List, Optional, cast
+
+from monkey import ast, object
+from monkey.evaluator import (
+    FALSE, NULL, TAIL_CALL, TRUE, bindName, builtins, evalFunctionLiteral, evalQuickIndex,
+    evalQuickInfix, evalQuickPrefix, extendFunctionEnv, isTruthy, literalConstant, lookupName,
+    newError, newHash, output, quote, rebindFunctionEnv, releaseFrame)
+
+
+class ErrorSignal(Exception):
+    def __init__(self, error: object.Error) -> None:
+        self.Error = error
+
+
+class ReturnSignal(Exception):
+    def __init__(self, value: Optional[object.Object]) -> None:
+        self.Value = value
+
+
+def Eval(node: Any, env: object.Environment) -> Optional[object.Object]:
+    try:
+        return evalNode(node, env)
+    except ErrorSignal as e:
+        return e.Error
+    except ReturnSignal as r:
+        return r.Value
+
+
+def evalNode(node: Any, env: object.Environment) -> Optional[object.Object]:
+    t = type(node)
+    if t == ast.ExpressionStatement:
+        return evalNode(node.ExpressionValue, env)
+    elif t == ast.Identifier:
+        return evalIdentifier(node, env)
+    elif t == ast.IntegerLiteral:
+        if node.Constant is None:
+            return literalConstant(node)
+        return node.Constant
+    elif t == ast.InfixExpression:
+        left = evalNode(node.Left, env)
+        if left is None:
+            return None
+        right = evalNode(node.Right, env)
+        if right is None:
+            return None
+        return evalInfix(node, left, right)
+    elif t == ast.CallExpression:
+        return evalCall(node, env)
+    elif t == ast.IfExpression:
+        condition = evalNode(node.Condition, env)
+        if condition is None:
+            return NULL
+        if isTruthy(condition):
+            evaluated = evalNode(node.Consequence, env)
+        elif node.Alternative is not None:
+            evaluated = evalNode(node.Alternative, env)
+        else:
+            return NULL
+        if evaluated is None:
+            return NULL
+        return evaluated
+    elif t == ast.BlockStatement:
+        result: Optional[object.Object] = None
+        for statement in node.Statements:
+            result = evalNode(statement, env)
+        return result
+    elif t == ast.ReturnStatement:
+        val = evalNode(node.ReturnValue, env)
+        # A return of nothing does not return; evaluation goes on with the next statement.
+        if node.Tail or val is None:
+            return val
+        raise ReturnSignal(val)
+    elif t == ast.LetStatement:
+        val = evalNode(node.Value, env)
+        if val is not None:
+            bindName(node.Name, val, env)
+        return None
+    elif t == ast.Boolean:
+        return TRUE if node.Value else FALSE
+    elif t == ast.PrefixExpression:
+        right = evalNode(node.Right, env)
+        if right is None:
+            return None
+        return check(evalQuickPrefix(node, right))
+    elif t == ast.StringLiteral:
+        if node.Constant is None:
+            return literalConstant(node)
+        return node.Constant
+    elif t == ast.FunctionLiteral:
+        return evalFunctionLiteral(node, env)
+    elif t == ast.IndexExpression:
+        left = evalNode(node.Left, env)
+        if left is None:
+            return None
+        index = evalNode(node.Index, env)
+        if index is None:
+            return None
+        return check(evalQuickIndex(node, left, index))
+    elif t == ast.ArrayLiteral:
+        return object.Array(Elements=evalExpressions(node.Elements, env))
+    elif t == ast.HashLiteral:
+        pairs = []
+        for keyNode, valueNode in node.Pairs:
+            key = evalNode(keyNode, env)
+            value = evalNode(valueNode, env)
+            if key is not None and value is not None:
+                pairs.append((key, value))
+        return check(newHash(pairs))
+    elif t == ast.Program:
+        return evalProgram(node, env)
+    return None
+
+
+def evalProgram(program: ast.Program, env: object.Environment) -> Optional[object.Object]:
+    result: Optional[object.Object] = None
+    try:
+        for statement in program.Statements:
+            result = evalNode(statement, env)
+    except ReturnSignal as r:
+        return r.Value
+    finally:
+        output.Flush()
+    return result
+
+
+def evalIdentifier(node: ast.Identifier, env: object.Environment) -> object.Object:
+    if node.Builtin is not None:
+        return node.Builtin
+
+    val = lookupName(node, env)
+    if val:
+        return val
+
+    builtin = builtins.get(node.Value)
+    if builtin:
+        return builtin
+
+    raise ErrorSignal(newError('identifier not found: ' + node.Value, tuple()))
+
+
+def evalInfix(node: ast.InfixExpression, left: object.Object,
+              right: object.Object) -> object.Object:
+    # Integer arithmetic is common enough to be checked inline before the node's quickened
+    # handler.
+    if type(left) == object.Integer and type(right) == object.Integer:
+        operator = node.Operator
+        leftVal = left.Value
+        rightVal = right.Value
+        if operator == '+':
+            return object.NewInteger(leftVal + rightVal)
+        elif operator == '-':
+            return object.NewInteger(leftVal - rightVal)
+        elif operator == '<':
+            return TRUE if leftVal < rightVal else FALSE
+        elif operator == '==':
+            return TRUE if leftVal == rightVal else FALSE
+        elif operator == '*':
+            return object.NewInteger(leftVal * rightVal)
+        elif operator == '>':
+            return TRUE if leftVal > rightVal else FALSE
+        elif operator == '!=':
+            return TRUE if leftVal != rightVal else FALSE
+    return check(evalQuickInfix(node, left, right))
+
+
+def evalExpressions(exps: List[ast.Expression], env: object.Environment) -> List[object.Object]:
+    result: List[object.Object] = []
+
+    for e in exps:
+        evaluated = evalNode(e, env)
+        if evaluated is not None:
+            result.append(evaluated)
+
+    return result
+
+
+def evalCall(node: ast.CallExpression, env: object.Environment) -> Optional[object.Object]:
+    builtin = node.Builtin
+    if builtin is not None:
+        args = evalExpressions(node.Arguments, env)
+        if len(args) != len(node.Arguments):
+            return applyFunction(builtin, args)
+        return check(builtin.Fn(*args))
+
+    if node.Function.TokenLiteral() == 'quote':
+        return quote(node.Arguments[0], env)
+
+    function = evalNode(node.Function, env)
+    args = evalExpressions(node.Arguments, env)
+    if function is None:
+        return None
+    if node.Tail and type(function) == object.Function:
+        TAIL_CALL.Function = function
+        TAIL_CALL.Arguments = args
+        TAIL_CALL.Branch = node.Branch
+        return TAIL_CALL
+    return applyFunction(function, args)
+
+
+def checkArity(fn: object.Function, args: List[object.Object]) -> None:
+    if len(args) != len(fn.Parameters):
+        raise ErrorSignal(
+            newError('wrong number of arguments. got=%s, want=%s', (len(args), len(fn.Parameters))))
+
+
+def applyFunction(fn: object.Object, args: List[object.Object]) -> Optional[object.Object]:
+    if type(fn) == object.Function:
+        function = cast(object.Function, fn)
+        checkArity(function, args)
+        extendedEnv = extendFunctionEnv(function, args)
+        branch = False
+        while True:
+            try:
+                evaluated = evalNode(function.Body, extendedEnv)
+            except ReturnSignal as r:
+                evaluated = r.Value
+            if evaluated is not TAIL_CALL:
+                releaseFrame(function.Body, extendedEnv)
+                if evaluated is None and branch:
+                    return NULL
+                return evaluated
+
+            callee, arguments = TAIL_CALL.Function, TAIL_CALL.Arguments
+            TAIL_CALL.Function = TAIL_CALL.Arguments = None
+            branch = branch or TAIL_CALL.Branch
+            checkArity(callee, arguments)
+            if function.Body.Closes:
+                extendedEnv = extendFunctionEnv(callee, arguments)
+            else:
+                extendedEnv = rebindFunctionEnv(extendedEnv, callee, arguments)
+            function = callee
+    elif type(fn) == object.Builtin:
+        builtin = cast(object.Builtin, fn)
+        if builtin.Arity is not None and len(args) != builtin.Arity:
+            raise ErrorSignal(
+                newError('wrong number of arguments. got=%s, want=%s', (len(args), builtin.Arity)))
+        return check(builtin.Fn(*args))
+    else:
+        raise ErrorSignal(newError('not a function: %s', (fn.Type.TypeName, )))
+
+
+def check(obj: object.Object) -> object.Object:
+    # Operators and builtins report failures by returning an Error; this is the only place one
+    # is inspected, right where it is produced.
+    if type(obj) == object.Error:
+        raise ErrorSignal(cast(object.Error, obj))
+    return obj
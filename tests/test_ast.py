@@ -179,3 +179,39 @@ class TestAst(unittest.TestCase):
 
             if val.Value != 2:
                 self.fail('value is not %s, got=%s' % (2, val.Value))
+
+    def test_inspect(self):
+        input = ast.ExpressionStatement(
+            Token=token.Token(token.ILLEGAL, 'ILLEGAL'),
+            ExpressionValue=ast.CallExpression(
+                Token=token.Token(token.LPAREN, '('),
+                Function=ast.Identifier(Token=token.Token(token.IDENT, 'add'), Value='add'),
+                Arguments=[
+                    ast.IntegerLiteral(Token=token.Token(token.INT, '1'), Value=1),
+                    ast.FunctionLiteral(
+                        Token=token.Token(token.FUNCTION, 'fn'),
+                        Parameters=[],
+                        Body=ast.BlockStatement(
+                            Token=token.Token(token.LBRACE, '{'),
+                            Statements=[
+                                ast.ExpressionStatement(
+                                    Token=token.Token(token.INT, '2'),
+                                    ExpressionValue=ast.IntegerLiteral(
+                                        Token=token.Token(token.INT, '2'), Value=2)),
+                            ])),
+                ]))
+
+        visited: List[str] = []
+
+        def visit(node: ast.Node) -> bool:
+            visited.append(type(node).__name__)
+            return type(node) != ast.FunctionLiteral
+
+        ast.Inspect(input, visit)
+
+        expected = [
+            'ExpressionStatement', 'CallExpression', 'Identifier', 'IntegerLiteral',
+            'FunctionLiteral'
+        ]
+        if visited != expected:
+            self.fail('wrong nodes visited. got=%s, want=%s' % (visited, expected))
@@ -0,0 +1,77 @@
+import unittest
+from typing import Any, Optional, cast
+from unittest import mock
+
+import test_evaluator
+from monkey import ast, compiler, evaluator, lexer, object, parser, resolver
+
+
+class TestCompiledEvaluator(test_evaluator.TestEvaluator):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(compiler, 'tiering', compiler.Tiering(Threshold=1)):
+            return super().run(result)
+
+
+class TestCompiledResolved(test_evaluator.TestEvaluator):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(compiler, 'tiering', compiler.Tiering(Threshold=1)), \
+                mock.patch.object(test_evaluator, 'testEval', testEvalResolved):
+            return super().run(result)
+
+
+class TestTiering(unittest.TestCase):
+    def test_promotion(self):
+        tiering = compiler.Tiering(Threshold=3)
+        with mock.patch.object(compiler, 'tiering', tiering):
+            program = testParseProgram('let f = fn(x) { x * 2 };')
+            env = object.NewEnvironment()
+            resolver.Resolve(program, env)
+            evaluator.Eval(program, env)
+            body = cast(ast.FunctionLiteral, cast(ast.LetStatement,
+                                                  program.Statements[0]).Value).Body
+
+            for i in range(1, 6):
+                evaluated = evaluator.Eval(testParseProgram('f(%d)' % i), env)
+                test_evaluator.testIntegerObject(self, evaluated, i * 2)
+                if (body.Compiled is not None) != (i >= 3):
+                    self.fail('wrong tier after %d calls. got=%s' % (i, body.Compiled))
+
+        if tiering.String() != 'promoted after 3 calls: (x * 2)':
+            self.fail('wrong stats. got=%s' % tiering.String())
+
+    def test_disabled(self):
+        tiering = compiler.Tiering(Enabled=False, Threshold=1)
+        with mock.patch.object(compiler, 'tiering', tiering):
+            program = testParseProgram('let f = fn(x) { x * 2 }; f(1); f(2)')
+            evaluated = evaluator.Eval(program, object.NewEnvironment())
+            test_evaluator.testIntegerObject(self, evaluated, 4)
+
+        body = cast(ast.FunctionLiteral, cast(ast.LetStatement, program.Statements[0]).Value).Body
+        if body.Compiled is not None or body.Calls != 0 or tiering.Promoted:
+            self.fail('function promoted with tiering disabled')
+
+    def test_hot_loop(self):
+        input = '''
+        let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+        let sum = fn(n, acc) { if (n == 0) { acc } else { sum(n - 1, acc + fib(10)) } };
+        sum(20, 0)'''
+
+        tiering = compiler.Tiering(Threshold=10)
+        with mock.patch.object(compiler, 'tiering', tiering):
+            evaluated = testEvalResolved(input)
+        test_evaluator.testIntegerObject(self, evaluated, 20 * 55)
+        if len(tiering.Promoted) != 2:
+            self.fail('wrong number of promotions. got=%s' % tiering.String())
+
+
+def testParseProgram(input: str) -> ast.Program:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    return p.ParseProgram()
+
+
+def testEvalResolved(input: str) -> Optional[object.Object]:
+    program = testParseProgram(input)
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    return evaluator.Eval(program, env)
@@ -1,8 +1,12 @@
+import contextlib
+import gc
+import io
 import unittest
 from dataclasses import dataclass
-from typing import Any, List
+from typing import Any, List, cast
+from unittest import mock
 
-from monkey import ast, evaluator, lexer, object, parser
+from monkey import ast, compiler, evaluator, lexer, object, parser
 
 
 class TestEvaluator(unittest.TestCase):
@@ -79,6 +83,8 @@ class TestEvaluator(unittest.TestCase):
             Test('!!true', True),
             Test('!!false', False),
             Test('!!5', True),
+            Test('!first(rest([1, false]))', True),
+            Test('!last(push([], true))', False),
         ]
 
         for tt in tests:
@@ -160,6 +166,11 @@ class TestEvaluator(unittest.TestCase):
             Test('foobar', 'identifier not found: foobar'),
             Test('"Hello" - "World"', 'unknown operator: STRING - STRING'),
             Test('{"name": "Monkey"}[fn(x) { x }];', 'unusable as hash key: FUNCTION'),
+            Test('{[1, fn(x) { x }]: 2}', 'unusable as hash key: ARRAY'),
+            Test('let f = fn(x) { x }; f(1, 2)', 'wrong number of arguments. got=2, want=1'),
+            Test('let f = fn(x, y) { x }; f(1)', 'wrong number of arguments. got=1, want=2'),
+            Test('let f = fn(n) { if (n > 0) { return f(n - 1, 0); } n }; f(3)',
+                 'wrong number of arguments. got=2, want=1'),
         ]
 
         for tt in tests:
@@ -237,6 +248,65 @@ class TestEvaluator(unittest.TestCase):
         addTwo(2);'''
         testIntegerObject(self, testEval(input), 4)
 
+    def test_tail_calls(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: int
+
+        tests: List[Test] = [
+            Test(
+                '''let loop = fn(n, acc) { if (n == 0) { acc } else { loop(n - 1, acc + 1) } };
+            loop(10000, 0);''', 10000),
+            Test(
+                '''let loop = fn(n, acc) {
+              if (n == 0) { return acc; } return loop(n - 1, acc + 1);
+            };
+            loop(10000, 0);''', 10000),
+            Test(
+                '''let even = fn(n) { if (n == 0) { 1 } else { odd(n - 1) } };
+            let odd = fn(n) { if (n == 0) { 0 } else { even(n - 1) } };
+            even(10001);''', 0),
+            Test(
+                '''let countdown = fn(n) { if (n > 0) { countdown(n - 1) }; n };
+            countdown(5);''', 5),
+            Test(
+                '''let adders = fn(n, acc) {
+              if (n == 0) { acc(0) } else { adders(n - 1, fn(x) { acc(x) + 1 }) }
+            };
+            adders(100, fn(x) { x });''', 100),
+        ]
+
+        for tt in tests:
+            testIntegerObject(self, testEval(tt.input), tt.expected)
+
+    def test_tail_calls_of_nothing(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        nothing = 'let g = fn() { let a = 1; };'
+        tests: List[Test] = [
+            Test('let f = fn() { if (true) { g() } }; let x = f(); x', 'NULL'),
+            Test('let f = fn() { if (true) { g() } }; [f()]', '[NULL]'),
+            Test('let f = fn() { if (true) { return g(); } }; [f()]', '[NULL]'),
+            Test('let f = fn() { g() }; [f()]', '[]'),
+            Test('let h = fn() { g() }; let f = fn() { if (true) { h() } }; [f()]', '[NULL]'),
+            Test('let h = fn() { if (true) { g() } }; let f = fn() { h() }; [f()]', '[NULL]'),
+            Test('let f = fn(n) { if (n == 0) { g() } else { f(n - 1) } }; [f(3), f(0)]',
+                 '[NULL, NULL]'),
+            Test('let f = fn() { if (true) { return g(); 5 } }; [f()]', '[5]'),
+            Test('let f = fn() { if (true) { return g(); }; 5 }; [f()]', '[5]'),
+            Test('let f = fn() { return g(); 5 }; [f()]', '[5]'),
+        ]
+
+        for tt in tests:
+            evaluated = testEval(nothing + tt.input)
+            if evaluated is None or evaluated.Inspect != tt.expected:
+                self.fail('wrong result for %s. got=%s, want=%s' % (tt.input, evaluated,
+                                                                    tt.expected))
+
     def test_string_literal(self):
         input = '"Hello World!"'
         evaluated = testEval(input)
@@ -245,6 +315,26 @@ class TestEvaluator(unittest.TestCase):
         if evaluated.Value != 'Hello World!':
             self.fail('String has wrong value. got=%s' % str.Value)
 
+    def test_long_strings(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        build = 'let build = fn(n, acc) { if (n == 0) { acc } else { build(n - 1, acc + "ab") } };'
+        tests: List[Test] = [
+            Test(build + 'len(build(1000, ""))', '2000'),
+            Test(build + 'let s = build(300, "x"); [len(s + s), s == "x" + build(300, "")]',
+                 '[1202, True]'),
+            Test(build + '{build(400, ""): 1}[build(200, "") + build(200, "")]', '1'),
+        ]
+
+        for tt in tests:
+            evaluated = testEval(tt.input)
+            if evaluated.Inspect != tt.expected:
+                self.fail('wrong result for %s. expected=%s, got=%s' %
+                          (tt.input, tt.expected, evaluated.Inspect))
+
     def test_builtin_functions(self):
         @dataclass
         class Test:
@@ -273,6 +363,146 @@ class TestEvaluator(unittest.TestCase):
                     self.fail(
                         'wrong error message. expected=%s, got=%s' % (expected, errObj.Message))
 
+    def test_array_builtins(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let a = [1, 2]; [push(a, 3), push(a, 4), a]', '[[1, 2, 3], [1, 2, 4], [1, 2]]'),
+            Test('let a = rest([1, 2, 3]); [push(a, 4), rest(a), first(a), last(a), a[1]]',
+                 '[[2, 3, 4], [3], 2, 3, 3]'),
+            Test('let a = rest([1, 2]); let b = push(a, 3); [push(rest(b), 4), b, len(b)]',
+                 '[[3, 4], [2, 3], 2]'),
+            Test('[rest([1]), rest(rest([1])), first(rest([1])), rest([1, 2])[1]]',
+                 '[[], NULL, NULL, NULL]'),
+            Test('rest([1, 2]) == [2]', 'True'),
+        ]
+
+        for tt in tests:
+            evaluated = testEval(tt.input)
+            if evaluated.Inspect != tt.expected:
+                self.fail('wrong result for %s. expected=%s, got=%s' %
+                          (tt.input, tt.expected, evaluated.Inspect))
+
+    def test_hash_builtins(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let h = {"a": 1}; [set(h, "b", 2), set(h, "a", 3), h]',
+                 '[{a: 1, b: 2}, {a: 3}, {a: 1}]'),
+            Test('let h = set(set({}, 1, "x"), true, "y"); [h[1], h[true], len(keys(h))]',
+                 '[x, y, 2]'),
+            Test('let h = set({"a": 1, "b": 2}, "c", 3); [delete(h, "a"), delete(h, "z"), h]',
+                 '[{b: 2, c: 3}, {a: 1, b: 2, c: 3}, {a: 1, b: 2, c: 3}]'),
+            Test('delete(delete({"a": 1}, "a"), "a")', '{}'),
+            Test('merge({"a": 1, "b": 2}, {"b": 3, "c": 4})', '{a: 1, b: 3, c: 4}'),
+            Test('let h = set({}, "b", 1); [keys(set(h, "a", 2)), values(set(h, "a", 2))]',
+                 '[[b, a], [1, 2]]'),
+            Test('set({}, "a", 1) == {"a": 1}', 'True'),
+            Test('set({}, fn(x) { x }, 1)', 'ERROR: unusable as hash key: FUNCTION'),
+            Test('delete([1], 1)', 'ERROR: argument to `delete` must be HASH, got ARRAY'),
+            Test('merge({}, 1)', 'ERROR: arguments to `merge` must be HASH, got INTEGER'),
+            Test('keys("a")', 'ERROR: argument to `keys` must be HASH, got STRING'),
+        ]
+
+        for tt in tests:
+            evaluated = testEval(tt.input)
+            if evaluated.Inspect != tt.expected:
+                self.fail('wrong result for %s. expected=%s, got=%s' %
+                          (tt.input, tt.expected, evaluated.Inspect))
+
+    def test_puts(self):
+        @dataclass
+        class Test:
+            input: str
+            limit: Any
+            expected: str
+
+        tests: List[Test] = [
+            Test('puts(1, "a", [1, [2, 3]], {"k": [true]})', None,
+                 '1\na\n[1, [2, 3]]\n{k: [True]}\n'),
+            Test('puts([1, [2, 3, 4], 5], {1: 1, 2: 2, 3: 3})', 2,
+                 '[1, [2, 3, ...], ...]\n{1: 1, 2: 2, ...}\n'),
+            Test('puts(range(5), [1], [], {})', 0, '[...]\n[...]\n[]\n{}\n'),
+            Test('puts(range(5), vadd(range(2), 1))', 3, '[0, 1, 2, ...]\n[1, 2]\n'),
+        ]
+
+        for tt in tests:
+            out = io.StringIO()
+            with mock.patch.object(evaluator.output, 'Limit', tt.limit):
+                with contextlib.redirect_stdout(out):
+                    testEval(tt.input)
+            if out.getvalue() != tt.expected:
+                self.fail('wrong output for %s. expected=%r, got=%r' %
+                          (tt.input, tt.expected, out.getvalue()))
+
+    def test_output_buffering(self):
+        out = io.StringIO()
+        with mock.patch.object(evaluator.output, 'Stream', out):
+            with mock.patch.object(evaluator.output, 'Threshold', 8):
+                evaluator.builtin_puts(object.String(Value='abc'))
+                if out.getvalue() != '':
+                    self.fail('output below the threshold is written. got=%r' % out.getvalue())
+                evaluator.builtin_puts(object.String(Value='defg'))
+                if out.getvalue() != 'abc\ndefg':
+                    self.fail('output over the threshold is not written. got=%r' %
+                              out.getvalue())
+
+            evaluator.builtin_puts(object.String(Value='h'))
+            evaluator.builtins['flush'].Fn()
+            if out.getvalue() != 'abc\ndefg\nh\n':
+                self.fail('flush does not write the output. got=%r' % out.getvalue())
+
+            with mock.patch.object(evaluator.output, 'LineBuffered', True):
+                evaluator.builtin_puts(object.String(Value='i'))
+                if out.getvalue() != 'abc\ndefg\nh\ni\n':
+                    self.fail('line buffered output is not written. got=%r' % out.getvalue())
+
+            # Programs flush what they print when they end, even when they fail.
+            testEval('puts("j"); 1 + true')
+            if out.getvalue() != 'abc\ndefg\nh\ni\nj\n':
+                self.fail('program does not flush its output. got=%r' % out.getvalue())
+
+    def test_int_array_builtins(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let a = range(5); [vadd(a, 10), vsub(a, a), vmul(a, a), vsum(a), vdot(a, a)]',
+                 '[[10, 11, 12, 13, 14], [0, 0, 0, 0, 0], [0, 1, 4, 9, 16], 10, 30]'),
+            Test('let a = intArray([3, 1, 4, 1, 5]); [vlt(a, 2), vgt(a, a), veq(a, 1)]',
+                 '[[0, 1, 0, 1, 0], [0, 0, 0, 0, 0], [0, 1, 0, 1, 0]]'),
+            Test('let a = intArray([3, 1, 4, 1, 5]); vmask(a, vgt(a, 2))', '[3, 4, 5]'),
+            Test('let a = range(3); [a[1], a[3], len(a), first(a), last(a), first(range(0))]',
+                 '[1, NULL, 3, 0, 2, NULL]'),
+            # Array builtins that need boxed elements convert the IntArray.
+            Test('let a = range(3); [rest(a), push(a, 3), array(a) == [0, 1, 2], a]',
+                 '[[1, 2], [0, 1, 2, 3], True, [0, 1, 2]]'),
+            Test('intArray([1, 2]) == vadd(range(2), 1)', 'True'),
+            Test('intArray([1, "a"])', 'ERROR: elements of `intArray` must be INTEGER, got STRING'),
+            Test('intArray([9223372036854775807 * 2])',
+                 'ERROR: integer out of range for `intArray`'),
+            Test('vadd(range(2), range(3))',
+                 'ERROR: arguments to `vadd` differ in length: 2 and 3'),
+            Test('vmul(intArray([9223372036854775807]), 2)', 'ERROR: integer overflow in `vmul`'),
+            Test('vsum([1])', 'ERROR: argument to `vsum` must be INT_ARRAY, got ARRAY'),
+            Test('vadd(range(2), "a")',
+                 'ERROR: argument to `vadd` must be INT_ARRAY or INTEGER, got STRING'),
+        ]
+
+        for tt in tests:
+            evaluated = testEval(tt.input)
+            if evaluated.Inspect != tt.expected:
+                self.fail('wrong result for %s. expected=%s, got=%s' %
+                          (tt.input, tt.expected, evaluated.Inspect))
+
     def test_array_literals(self):
         input = '[1, 2 * 2, 3 + 3]'
 
@@ -351,8 +581,7 @@ class TestEvaluator(unittest.TestCase):
             self.fail('Hash has wrong num of pairs. got=%s' % len(result.Pairs))
 
         for expectedKey, expectedValue in expected:
-            # TODO: xxx
-            pair = [x for x in result.Pairs if x[0].Value == expectedKey.Value][0][1]
+            pair = result.Pairs.get(expectedKey)
             if not pair:
                 self.fail('no pair for given key in Pairs')
 
@@ -372,6 +601,14 @@ class TestEvaluator(unittest.TestCase):
             Test('{5: 5}[5]', 5),
             Test('{true: 5}[true]', 5),
             Test('{false: 5}[false]', 5),
+            Test('{"foo": 5, "foo": 6}["foo"]', 5),
+            Test('{1: 5}[true]', None),
+            Test('{1: 5, true: 6}[true]', 6),
+            Test('{[1, "a"]: 5}[[1, "a"]]', 5),
+            Test('{[1, [2, 3]]: 5}[[1, rest([1, 2, 3])]]', 5),
+            Test('{[1, 2]: 5}[[2, 1]]', None),
+            Test('{[1]: 5}[[true]]', None),
+            Test('{[]: 5}[rest([1])]', 5),
         ]
 
         for tt in tests:
@@ -382,6 +619,104 @@ class TestEvaluator(unittest.TestCase):
             else:
                 testNullObject(self, evaluated)
 
+    def test_lookup_cache(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let x = 1; let f = fn() { x }; let g = fn() { let x = 2; f() }; [f(), g(), f()]',
+                 '[1, 1, 1]'),
+            Test(
+                '''let x = 1; let f = fn(b) { if (b) { let x = 2; }; x };
+                [f(false), f(true), f(false)]''', '[1, 2, 1]'),
+            Test('let f = fn() { y }; let y = 1; let a = f(); let y = 2; [a, f()]', '[1, 2]'),
+            Test('let x = 1; let f = fn() { fn() { x } }; let g = f(); let x = 3; g()', '3'),
+        ]
+
+        for tt in tests:
+            evaluated = testEval(tt.input)
+            if evaluated.Inspect != tt.expected:
+                self.fail('wrong result. got=%s, want=%s' % (evaluated.Inspect, tt.expected))
+
+        # The same nodes run against different global environments.
+        program = testParseProgram('let f = fn() { fn() { y } }; f()()')
+        for y in (1, 2):
+            env = object.NewEnvironment()
+            env.Set('y', object.Integer(Value=y))
+            testIntegerObject(self, evaluator.Eval(program, env), y)
+
+        # Neither the call that looked a name up nor the environment it was found in is kept
+        # alive by the cache. No inner scope anywhere in the tests binds this name.
+        program = testParseProgram('let f = fn() { fn() { onlyGlobal } }; f()()')
+        env = object.NewEnvironment()
+        env.Set('onlyGlobal', object.Integer(Value=3))
+        testIntegerObject(self, evaluator.Eval(program, env), 3)
+        identifier = cast(ast.Identifier, None)
+
+        def f(node: ast.Node) -> bool:
+            nonlocal identifier
+            if type(node) == ast.Identifier and node.Value == 'onlyGlobal':
+                identifier = node
+            return True
+
+        ast.Inspect(program, f)
+        if identifier.CacheOuter is None:
+            self.fail('lookup of onlyGlobal not cached')
+        del env
+        gc.collect()
+        if identifier.CacheOuter() is not None or identifier.CacheEnv() is not None:
+            self.fail('lookup cache keeps environments alive')
+
+    def test_quickening(self):
+        @dataclass
+        class Test:
+            function: str
+            calls: List[str]
+            expected: List[str]
+            quick: Any
+
+        tests: List[Test] = [
+            Test('fn(a, b) { a + b }', ['f(1, 2)', 'f(3, 4)'], ['3', '7'],
+                 evaluator.quickIntegerAdd),
+            Test('fn(a, b) { a < b }', ['f(1, 2)', 'f(2, 1)'], ['True', 'False'],
+                 evaluator.quickIntegerLess),
+            Test('fn(a, b) { a + b }', ['f("a", "b")'], ['ab'], evaluator.quickStringConcat),
+            Test('fn(a, b) { a + b }', ['f(1, 2)', 'f("a", "b")'], ['3', 'ab'],
+                 evaluator.evalInfixExpression),
+            Test('fn(a, b) { a + b }', ['f("a", "b")', 'f(1, true)'],
+                 ['ab', 'ERROR: type mismatch: INTEGER + BOOLEAN'], evaluator.evalInfixExpression),
+            Test('fn(a, b) { a / b }', ['f(4, 2)'], ['2.0'], evaluator.evalInfixExpression),
+            Test('fn(a) { -a }', ['f(1)'], ['-1'], evaluator.quickIntegerNegate),
+            Test('fn(a) { !a }', ['f(true)', 'f(5)'], ['False', 'False'],
+                 evaluator.evalPrefixExpression),
+            Test('fn(a, i) { a[i] }', ['f([1, 2], 1)', 'f([1], 5)'], ['2', 'NULL'],
+                 evaluator.quickArrayIndex),
+            Test('fn(a, i) { a[i] }', ['f({"k": 1}, "k")', 'f({"k": 1}, "x")'], ['1', 'NULL'],
+                 evaluator.quickHashStringIndex),
+            Test('fn(a, i) { a[i] }', ['f({"k": 1}, "k")', 'f([1], 0)'], ['1', '1'],
+                 evaluator.evalIndexExpression),
+        ]
+
+        for tt in tests:
+            program = testParseProgram('let f = %s;' % tt.function)
+            env = object.NewEnvironment()
+            evaluator.Eval(program, env)
+            # Quickening happens in the interpreter; compiled functions specialize on their own.
+            with mock.patch.object(compiler.tiering, 'Enabled', False):
+                for call, expected in zip(tt.calls, tt.expected):
+                    evaluated = evaluator.Eval(testParseProgram(call), env)
+                    if evaluated.Inspect != expected:
+                        self.fail('wrong result for %s. got=%s, want=%s' %
+                                  (call, evaluated.Inspect, expected))
+
+            fl = cast(ast.FunctionLiteral, cast(ast.LetStatement, program.Statements[0]).Value)
+            node = cast(Any, fl.Body.Statements[0]).ExpressionValue
+            if node.Quick != tt.quick:
+                self.fail('wrong handler for %s. got=%s, want=%s' %
+                          (tt.function, node.Quick.__name__, tt.quick.__name__))
+
 
 class TestMacro(unittest.TestCase):
     def test_quote(self):
@@ -493,6 +828,23 @@ class TestDefineMacros(unittest.TestCase):
             self.fail('body is not %s. got=%s' % (expectedBody, macro.Body.String()))
 
 
+class TestConstants(unittest.TestCase):
+    def test_literal_constants(self):
+        program = testParseProgram('let f = fn(x) { [x, 5000, "a", 3 - 2] }; f(1)')
+        first = evaluator.Eval(program, object.NewEnvironment())
+        second = evaluator.Eval(program, object.NewEnvironment())
+        for i in range(4):
+            if first.Elements[i] is not second.Elements[i]:
+                self.fail('element %d is not shared. got=%s' % (i, first.Elements[i]))
+
+    def test_small_integers(self):
+        evaluated = testEval('[1024 + 1, 1023 + 1, -6 + 1, len("abc"), -(0 - 2000)]')
+        expected = [False, True, True, True, False]
+        for obj, shared in zip(evaluated.Elements, expected):
+            if (obj is object.NewInteger(obj.Value)) != shared:
+                self.fail('wrong sharing of %s. expected=%s' % (obj.Value, shared))
+
+
 class TestExpandMacros(unittest.TestCase):
     def test_expand_macros(self):
         @dataclass
@@ -0,0 +1,75 @@
+import unittest
+from dataclasses import dataclass
+from typing import List
+
+from monkey import hamt
+
+
+@dataclass(eq=False)
+class Colliding:
+    # Keys whose hashes are all equal.
+    Value: int
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) == Colliding and self.Value == other.Value
+
+    def __hash__(self) -> int:
+        return 42
+
+
+class TestHamt(unittest.TestCase):
+    def test_set_and_delete(self):
+        m = hamt.Map()
+        expected = {}
+        for i in range(2000):
+            m = m.Set(i * 7919, i)
+            expected[i * 7919] = i
+        for i in range(0, 2000, 3):
+            m = m.Delete(i * 7919)
+            del expected[i * 7919]
+
+        if len(m) != len(expected):
+            self.fail('map has wrong length. expected=%s, got=%s' % (len(expected), len(m)))
+        if m.items() != list(expected.items()):
+            self.fail('map has wrong items')
+        if m.get(3 * 7919) is not None or m[7919] != 1:
+            self.fail('wrong lookups')
+
+    def test_persistence(self):
+        a = hamt.FromItems([('x', 1), ('y', 2)])
+        b = a.Set('x', 3).Set('z', 4)
+        c = b.Delete('y')
+
+        @dataclass
+        class Test:
+            m: hamt.Map
+            expected: List[tuple]
+
+        tests: List[Test] = [
+            Test(a, [('x', 1), ('y', 2)]),
+            Test(b, [('x', 3), ('y', 2), ('z', 4)]),
+            Test(c, [('x', 3), ('z', 4)]),
+        ]
+
+        for tt in tests:
+            if tt.m.items() != tt.expected:
+                self.fail('wrong items. expected=%s, got=%s' % (tt.expected, tt.m.items()))
+        if a.Delete('missing') is not a:
+            self.fail('deleting a missing key made a new map')
+
+    def test_collisions(self):
+        m = hamt.FromItems([(Colliding(i), i) for i in range(5)]).Set(7, 7)
+        m = m.Delete(Colliding(2))
+        if m.items() != [(Colliding(0), 0), (Colliding(1), 1), (Colliding(3), 3),
+                         (Colliding(4), 4), (7, 7)]:
+            self.fail('wrong items. got=%s' % m.items())
+        for i in (0, 1, 3, 4):
+            m = m.Delete(Colliding(i))
+        if m.items() != [(7, 7)] or Colliding(0) in m:
+            self.fail('wrong items. got=%s' % m.items())
+
+    def test_equality(self):
+        if hamt.FromItems([(1, 'a'), (2, 'b')]) != {2: 'b', 1: 'a'}:
+            self.fail('map differs from a dict with the same items')
+        if hamt.FromItems([(1, 'a')]) == {1: 'b'}:
+            self.fail('map equals a dict with different values')
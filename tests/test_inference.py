@@ -0,0 +1,138 @@
+import unittest
+from dataclasses import dataclass
+from typing import Any, List, Optional, cast
+from unittest import mock
+
+import test_evaluator
+from monkey import ast, compiler, evaluator, inference, lexer, object, parser, resolver
+
+
+class TestInference(unittest.TestCase):
+    def test_signatures(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let f = fn(x) { x + 1 }; f(2)', 'f: fn(INTEGER) -> INTEGER'),
+            Test('let f = fn(x) { x + "!" }; f("a")', 'f: fn(STRING) -> STRING'),
+            Test('let f = fn(x) { x < 1 }; f(2)', 'f: fn(INTEGER) -> BOOLEAN'),
+            Test('let f = fn(x) { x / 2 }; f(2)', 'f: fn(INTEGER) -> ANY'),
+            Test('let f = fn(x) { x }; f(2); f("a")', 'f: fn(ANY) -> ANY'),
+            Test(
+                'let fib = fn(n) { if (n < 2) { return n; } fib(n - 1) + fib(n - 2) }; fib(5)',
+                'fib: fn(INTEGER) -> INTEGER'),
+            Test('let f = fn(x, y) { x * y }; let g = fn(a) { f(a, a) }; g(3)',
+                 'f: fn(INTEGER, INTEGER) -> INTEGER\ng: fn(INTEGER) -> INTEGER'),
+            Test('let f = fn(x) { let y = x * 2; y - 1 }; f(1)',
+                 'f: fn(INTEGER) -> INTEGER\nlet y: INTEGER'),
+            # An argument that may evaluate to nothing shifts the ones after it.
+            Test('let f = fn(x, y) { x + y }; f(g(), 1)', 'f: fn(ANY, ANY) -> ANY'),
+            # A function used as a value may be called from anywhere.
+            Test('let f = fn(x) { x + 1 }; let g = f; f(1)', ''),
+            Test('let f = fn(x) { x + 1 }; f(1, 2)', ''),
+            # A let that may not run, or runs twice, types nothing.
+            Test('let f = fn(x) { if (x) { let y = 1; }; y }; f(true)',
+                 'f: fn(BOOLEAN) -> ANY'),
+            Test('let f = fn(x) { let y = 1; let y = "a"; y }; f(true)',
+                 'f: fn(BOOLEAN) -> ANY'),
+            Test('let f = fn(x) { let x = "a"; x }; f(1)', 'f: fn(INTEGER) -> ANY'),
+        ]
+
+        for tt in tests:
+            types = inference.Infer(testParseProgram(tt.input), closed=True)
+            if types.String() != tt.expected:
+                self.fail('wrong types for %s. expected=%r, got=%r' %
+                          (tt.input, tt.expected, types.String()))
+
+    def test_open_program(self):
+        # Later programs may call top-level functions with anything.
+        input = 'let f = fn(x) { let g = fn(y) { y * 2 }; g(x) + g(1) }; f(1)'
+        types = inference.Infer(testParseProgram(input))
+        if types.String() != 'g: fn(ANY) -> ANY':
+            self.fail('wrong types. got=%r' % types.String())
+
+        input = 'let f = fn() { let g = fn(y) { y * 2 }; g(1) + g(2) }; f()'
+        types = inference.Infer(testParseProgram(input))
+        if types.String() != 'g: fn(INTEGER) -> INTEGER':
+            self.fail('wrong types. got=%r' % types.String())
+
+    def test_kinds(self):
+        program = testParseProgram('let f = fn(x, y) { (x * 2 + y) < -x == g(x) }; f(1, 2)')
+        inference.Infer(program, closed=True)
+
+        kinds: List[str] = []
+
+        def f(node: ast.Node) -> bool:
+            if type(node) in (ast.Identifier, ast.PrefixExpression, ast.InfixExpression):
+                kinds.append('%s: %s' % (node.String(), node.Kind))
+            return True
+
+        ast.Inspect(program, f)
+        expected = [
+            'f: None',
+            'x: None',
+            'y: None',
+            '((((x * 2) + y) < (-x)) == g(x)): None',
+            '(((x * 2) + y) < (-x)): BOOLEAN',
+            '((x * 2) + y): INTEGER',
+            '(x * 2): INTEGER',
+            'x: INTEGER',
+            'y: INTEGER',
+            '(-x): INTEGER',
+            'x: INTEGER',
+            'g: None',
+            'x: INTEGER',
+            'f: None',
+        ]
+        if kinds != expected:
+            self.fail('wrong kinds. expected=%s, got=%s' % (expected, kinds))
+
+
+class TestTypedCompiled(test_evaluator.TestEvaluator):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(compiler, 'tiering', compiler.Tiering(Threshold=1)), \
+                mock.patch.object(test_evaluator, 'testEval', testEvalTyped):
+            return super().run(result)
+
+
+class TestUnboxed(unittest.TestCase):
+    def test_compiled(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: Any
+
+        tests: List[Test] = [
+            Test('let f = fn(a, b) { a * a + b * b - -a }; f(3, 4)', 28),
+            Test('let f = fn(a) { let b = a * 2; b * b }; f(3)', 36),
+            Test('let f = fn(a) { a < 2 }; f(1)', True),
+            Test('let f = fn(a, b) { a + b == "ab" }; f("a", "b")', True),
+            Test('let f = fn(a, b) { a + b }; f("a", "b")', 'ab'),
+            Test('let f = fn(a) { let g = fn(b) { a * b }; g(2) }; f(5)', 10),
+        ]
+
+        for tt in tests:
+            with mock.patch.object(compiler, 'tiering', compiler.Tiering(Threshold=1)):
+                evaluated = testEvalTyped(tt.input)
+            if type(tt.expected) == bool:
+                test_evaluator.testBooleanObject(self, evaluated, tt.expected)
+            elif type(tt.expected) == int:
+                test_evaluator.testIntegerObject(self, evaluated, tt.expected)
+            elif cast(object.String, evaluated).Value != tt.expected:
+                self.fail('wrong value. expected=%s, got=%s' % (tt.expected, evaluated))
+
+
+def testParseProgram(input: str) -> ast.Program:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    return p.ParseProgram()
+
+
+def testEvalTyped(input: str) -> Optional[object.Object]:
+    program = testParseProgram(input)
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    inference.Infer(program, closed=True)
+    return evaluator.Eval(program, env)
@@ -1,3 +1,4 @@
+import copy
 import unittest
 
 from monkey import object
@@ -18,3 +19,79 @@ class TestObject(unittest.TestCase):
 
         if object.GetHashKey(hello1) == object.GetHashKey(diff1):
             self.fail('strings with different content have same hash keys')
+
+    def test_compact_objects(self):
+        one = object.Integer(Value=1)
+        if hasattr(one, '__dict__'):
+            self.fail('Integer has a __dict__')
+        if one.Type is not object.Integer(Value=2).Type:
+            self.fail('integers do not share their type tag')
+        if one.Type != object.ObjectType(object.INTEGER_OBJ):
+            self.fail('wrong type tag. got=%s' % one.Type)
+
+        for obj in (one, object.String(Value='a'), object.Boolean(Value=True), object.Null()):
+            if copy.deepcopy([obj])[0] is not obj:
+                self.fail('copy of immutable %s is a new object' % obj.Type.TypeName)
+
+    def test_string_hash_key_is_cached(self):
+        hello = object.String(Value='Hello World')
+        if object.GetHashKey(hello) is not object.GetHashKey(hello):
+            self.fail('hash key of a string is not cached')
+
+        # Keys compare the strings themselves, not just their hashes.
+        one = object.Integer(Value=1)
+        if object.GetHashKey(object.String(Value='1')) == object.GetHashKey(one):
+            self.fail('string and integer have same hash keys')
+
+    def test_ropes(self):
+        piece = object.String(Value='x' * 100)
+        s = object.String(Value='')
+        for _ in range(20000):
+            s = object.Concat(s, piece)
+        if s.value is not None:
+            self.fail('long concatenation is not a rope')
+        if s.length != 2000000:
+            self.fail('rope has wrong length. got=%s' % s.length)
+
+        # Appending short pieces extends the last one instead of nesting a rope per piece.
+        depth = 0
+        node = s
+        while node.value is None:
+            node = node.left
+            depth += 1
+        if depth > 2 * 20000 * 100 // object.ROPE_LEAF:
+            self.fail('rope is too deep. got=%s' % depth)
+
+        flat = object.String(Value='x' * 2000000)
+        if s != flat or object.GetHashKey(s) != object.GetHashKey(flat):
+            self.fail('rope differs from the flat string')
+        if s.left is not None or s.Value is not s.Value:
+            self.fail('rope is not flattened once')
+
+        short = object.Concat(object.String(Value='ab'), object.String(Value='c'))
+        if short.value != 'abc':
+            self.fail('short concatenation is a rope')
+
+    def test_array_hash_key(self):
+        def array(*values):
+            return object.Array([object.Integer(Value=v) if type(v) == int else v for v in values])
+
+        one = array(1, array(2, 3))
+        other = array(1, array(2, 3))
+        if object.GetHashKey(one) != object.GetHashKey(other):
+            self.fail('arrays with same elements have different hash keys')
+        if object.GetHashKey(one) is not object.GetHashKey(one):
+            self.fail('hash key of an array is not cached')
+        if object.GetHashKey(array(1, 2)) == object.GetHashKey(array(2, 1)):
+            self.fail('arrays with different elements have same hash keys')
+        if object.GetHashKey(array(object.Hash(Pairs={}))) is not None:
+            self.fail('array holding a hash has a hash key')
+
+        # Arrays whose keys differ are unequal without comparing their elements.
+        a = array(1, 2)
+        b = array(1, 3)
+        object.GetHashKey(a)
+        object.GetHashKey(b)
+        b.store[1] = object.Integer(Value=2)
+        if a == b:
+            self.fail('arrays with different hash keys are equal')
@@ -0,0 +1,197 @@
+import unittest
+from dataclasses import dataclass
+from typing import Any, List, Optional, cast
+from unittest import mock
+
+import test_evaluator
+from monkey import ast, evaluator, lexer, object, optimizer, parser
+
+
+class TestOptimizer(unittest.TestCase):
+    def test_fold_constants(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('5 * 2 + 10', '20'),
+            Test('-(3 - 5)', '2'),
+            Test('1 < 2 == true', 'true'),
+            Test('!5', 'false'),
+            Test('"foo" + "bar"', 'foobar'),
+            Test('"a" == "a"', 'true'),
+            Test('x + 2 * 3', '(x + 6)'),
+            Test('5 + true', '(5 + true)'),
+            Test('10 / 2', '(10 / 2)'),
+            Test('quote(1 + 2)', 'quote((1 + 2))'),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            optimizer.Optimize(program)
+            if program.String() != tt.expected:
+                self.fail('wrong program. got=%s, want=%s' % (program.String(), tt.expected))
+
+    def test_prune_branches(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let x = if (1 < 2) { 10 } else { 20 };', 'let x = 10;'),
+            Test('let x = if (false) { 10 } else { "a" + "b" };', 'let x = ab;'),
+            Test('let x = if (true) { f() };', 'let x = iftrue f();'),
+            Test('if (true) { let a = 1; }; a', 'let a = 1;a'),
+            Test('if (false) { puts(1) }; 2', '2'),
+            Test('if (false) { puts(1) }', 'iffalse puts(1)'),
+            Test('if (x) { 1 } else { 2 }', 'ifx 1else 2'),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            optimizer.Optimize(program)
+            if program.String() != tt.expected:
+                self.fail('wrong program. got=%s, want=%s' % (program.String(), tt.expected))
+
+    def test_remove_dead_code(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('fn() { return 1; puts(2); 3 }', 'return 1;'),
+            Test('fn() { let a = 1; let b = [fn() { 2 }]; 3 }', '3'),
+            Test('fn() { let a = 1; a }', 'let a = 1;a'),
+            Test('fn() { let a = puts(1); 3 }', 'let a = puts(1);3'),
+            Test('fn() { let a = 1 + true; 3 }', 'let a = (1 + true);3'),
+            Test('fn() { let a = 1; [fn() { a }] }', 'let a = 1;[}()a]'),
+            Test('fn() { if (true) { return 1; }; 2 }', 'return 1;'),
+            Test('fn() { return f(); 2 }', 'return f();2'),
+            Test('fn() { let a = {1: fn() { 2 }}; 3 }', '3'),
+            Test('fn() { let a = {fn() { 1 }: 2}; 3 }', 'let a = {}()1:2};3'),
+            Test('fn() { let a = {[1, [true, "b"]]: 2}; 3 }', '3'),
+            Test('fn() { let a = {[1, [fn() { 1 }]]: 2}; 3 }', 'let a = {[1, [}()1]]:2};3'),
+            Test('fn() { 3; let y = 1; }', '3let y = 1;'),
+            Test('fn() { let y = 1; }', 'let y = 1;'),
+            Test('fn() { let a = 1; let b = 2; }', 'let b = 2;'),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            optimizer.Optimize(program)
+            body = testFunctionBody(program)
+            if body.String() != tt.expected:
+                self.fail('wrong body. got=%s, want=%s' % (body.String(), tt.expected))
+
+        program = testParseProgram('let a = 1;')
+        optimizer.Optimize(program)
+        if program.String() != 'let a = 1;':
+            self.fail('global let removed. got=%s' % program.String())
+
+        for input in ['let f = fn() { 3; let y = 1; }; f()', 'let f = fn() { let y = 1; }; f()']:
+            evaluated = testEval(input)
+            if evaluated is not None:
+                self.fail('%s: object is not None. got=%s' % (input, evaluated))
+
+    def test_inline_functions(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let double = fn(x) { x * 2 }; double(5)', 'let double = }(x)(x * 2);10'),
+            Test('let get = fn(p) { p["name"] }; get(people[0])',
+                 'let get = }(p)(p[name]);((people[0])[name])'),
+            Test('let sq = fn(a) { return a * a; }; fn(n) { sq(n) }',
+                 'let sq = }(a)return (a * a);;}(n)(n * n)'),
+            Test('let sub = fn(a, b) { a - b }; sub(x, y)', 'let sub = }(a,b)(a - b);(x - y)'),
+            # Evaluation order: arguments are evaluated before the body and from left to right.
+            Test('let sub = fn(a, b) { b - a }; fn(n) { sub(n, y) }',
+                 'let sub = }(a,b)(b - a);}(n)(y - n)'),
+            Test('let sub = fn(a, b) { b - a }; fn(n) { sub(y, n) }',
+                 'let sub = }(a,b)(b - a);}(n)(n - y)'),
+            Test('let sub = fn(a, b) { b - a }; sub(x, y)', 'let sub = }(a,b)(b - a);sub(x, y)'),
+            Test('let sq = fn(a) { a * a }; sq(x)', 'let sq = }(a)(a * a);sq(x)'),
+            Test('let k = fn(a) { 1 }; k(x)', 'let k = }(a)1;k(x)'),
+            Test('let d = fn(x) { x * 2 }; d(f(1))', 'let d = }(x)(x * 2);d(f(1))'),
+            Test('let f = fn(x) { len(x) + x }; fn(n) { f(n) }',
+                 'let f = }(x)(len(x) + x);}(n)(len(n) + n)'),
+            # Shadowing, recursion and bodies that bind names are left alone.
+            Test('let f = fn(x) { x }; fn(f) { f(1) }', 'let f = }(x)x;}(f)f(1)'),
+            Test('let f = fn(x) { x }; let f = 2; f(1)', 'let f = }(x)x;let f = 2;f(1)'),
+            Test('let f = fn(x) { x + y }; f(1)', 'let f = }(x)(x + y);f(1)'),
+            Test('let f = fn(x) { f(x) }; f(1)', 'let f = }(x)f(x);f(1)'),
+            Test('let f = fn(x) { fn() { x } }; f(1)', 'let f = }(x)}()x;f(1)'),
+            Test('let f = fn(x) { let y = x; y }; f(1)', 'let f = }(x)let y = x;y;f(1)'),
+            Test('if (c) { let f = fn(x) { x } }; f(1)', 'ifc let f = }(x)x;f(1)'),
+            Test('let f = fn(x) { x }; f(1, 2)', 'let f = }(x)x;f(1, 2)'),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            optimizer.Optimize(program)
+            if program.String() != tt.expected:
+                self.fail('wrong program. got=%s, want=%s' % (program.String(), tt.expected))
+
+    def test_switches_and_report(self):
+        input = 'fn() { let unused = 1; if (true) { return 2 * 3; }; 4 }'
+
+        program = testParseProgram(input)
+        report = optimizer.Optimize(program, optimizer.Options(FoldConstants=False,
+                                                               PruneBranches=False,
+                                                               RemoveUnreachable=False,
+                                                               RemoveUnusedLets=False,
+                                                               InlineFunctions=False))
+        if report.Changed() or program.String() != testParseProgram(input).String():
+            self.fail('program changed with every switch off. got=%s' % program.String())
+
+        program = testParseProgram(input)
+        report = optimizer.Optimize(program)
+        if testFunctionBody(program).String() != 'return 6;':
+            self.fail('wrong program. got=%s' % program.String())
+
+        expected = [
+            'folded: (2 * 3) => 6',
+            'pruned: iftrue return 6;',
+            'unreachable: 4',
+            'unused let: let unused = 1;',
+        ]
+        if report.String().split('\n') != expected:
+            self.fail('wrong report. got=%s' % report.String())
+
+        program = testParseProgram('let double = fn(x) { x * 2 }; double(5)')
+        report = optimizer.Optimize(program, optimizer.Options(InlineFunctions=False))
+        if report.Changed():
+            self.fail('function inlined with InlineFunctions off. got=%s' % program.String())
+
+        report = optimizer.Optimize(program)
+        expected = ['inlined: double(5) => (5 * 2)', 'folded: (5 * 2) => 10']
+        if report.String().split('\n') != expected:
+            self.fail('wrong report. got=%s' % report.String())
+
+
+class TestOptimizedEvaluator(test_evaluator.TestEvaluator):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(test_evaluator, 'testEval', testEval):
+            return super().run(result)
+
+
+def testParseProgram(input: str) -> ast.Program:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    return p.ParseProgram()
+
+
+def testFunctionBody(program: ast.Program) -> ast.BlockStatement:
+    statement = cast(ast.ExpressionStatement, program.Statements[0])
+    return cast(ast.FunctionLiteral, statement.ExpressionValue).Body
+
+
+def testEval(input: str) -> Optional[object.Object]:
+    program = testParseProgram(input)
+    optimizer.Optimize(program)
+    return evaluator.Eval(program, object.NewEnvironment())
@@ -0,0 +1,160 @@
+import unittest
+from dataclasses import dataclass
+from typing import Any, List, Optional, cast
+
+import test_evaluator
+from monkey import ast, evaluator, lexer, object, parser, purity, resolver, stackeval, unwind
+
+
+class TestPurity(unittest.TestCase):
+    def test_analyze(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: List[str]
+
+        tests: List[Test] = [
+            Test('let f = fn(x) { x + 1 }', ['f']),
+            Test('let f = fn(x) { puts(x); x }', []),
+            Test('let f = fn(x) { len(x) + len(rest(push(x, 1))) }', ['f']),
+            Test('let f = fn(n) { if (n < 2) { n } else { f(n - 1) + f(n - 2) } }', ['f']),
+            Test('let f = memo(fn(n) { if (n < 2) { n } else { f(n - 1) + f(n - 2) } })', ['f']),
+            Test('let g = fn(x) { puts(x) }; let f = fn(x) { g(x) }', []),
+            Test('let g = fn(x) { x * 2 }; let f = fn(x) { g(x) }', ['g', 'f']),
+            # Impurity reaches callers through recursion.
+            Test('let f = fn(x) { g(x) }; let g = fn(x) { if (x) { f(x) } else { puts(x) } }',
+                 []),
+            Test('let f = fn(x) { let g = fn(y) { y * x }; g(2) }', ['f', 'g']),
+            Test('let f = fn(x) { fn(y) { y * x } }', ['f']),
+            # Functions that are passed in, or returned, may do anything.
+            Test('let f = fn(g, x) { g(x) }', []),
+            Test('let f = fn(x) { x }; let g = fn(x) { f(x)(x) }', ['f']),
+            # A name bound more than once may not mean the same at every call.
+            Test('let k = 1; let f = fn(x) { x + k }; let k = 2', []),
+            Test('let k = 1; let f = fn(x) { x + k }', ['f']),
+            Test('let f = fn(x) { if (x) { let k = 1; }; fn() { k } }', ['f']),
+            Test('let f = fn(x) { unknown(x) }', []),
+            Test('let f = fn(x) { quote(x) }', []),
+            Test('let len = fn(x) { puts(x) }; let f = fn(x) { len(x) }', []),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            resolver.Resolve(program, closed=True)
+            pure = purity.Analyze(program, closed=True)
+            if pure != tt.expected:
+                self.fail('wrong pure functions for %s. expected=%s, got=%s' %
+                          (tt.input, tt.expected, pure))
+
+    def test_closures_of_rebound_names(self):
+        program = testParseProgram('let f = fn(x) { if (x) { let k = 1; }; fn() { k } }')
+        resolver.Resolve(program, closed=True)
+        purity.Analyze(program, closed=True)
+        inner = cast(ast.FunctionLiteral, None)
+
+        def f(node: ast.Node) -> bool:
+            nonlocal inner
+            if type(node) == ast.FunctionLiteral and not node.Parameters:
+                inner = node
+            return True
+
+        ast.Inspect(program, f)
+        if inner.Body.Pure:
+            self.fail('closure over a conditionally bound name is pure')
+
+    def test_open_program(self):
+        # Later programs may rebind top-level names, but not what a function means by its own.
+        input = 'let g = fn(x) { x }; let f = fn(n) { if (n < 1) { g(n) } else { f(n - 1) } }'
+        program = testParseProgram(input)
+        resolver.Resolve(program)
+        pure = purity.Analyze(program)
+        if pure != ['g']:
+            self.fail('wrong pure functions. got=%s' % pure)
+
+        program = testParseProgram('let f = fn(n) { if (n < 1) { n } else { f(n - 1) } }')
+        resolver.Resolve(program)
+        pure = purity.Analyze(program)
+        if pure != ['f']:
+            self.fail('wrong pure functions. got=%s' % pure)
+
+
+class TestMemo(unittest.TestCase):
+    def test_memo(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: Any
+
+        tests: List[Test] = [
+            Test('let fib = memo(fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } });'
+                 'fib(50)', 12586269025),
+            Test('let f = memo(fn(s) { s + "!" }); f("a"); f("a")', 'a!'),
+            Test('let f = memo(fn(a) { len(a) }); f([1, 2]); f([1, 2, 3])', 3),
+            Test('let f = memo(fn(a) { push(a, 1) }); f([[1], 2]) == f([[1], 2])', 'True'),
+            Test('let f = memo(fn(x) { x + 1 }); f(1, 2)',
+                 'ERROR: wrong number of arguments. got=2, want=1'),
+            Test('let f = memo(fn(x) { x * 2 }); f(2) + f(2)', 8),
+            Test('let f = fn(x) { puts(x) }; memo(f)',
+                 'ERROR: argument to `memo` must be a pure function'),
+            Test('memo(1)', 'ERROR: argument to `memo` must be FUNCTION, got INTEGER'),
+            Test('memo(fn(x) { x }, 0)',
+                 'ERROR: capacity of `memo` must be a positive INTEGER, got 0'),
+            Test('memo(fn(x) { x }, 1, 2)',
+                 'ERROR: wrong number of arguments. got=3, want=1 or 2'),
+            Test('memo()', 'ERROR: wrong number of arguments. got=0, want=1 or 2'),
+        ]
+
+        for eval in (evaluator.Eval, stackeval.Eval, unwind.Eval):
+            for tt in tests:
+                evaluated = testEvalPure(tt.input, eval)
+                if type(tt.expected) == int:
+                    test_evaluator.testIntegerObject(self, evaluated, tt.expected)
+                elif type(evaluated) == object.String:
+                    if cast(object.String, evaluated).Value != tt.expected:
+                        self.fail('wrong value for %s. got=%s' % (tt.input, evaluated))
+                elif testInspect(evaluated) != tt.expected:
+                    self.fail('wrong result for %s. expected=%s, got=%s' %
+                              (tt.input, tt.expected, testInspect(evaluated)))
+
+    def test_statistics(self):
+        env = object.NewEnvironment()
+        testEvalPure('let fib = memo(fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } });'
+                     'fib(30); fib(30); fib(fn() { 1 })', evaluator.Eval, env)
+        memo = cast(object.Builtin, env.Get('fib')).Fn
+        if (memo.Hits, memo.Misses, memo.Skips) != (29, 31, 1):
+            self.fail('wrong statistics. got=%s' % memo.String())
+
+        testEvalPure('let g = memo(fn(x) { x + true }); g(1)', evaluator.Eval, env)
+        testEvalPure('g(1)', evaluator.Eval, env)
+        memo = cast(object.Builtin, env.Get('g')).Fn
+        if (memo.Hits, memo.Misses, len(memo.Cache)) != (0, 2, 0):
+            self.fail('errors are cached. got=%s' % memo.String())
+
+    def test_eviction(self):
+        env = object.NewEnvironment()
+        testEvalPure('let f = memo(fn(x) { x * 2 }, 2); f(1); f(2); f(1); f(3); f(1); f(2)',
+                     evaluator.Eval, env)
+        memo = cast(object.Builtin, env.Get('f')).Fn
+        # f(3) evicts f(2), the least recently used, so f(2) misses again.
+        if (memo.Hits, memo.Misses, memo.Evictions, len(memo.Cache)) != (2, 4, 2, 2):
+            self.fail('wrong statistics. got=%s' % memo.String())
+
+
+def testParseProgram(input: str) -> ast.Program:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    return p.ParseProgram()
+
+
+def testEvalPure(input: str, eval: Any,
+                 env: Optional[object.Environment] = None) -> Optional[object.Object]:
+    program = testParseProgram(input)
+    if env is None:
+        env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    purity.Analyze(program, closed=True)
+    return eval(program, env)
+
+
+def testInspect(obj: Optional[object.Object]) -> str:
+    return obj.Inspect if obj is not None else 'None'
@@ -0,0 +1,254 @@
+import unittest
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, cast
+
+from monkey import ast, evaluator, lexer, object, parser, resolver, stackeval
+
+
+class TestResolver(unittest.TestCase):
+    def test_addresses(self):
+        input = '''
+        let g = 1;
+        let outer = fn(a, b) {
+          let c = a + b;
+          fn(d) { a + c + d + g };
+        };'''
+
+        program = testParseProgram(input)
+        resolver.Resolve(program)
+
+        outer = cast(ast.LetStatement, program.Statements[1]).Value
+        outer = cast(ast.FunctionLiteral, outer)
+        if outer.Body.Slots != ['a', 'b', 'c']:
+            self.fail('wrong slots. got=%s' % outer.Body.Slots)
+
+        inner = cast(ast.ExpressionStatement, outer.Body.Statements[1]).ExpressionValue
+        inner = cast(ast.FunctionLiteral, inner)
+        if inner.Body.Slots != ['d']:
+            self.fail('wrong slots. got=%s' % inner.Body.Slots)
+
+        # The inner function captures only a and c, which outer keeps in cells.
+        if inner.Free != ['a', 'c'] or inner.Captures != [(0, 0), (0, 2)]:
+            self.fail('wrong captures. got=%s, %s' % (inner.Free, inner.Captures))
+        if outer.Body.Cells != [0, 2]:
+            self.fail('wrong cells. got=%s' % outer.Body.Cells)
+
+        expected: List[Tuple[str, Optional[int], Optional[int]]] = [
+            ('a', 1, 0),
+            ('c', 1, 1),
+            ('d', 0, 0),
+            ('g', 2, None),
+        ]
+        identifiers = collectIdentifiers(inner.Body)
+        for (name, depth, slot), ident in zip(expected, identifiers):
+            if ident.Value != name or ident.Depth != depth or ident.Slot != slot:
+                self.fail('wrong address for %s. got=(%s, %s), want=(%s, %s)' %
+                          (ident.Value, ident.Depth, ident.Slot, depth, slot))
+
+    def test_quote_is_not_resolved(self):
+        program = testParseProgram('fn(x) { quote(x + unquote(x)) }')
+        resolver.Resolve(program)
+
+        identifiers = collectIdentifiers(program)
+        quoted = [i for i in identifiers if i.Value == 'x'][1:]
+        if len(quoted) != 2:
+            self.fail('wrong number of identifiers. got=%s' % len(quoted))
+        if quoted[0].Slot is not None:
+            self.fail('quoted identifier was resolved')
+        if quoted[1].Slot != 0:
+            self.fail('unquoted identifier was not resolved')
+
+    def test_eval(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('let add = fn(x, y) { x + y; }; add(5 + 5, add(5, 5));', '20'),
+            Test('let newAdder = fn(x) { fn(y) { x + y }; }; newAdder(2)(3);', '5'),
+            Test('let x = 1; let f = fn() { let y = x; let x = 2; y + x }; f();', '3'),
+            Test('let f = fn(n) { if (n > 0) { let r = n; } r }; let r = 7; f(0) + f(1);', '8'),
+            Test('let f = fn(len) { len }; f(3) + len("ab");', '5'),
+            Test('let f = fn(x) { quote(x + unquote(x)) }; f(4);', 'QUOTE((x + 4))'),
+            Test('let f = fn() { g }; f();', 'ERROR: identifier not found: g'),
+            Test(
+                '''let reduce = fn(arr, initial, f) {
+              let iter = fn(arr, result) {
+                if (len(arr) == 0) { result } else { iter(rest(arr), f(result, first(arr))); }
+              };
+              iter(arr, initial);
+            };
+            reduce([1, 2, 3, 4, 5], 0, fn(initial, el) { initial + el });''', '15'),
+            Test(
+                '''let loop = fn(n, acc) { if (n == 0) { acc } else { loop(n - 1, acc + 1) } };
+            loop(5000, 0);''', '5000'),
+            Test('let f = fn(x) { let g = fn() { x + y }; let y = 2; g() }; f(1);', '3'),
+            Test('let f = fn(x) { let g = fn() { let y = x; let x = 2; y + x }; g() }; f(5);',
+                 '7'),
+            Test('let f = fn(a) { fn(b) { fn(c) { a + b + c } } }; f(1)(2)(3);', '6'),
+        ]
+
+        for tt in tests:
+            for eval in (evaluator.Eval, stackeval.Eval):
+                program = testParseProgram(tt.input)
+                resolver.Resolve(program)
+                evaluated = eval(program, object.NewEnvironment())
+                if evaluated is None or evaluated.Inspect != tt.expected:
+                    self.fail('wrong result for %s. got=%s, want=%s' % (tt.input, evaluated,
+                                                                        tt.expected))
+
+    def test_closures_capture_free_variables(self):
+        input = '''
+        let make = fn(n) { let big = [1, 2, 3]; let k = n * 2; fn(x) { x + k } };
+        let count = fn(n) {
+          let iter = fn(i) { if (i == n) { i } else { iter(i + 1) } };
+          iter
+        };'''
+
+        env = object.NewEnvironment()
+        program = testParseProgram(input)
+        resolver.Resolve(program, env)
+        evaluator.Eval(program, env)
+
+        # The closure keeps the cell of k, but not the frame holding big.
+        program = testParseProgram('make(4)')
+        resolver.Resolve(program, env)
+        closure = cast(object.Function, evaluator.Eval(program, env))
+        captured = cast(object.Frame, closure.Env)
+        if captured.names != ['k'] or captured.outer is not env:
+            self.fail('wrong captured environment. got=%s' % captured)
+        if cast(object.Cell, captured.slots[0]).Value != object.Integer(Value=8):
+            self.fail('wrong captured value. got=%s' % captured.slots[0])
+
+        # A function that refers to itself does not do so through a cell of its own.
+        program = testParseProgram('count(3)')
+        resolver.Resolve(program, env)
+        closure = cast(object.Function, evaluator.Eval(program, env))
+        if cast(object.Frame, closure.Env).names != ['n']:
+            self.fail('wrong captured environment. got=%s' % closure.Env)
+
+        program = testParseProgram('count(3)(0)')
+        resolver.Resolve(program, env)
+        evaluated = evaluator.Eval(program, env)
+        if evaluated is None or evaluated.Inspect != '3':
+            self.fail('wrong result. got=%s' % evaluated)
+
+    def test_builtins(self):
+        @dataclass
+        class Test:
+            input: str
+            bound: bool
+            specialized: bool
+
+        tests: List[Test] = [
+            Test('len("abc")', True, True),
+            Test('puts(1, 2, 3)', True, True),
+            Test('len("abc", "def")', True, False),
+            Test('let len = fn(x) { 1 }; len("abc")', False, False),
+            Test('fn(len) { len("abc") }', False, False),
+            Test('fn(x) { let first = x; first("abc") }', False, False),
+            Test('quote(len("abc"))', False, False),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            resolver.Resolve(program, closed=True)
+
+            calls: List[ast.CallExpression] = []
+
+            def f(node: ast.Node) -> bool:
+                if type(node) == ast.CallExpression and node.Function.TokenLiteral() != 'quote':
+                    calls.append(cast(ast.CallExpression, node))
+                return True
+
+            ast.Inspect(program, f)
+            call = calls[-1]
+            function = cast(ast.Identifier, call.Function)
+            if (function.Builtin is not None) != tt.bound:
+                self.fail('%s: builtin bound=%s' % (tt.input, function.Builtin is not None))
+            if (call.Builtin is not None) != tt.specialized:
+                self.fail('%s: call specialized=%s' % (tt.input, call.Builtin is not None))
+
+        program = testParseProgram('len("abc")')
+        resolver.Resolve(program)
+        call = cast(ast.CallExpression,
+                    cast(ast.ExpressionStatement, program.Statements[0]).ExpressionValue)
+        if cast(ast.Identifier, call.Function).Builtin is not None or call.Builtin is not None:
+            self.fail('builtin bound in an open program')
+
+    def test_builtins_shadowed_by_existing_globals(self):
+        env = object.NewEnvironment()
+        for input in ['let rest = fn(x) { 42 };', 'rest([1, 2])']:
+            program = testParseProgram(input)
+            resolver.Resolve(program, env, closed=True)
+            evaluated = evaluator.Eval(program, env)
+
+        if evaluated is None or evaluated.Inspect != '42':
+            self.fail('object has wrong value. got=%s, want=42' % evaluated)
+
+    def test_builtins_shadowed_later(self):
+        env = object.NewEnvironment()
+        for input in ['let g = fn() { len([1, 2]) };', 'let len = fn(x) { 99 };', 'g()']:
+            program = testParseProgram(input)
+            resolver.Resolve(program, env)
+            evaluated = evaluator.Eval(program, env)
+
+        if evaluated is None or evaluated.Inspect != '99':
+            self.fail('object has wrong value. got=%s, want=99' % evaluated)
+
+    def test_builtin_calls(self):
+        @dataclass
+        class Test:
+            input: str
+            expected: str
+
+        tests: List[Test] = [
+            Test('len("four")', '4'),
+            Test('push([1], 2)', '[1, 2]'),
+            Test('len("one", "two")', 'ERROR: wrong number of arguments. got=2, want=1'),
+            Test('len(1)', 'ERROR: argument to \'len\' not supported, got INTEGER'),
+            Test('len(1 + true)', 'ERROR: type mismatch: INTEGER + BOOLEAN'),
+            Test('let f = fn() { let x = 1; }; len(f())',
+                 'ERROR: wrong number of arguments. got=0, want=1'),
+            Test('let l = len; l("four")', '4'),
+        ]
+
+        for tt in tests:
+            program = testParseProgram(tt.input)
+            resolver.Resolve(program, closed=True)
+            evaluated = evaluator.Eval(program, object.NewEnvironment())
+            if evaluated is None or evaluated.Inspect != tt.expected:
+                self.fail('wrong result for %s. got=%s, want=%s' % (tt.input, evaluated,
+                                                                    tt.expected))
+
+    def test_globals_added_later(self):
+        env = object.NewEnvironment()
+        for input in ['let f = fn(x) { g(x) * 2 };', 'let g = fn(x) { x + 1 };']:
+            program = testParseProgram(input)
+            resolver.Resolve(program)
+            evaluator.Eval(program, env)
+
+        program = testParseProgram('f(1)')
+        resolver.Resolve(program)
+        evaluated = evaluator.Eval(program, env)
+        if evaluated is None or evaluated.Value != 4:
+            self.fail('object has wrong value. got=%s, want=4' % evaluated)
+
+
+def testParseProgram(input: str) -> ast.Program:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    return p.ParseProgram()
+
+
+def collectIdentifiers(node: ast.Node) -> List[ast.Identifier]:
+    identifiers: List[ast.Identifier] = []
+
+    def f(node: ast.Node) -> bool:
+        if type(node) == ast.Identifier:
+            identifiers.append(cast(ast.Identifier, node))
+        return True
+
+    ast.Inspect(node, f)
+    return identifiers
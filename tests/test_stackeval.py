@@ -0,0 +1,80 @@
+import unittest
+from dataclasses import dataclass
+from typing import List, Optional
+
+from monkey import ast, evaluator, lexer, object, parser, stackeval
+
+
+class TestStackEval(unittest.TestCase):
+    def test_matches_recursive_evaluator(self):
+        @dataclass
+        class Test:
+            input: str
+
+        tests: List[Test] = [
+            Test('5 * 2 + 10'),
+            Test('-50 + 100 + -50'),
+            Test('!!5'),
+            Test('(1 < 2) == true'),
+            Test('if (1 > 2) { 10 } else { 20 }'),
+            Test('if (false) { 10 }'),
+            Test('9; return 2 * 5; 9;'),
+            Test('if (10 > 1) { if (10 > 1) { return 10; } return 1; }'),
+            Test('5 + true; 5;'),
+            Test('if (10 > 1) { true + false; }'),
+            Test('foobar'),
+            Test('"Hello" + " " + "World!"'),
+            Test('let add = fn(x, y) { x + y; }; add(5 + 5, add(5, 5));'),
+            Test('let newAdder = fn(x) { fn(y) { x + y }; }; let addTwo = newAdder(2); addTwo(2);'),
+            Test('len("four")'),
+            Test('len("one", "two")'),
+            Test('let f = fn(x) { x }; f(1, 2)'),
+            Test('let f = fn(n) { if (n > 0) { return f(n - 1, 0); } n }; f(3)'),
+            Test('let myArray = [1, 2, 3]; let i = myArray[0]; myArray[i]'),
+            Test('[1, 2, 3][3]'),
+            Test('{"one": 10 - 9, "thr" + "ee": 6 / 2, 4: 4, true: 5}'),
+            Test('{"foo": 5}["foo"]'),
+            Test('{"name": "Monkey"}[fn(x) { x }];'),
+            Test('{[1]: 2}'),
+            Test('{"foo": 5, "foo": 6}'),
+            Test('quote(8 + unquote(4 + 4))'),
+            Test('''let map = fn(arr, f) {
+              let iter = fn(arr, accumulated) {
+                if (len(arr) == 0) {
+                  accumulated
+                } else {
+                  iter(rest(arr), push(accumulated, f(first(arr))));
+                }
+              };
+              iter(arr, []);
+            };
+            map([1, 2, 3, 4], fn(x) { x * 2 });'''),
+        ]
+
+        for tt in tests:
+            expected = testInspect(evaluator.Eval(testParseProgram(tt.input),
+                                                  object.NewEnvironment()))
+            got = testInspect(stackeval.Eval(testParseProgram(tt.input), object.NewEnvironment()))
+            if got != expected:
+                self.fail('wrong result for %s. want=%s, got=%s' % (tt.input, expected, got))
+
+    def test_deep_recursion(self):
+        input = '''
+        let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };
+        count(50000);'''
+
+        evaluated = stackeval.Eval(testParseProgram(input), object.NewEnvironment())
+        if evaluated is None or evaluated.Value != 50000:
+            self.fail('object has wrong value. got=%s, want=50000' % evaluated)
+
+
+def testParseProgram(input: str) -> ast.Program:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    return p.ParseProgram()
+
+
+def testInspect(obj: Optional[object.Object]) -> Optional[str]:
+    if obj is None:
+        return None
+    return obj.Inspect
@@ -0,0 +1,63 @@
+import unittest
+from typing import Any, Optional
+from unittest import mock
+
+import test_evaluator
+from monkey import lexer, object, parser, resolver, unwind
+
+
+class TestUnwindEvaluator(test_evaluator.TestEvaluator):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(test_evaluator, 'testEval', testEval):
+            return super().run(result)
+
+
+class TestUnwindMacro(test_evaluator.TestMacro):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(test_evaluator, 'testEval', testEval):
+            return super().run(result)
+
+
+class TestUnwindResolved(test_evaluator.TestEvaluator):
+    def run(self, result: Any = None) -> Any:
+        with mock.patch.object(test_evaluator, 'testEval', testEvalResolved):
+            return super().run(result)
+
+
+class TestUnwind(unittest.TestCase):
+    def test_return_unwinds_to_function(self):
+        input = '''
+        let f = fn(x) {
+          if (x > 1) {
+            if (x > 2) { return 3; }
+            return 2;
+          }
+          1
+        };
+        [f(1), f(2), f(3)]'''
+
+        evaluated = testEval(input)
+        if evaluated is None or evaluated.Inspect != '[1, 2, 3]':
+            self.fail('wrong result. got=%s' % evaluated)
+
+    def test_error_inside_call(self):
+        evaluated = testEval('let f = fn(x) { x + true }; let y = f(1); y')
+        if type(evaluated) != object.Error:
+            self.fail('object is not Error. got=%s' % evaluated)
+
+
+def testEval(input: str) -> Optional[object.Object]:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    program = p.ParseProgram()
+    env = object.NewEnvironment()
+    return unwind.Eval(program, env)
+
+
+def testEvalResolved(input: str) -> Optional[object.Object]:
+    lex = lexer.New(input)
+    p = parser.New(lex)
+    program = p.ParseProgram()
+    env = object.NewEnvironment()
+    resolver.Resolve(program, env, closed=True)
+    return unwind.Eval(program, env)